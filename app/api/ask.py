@@ -52,7 +52,7 @@ def question_answer(
     reranker = request.app.state.reranker
     
     # Поиск и ранжирование релевантных документов
-    reranked = retrieve_and_rerank(question, vectordb, reranker, arxiv_id, top_k=10, top_n=2)
+    reranked = retrieve_and_rerank(question, vectordb, reranker, arxiv_id, top_k=10, top_n=2, section=req.section)
     top_chunks = [doc.page_content for doc, score in reranked]
     context = "\n\n".join(top_chunks)
 
@@ -1,6 +1,6 @@
 from fastapi import APIRouter
 from app.models.schemas import QARequest
-from app.tasks.ask_task import ask_article_task
+from app.tasks.ask_task import enqueue_ask
 
 router = APIRouter()
 
@@ -9,5 +9,5 @@ def ask_async(req: QARequest):
     """
     Асинхронный запуск задачи на ответ на вопрос через Celery.
     """
-    task = ask_article_task.delay(req.user_id, req.question)
-    return {"message": "Задача на ответ пользователя по статье отправлена в очередь задач", "task_id": task.id}
\ No newline at end of file
+    task_id = enqueue_ask(req.user_id, req.question, req.section, req.all_articles)
+    return {"message": "Задача на ответ пользователя по статье отправлена в очередь задач", "task_id": task_id}
\ No newline at end of file
@@ -0,0 +1,25 @@
+from fastapi import APIRouter, HTTPException
+from app.models.schemas import BulkIngestRequest
+from app.services import bulk_progress
+from app.tasks.bulk_ingest_task import enqueue_bulk_ingest
+
+router = APIRouter()
+
+@router.post("/")
+def bulk_ingest(req: BulkIngestRequest):
+    """
+    Массовая загрузка статей (arXiv ID/ссылки или пути к PDF) без привязки к пользователю.
+    Уже загруженные статьи пропускаются без скачивания.
+    """
+    job_id = enqueue_bulk_ingest(req.sources)
+    return {"message": "Массовая загрузка статей отправлена в очередь задач", "job_id": job_id}
+
+@router.get("/{job_id}")
+def bulk_ingest_progress(job_id: str):
+    """
+    Прогресс массовой загрузки: счётчики статей и скорость (статей в минуту).
+    """
+    progress = bulk_progress.get(job_id)
+    if progress is None:
+        raise HTTPException(status_code=404, detail="Задание не найдено")
+    return progress
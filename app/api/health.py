@@ -0,0 +1,39 @@
+import json
+
+import redis.asyncio as aioredis
+from fastapi import APIRouter
+
+from app.config import REDIS_CACHE_URL
+from app.services.components import readiness_key
+
+router = APIRouter()
+
+r = aioredis.from_url(REDIS_CACHE_URL)
+
+
+@router.get("/")
+async def health():
+    """
+    Готовность сервиса: для каждой роли воркеров (ingest, embedding, generation) —
+    есть ли живой воркер, у которого загружены и прогреты компоненты его ролей.
+
+    returns:
+        dict: Общий статус, готовность ролей и состояние каждого воркера
+    """
+    workers = {}
+    async for key in r.scan_iter(match=readiness_key("*")):
+        raw = await r.get(key)
+        if raw:
+            status = json.loads(raw)
+            workers[status["worker"]] = status
+
+    roles = {}
+    for status in workers.values():
+        for role in status["roles"]:
+            roles[role] = roles.get(role, False) or status["ready"]
+
+    return {
+        "status": "ok" if roles and all(roles.values()) else "starting",
+        "roles": roles,
+        "workers": workers
+    }
@@ -16,7 +16,7 @@ router = APIRouter()
 @router.post("/")
 def ingest_article(request: Request, req: IngestRequest, db: Session = Depends(get_db)):
     """
-    Загружает и обрабатывает статью с arXiv, сохраняет чанки в ChromaDB,
+    Загружает и обрабатывает статью с arXiv, сохраняет чанки в индекс статьи,
     сохраняет метаданные в БД и регистрирует сессию пользователя.
 
     args:
@@ -40,7 +40,7 @@ def ingest_article(request: Request, req: IngestRequest, db: Session = Depends(g
     arxiv_id, title, md_cleaned, abstract, conclusion = parse_and_split_article(req.arxiv_url)
 
     embedding_model = request.app.state.embedding_model
-    chunks = store_chunks(md_cleaned, arxiv_id, title, embedding_model)
+    chunks, _ = store_chunks(md_cleaned, arxiv_id, title, embedding_model, request.app.state.vectorstore)
 
     # Сохраняем метаданные и сессию
     save_article_metadata(db, arxiv_id, title, abstract, conclusion)
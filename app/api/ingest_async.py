@@ -1,10 +1,10 @@
 from fastapi import APIRouter
 from app.models.schemas import IngestRequest
-from app.tasks.ingest_task import ingest_article_task
+from app.tasks.ingest_task import enqueue_ingest
 
 router = APIRouter()
 
 @router.post("/")
 def ingest_async(req: IngestRequest):
-    task = ingest_article_task.delay(req.user_id, req.source, req.is_pdf)
-    return {"message": "Задача парсинга и загрузки метаданных в БД отправлена в очередь задач", "task_id": task.id}
\ No newline at end of file
+    task_id = enqueue_ingest(req.user_id, req.source, req.is_pdf)
+    return {"message": "Задача парсинга и загрузки метаданных в БД отправлена в очередь задач", "task_id": task_id}
\ No newline at end of file
@@ -1,9 +1,19 @@
+import asyncio
+import json
+
+import redis.asyncio as aioredis
 from celery.result import AsyncResult
 from celery_app import celery
 from fastapi import APIRouter
 
+from app.config import REDIS_CACHE_URL, TASK_WAIT_TIMEOUT_SECONDS
+from app.services.task_events import task_channel
+
 router = APIRouter()
 
+r = aioredis.from_url(REDIS_CACHE_URL)
+
+
 @router.get("/")
 def get_task_status(task_id: str):
     task_result = AsyncResult(task_id, app=celery)
@@ -14,4 +24,31 @@ def get_task_status(task_id: str):
         else:
             return {"status": "failed", "error": str(task_result.result)}
     else:
-        return {"status": "pending"}
\ No newline at end of file
+        return {"status": "pending"}
+
+
+@router.get("/wait")
+async def wait_task_status(task_id: str, timeout: int = TASK_WAIT_TIMEOUT_SECONDS):
+    """
+    Long-poll: держит запрос открытым, пока задача не завершится (или до timeout секунд).
+    Воркер публикует событие о завершении в Redis pub/sub, поэтому ответ приходит сразу,
+    без периодического опроса бэкенда результатов.
+    """
+    pubsub = r.pubsub()
+    # Подписываемся до проверки статуса, чтобы не пропустить событие между ними
+    await pubsub.subscribe(task_channel(task_id))
+    try:
+        status = await asyncio.to_thread(get_task_status, task_id)
+        if status["status"] != "pending":
+            return status
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + min(timeout, TASK_WAIT_TIMEOUT_SECONDS)
+        while (remaining := deadline - loop.time()) > 0:
+            message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=remaining)
+            if message is not None:
+                return json.loads(message["data"])
+        return {"status": "pending"}
+    finally:
+        await pubsub.unsubscribe()
+        await pubsub.close()
@@ -0,0 +1,52 @@
+import json
+import time
+
+import redis.asyncio as aioredis
+from fastapi import APIRouter
+from fastapi.responses import StreamingResponse
+
+from app.config import REDIS_CACHE_URL, STREAM_BLOCK_MS, STREAM_MAX_IDLE_SECONDS
+from app.services.streaming import stream_key
+
+router = APIRouter()
+
+r = aioredis.from_url(REDIS_CACHE_URL)
+
+
+async def _event_source(task_id: str):
+    """
+    Читает Redis stream задачи и отдаёт события в формате SSE.
+    Поток закрывается по событию end или после STREAM_MAX_IDLE_SECONDS без новых токенов.
+    """
+    key = stream_key(task_id)
+    last_id = "0"
+    last_event = time.monotonic()
+
+    while time.monotonic() - last_event < STREAM_MAX_IDLE_SECONDS:
+        response = await r.xread({key: last_id}, block=STREAM_BLOCK_MS)
+        if not response:
+            # Комментарий SSE, чтобы прокси не закрыли простаивающее соединение
+            yield ": keep-alive\n\n"
+            continue
+
+        for entry_id, fields in response[0][1]:
+            last_id = entry_id
+            last_event = time.monotonic()
+            event = {k.decode(): v.decode() for k, v in fields.items()}
+            yield f"data: {json.dumps(event, ensure_ascii=False)}\n\n"
+            if event["type"] == "end":
+                return
+
+    yield f"data: {json.dumps({'type': 'end', 'error': 'timeout'})}\n\n"
+
+
+@router.get("/")
+async def stream_task(task_id: str):
+    """
+    SSE-стрим токенов ответа задачи по мере генерации.
+    """
+    return StreamingResponse(
+        _event_source(task_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
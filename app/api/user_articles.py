@@ -0,0 +1,25 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+from app.db.crud import get_user_articles, get_user_arxiv_id, get_article_by_id, remove_user_article
+from app.db.database import get_db
+
+router = APIRouter()
+
+@router.get("/{user_id}")
+def list_user_articles(user_id: str, db: Session = Depends(get_db)):
+    """
+    Рабочий набор статей пользователя (последняя загруженная — первая) и текущая статья.
+    """
+    articles = []
+    for arxiv_id in get_user_articles(db, user_id):
+        article = get_article_by_id(db, arxiv_id)
+        articles.append({"arxiv_id": arxiv_id, "title": article.title if article else None})
+    return {"current": get_user_arxiv_id(db, user_id), "articles": articles}
+
+@router.delete("/{user_id}")
+def delete_user_article(user_id: str, arxiv_id: str, db: Session = Depends(get_db)):
+    """
+    Убирает статью из рабочего набора пользователя (сама статья и её индекс остаются).
+    """
+    remove_user_article(db, user_id, arxiv_id)
+    return {"message": "Статья убрана из рабочего набора", "arxiv_id": arxiv_id}
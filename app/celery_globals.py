@@ -1,5 +1,18 @@
-llm = None
-embedding_model = None
-reranker = None
-vectorstore = None
-tokenizer = None
\ No newline at end of file
+# Тяжёлые компоненты воркера загружаются лениво: при первом обращении к атрибуту
+# (или заранее в фоне) через app.services.components.registry.
+#
+#   llm, tokenizer, llm_backend        — компонент "llm"
+#   embedding_model, vectorstore       — компонент "embeddings"
+#   reranker                           — компонент "reranker"
+
+
+def __getattr__(name):
+    from app.services.components import registry
+
+    component = registry.provider(name)
+    if component is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    registry.ensure(component)
+    # Бэкенд pipeline не задаёт llm для других бэкендов
+    return globals().get(name)
@@ -0,0 +1,124 @@
+import os
+
+# Микро-батчинг генерации в Celery-воркере
+LLM_MAX_BATCH_SIZE = int(os.getenv("LLM_MAX_BATCH_SIZE", "8"))
+LLM_MAX_WAIT_MS = float(os.getenv("LLM_MAX_WAIT_MS", "50"))
+
+# Redis для кеша ответов и стриминга токенов
+REDIS_CACHE_URL = os.getenv("REDIS_CACHE_URL", "redis://redis:6379/1")
+
+# Стриминг токенов ответа из воркера
+STREAM_TTL_SECONDS = int(os.getenv("STREAM_TTL_SECONDS", "600"))
+STREAM_BLOCK_MS = int(os.getenv("STREAM_BLOCK_MS", "15000"))
+STREAM_MAX_IDLE_SECONDS = int(os.getenv("STREAM_MAX_IDLE_SECONDS", "300"))
+
+# Long-poll ожидание завершения задачи
+TASK_WAIT_TIMEOUT_SECONDS = int(os.getenv("TASK_WAIT_TIMEOUT_SECONDS", "25"))
+
+# Семантический кеш ответов (по эмбеддингам вопросов, отдельно для каждой статьи)
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92"))
+SEMANTIC_CACHE_TTL_SECONDS = int(os.getenv("SEMANTIC_CACHE_TTL_SECONDS", str(60 * 60 * 24)))
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "256"))
+
+# Фоновая предгенерация резюме: сколько фоновых промптов может ждать в батчере
+SUMMARY_BACKGROUND_MAX_PENDING = int(os.getenv("SUMMARY_BACKGROUND_MAX_PENDING", "16"))
+
+# Роли Celery-воркера: какие очереди он обслуживает и, соответственно, какие модели загружает
+# ingest — парсинг PDF (без моделей), embedding — эмбеддер, реранкер и векторная БД, generation — LLM
+WORKER_ROLES = [role.strip() for role in os.getenv("WORKER_ROLES", "ingest,embedding,generation").split(",") if role.strip()]
+
+# Параллельная конвертация PDF → markdown по диапазонам страниц
+PARSE_WORKERS = int(os.getenv("PARSE_WORKERS", str(os.cpu_count() or 1)))
+PARSE_PAGES_PER_SHARD = int(os.getenv("PARSE_PAGES_PER_SHARD", "4"))
+
+# Кеш эмбеддингов чанков по хешу текста (SQLite на локальном диске)
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "data/embedding_cache.db")
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "32"))
+
+# Векторный индекс: отдельная матрица нормированных эмбеддингов на каждую статью
+VECTOR_INDEX_DIR = os.getenv("VECTOR_INDEX_DIR", "vector_index")
+VECTOR_INDEX_CACHE_SIZE = int(os.getenv("VECTOR_INDEX_CACHE_SIZE", "256"))
+
+# Реранкинг: кеш оценок и адаптивное сокращение числа пар
+RERANK_CACHE_SIZE = int(os.getenv("RERANK_CACHE_SIZE", "50000"))
+# Не реранкать, если top_n кандидатов по косинусной близости отделены от остальных хотя бы на столько (0 — всегда реранкать)
+RERANK_SKIP_MARGIN = float(os.getenv("RERANK_SKIP_MARGIN", "0.15"))
+# Реранкать микробатчами в порядке близости и остановиться, когда все top_n оценки не ниже порога (>1 — без ранней остановки)
+RERANK_BATCH_SIZE = int(os.getenv("RERANK_BATCH_SIZE", "4"))
+RERANK_SETTLE_SCORE = float(os.getenv("RERANK_SETTLE_SCORE", "0.95"))
+
+# Гибридный поиск (BM25 + эмбеддинги, reciprocal rank fusion)
+HYBRID_DEPTH = int(os.getenv("HYBRID_DEPTH", "20"))
+HYBRID_RRF_K = int(os.getenv("HYBRID_RRF_K", "60"))
+# Кандидатов на реранкинг после гибридного поиска
+RETRIEVAL_TOP_K = int(os.getenv("RETRIEVAL_TOP_K", "6"))
+
+# Чанкинг статей по секциям (размеры в символах)
+CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", "600"))
+CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", "80"))
+
+# Контекст вопроса: сколько чанков отдаёт реранкер и сколько токенов из них попадает в промпт
+RETRIEVAL_TOP_N = int(os.getenv("RETRIEVAL_TOP_N", "4"))
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1024"))
+
+# Модель генерации и устройство (cpu — для проверки без GPU)
+LLM_MODEL = os.getenv("LLM_MODEL", "Qwen/Qwen3-8B")
+LLM_DEVICE = os.getenv("LLM_DEVICE", "cuda")
+# Кеш KV общих префиксов промптов (0 — выключен)
+PREFIX_CACHE_MAX_MB = int(os.getenv("PREFIX_CACHE_MAX_MB", "1024"))
+
+# Бэкенд генерации: pipeline (transformers в процессе воркера), openai (OpenAI-совместимый сервер), llamacpp (GGUF на CPU;
+# ставится отдельно: requirements/requirements-llamacpp.txt)
+LLM_BACKEND = os.getenv("LLM_BACKEND", "pipeline")
+LLM_SERVER_URL = os.getenv("LLM_SERVER_URL", "http://llm:8000")
+LLM_SERVER_MODEL = os.getenv("LLM_SERVER_MODEL", LLM_MODEL)
+LLM_HTTP_CONCURRENCY = int(os.getenv("LLM_HTTP_CONCURRENCY", "16"))
+LLM_HTTP_TIMEOUT = float(os.getenv("LLM_HTTP_TIMEOUT", "300"))
+LLAMACPP_MODEL_PATH = os.getenv("LLAMACPP_MODEL_PATH", "models/qwen3-8b-q4_k_m.gguf")
+LLAMACPP_THREADS = int(os.getenv("LLAMACPP_THREADS", "0"))
+LLAMACPP_CTX = int(os.getenv("LLAMACPP_CTX", "8192"))
+
+# Запуск воркера: фоновая предзагрузка компонентов, прогрев и публикация готовности
+WORKER_PRELOAD = os.getenv("WORKER_PRELOAD", "1") == "1"
+WORKER_WARMUP = os.getenv("WORKER_WARMUP", "1") == "1"
+READINESS_TTL_SECONDS = int(os.getenv("READINESS_TTL_SECONDS", "60"))
+
+# Загрузка статей: одна загрузка на статью одновременно и кеш её результата
+INGEST_LOCK_TTL_SECONDS = int(os.getenv("INGEST_LOCK_TTL_SECONDS", "600"))
+INGEST_RESULT_TTL_SECONDS = int(os.getenv("INGEST_RESULT_TTL_SECONDS", str(7 * 24 * 3600)))
+# Как часто повторная загрузка той же статьи проверяет, закончил ли владелец блокировки
+INGEST_WAIT_RETRY_SECONDS = int(os.getenv("INGEST_WAIT_RETRY_SECONDS", "5"))
+
+# Хранилище PDF с адресацией по содержимому и разобранными артефактами
+PDF_STORE_DIR = os.getenv("PDF_STORE_DIR", "articles/store")
+PDF_STORE_MAX_MB = int(os.getenv("PDF_STORE_MAX_MB", "2048"))
+
+# Скачивание статей с arXiv (адреса можно подменить локальным сервером для тестов)
+ARXIV_API_URL = os.getenv("ARXIV_API_URL", "https://export.arxiv.org/api/query?{}")
+ARXIV_PDF_URL = os.getenv("ARXIV_PDF_URL", "")  # шаблон с {arxiv_id}; пусто — ссылка из метаданных
+ARXIV_MAX_CONCURRENT_DOWNLOADS = int(os.getenv("ARXIV_MAX_CONCURRENT_DOWNLOADS", "2"))
+ARXIV_MIN_INTERVAL_SECONDS = float(os.getenv("ARXIV_MIN_INTERVAL_SECONDS", "1"))
+ARXIV_DOWNLOAD_RETRIES = int(os.getenv("ARXIV_DOWNLOAD_RETRIES", "3"))
+ARXIV_DOWNLOAD_TIMEOUT = float(os.getenv("ARXIV_DOWNLOAD_TIMEOUT", "30"))
+
+# Массовая загрузка: сколько статей индексировать одной задачей embedding
+BULK_INDEX_BATCH_SIZE = int(os.getenv("BULK_INDEX_BATCH_SIZE", "16"))
+BULK_PROGRESS_TTL_SECONDS = int(os.getenv("BULK_PROGRESS_TTL_SECONDS", str(7 * 24 * 3600)))
+
+# База данных: SQLite по умолчанию, PostgreSQL — через DATABASE_URL (postgresql+psycopg2://...)
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///data/database.db")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_RECYCLE_SECONDS = int(os.getenv("DB_POOL_RECYCLE_SECONDS", "1800"))
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+
+# Read-through кеш строк БД (сессии пользователей, метаданные статей)
+DB_CACHE_LOCAL_SIZE = int(os.getenv("DB_CACHE_LOCAL_SIZE", "4096"))
+DB_CACHE_LOCAL_TTL_SECONDS = float(os.getenv("DB_CACHE_LOCAL_TTL_SECONDS", "60"))
+DB_CACHE_TTL_SECONDS = int(os.getenv("DB_CACHE_TTL_SECONDS", "3600"))
+
+# Рабочий набор статей пользователя и поиск по нескольким статьям
+USER_WORKING_SET_SIZE = int(os.getenv("USER_WORKING_SET_SIZE", "10"))
+MULTI_ARTICLE_MIN_PER_ARTICLE = int(os.getenv("MULTI_ARTICLE_MIN_PER_ARTICLE", "2"))
+# Сколько рабочих наборов держать в памяти склеенной матрицей эмбеддингов (один проход плотного поиска)
+MULTI_ARTICLE_STACK_CACHE_SIZE = int(os.getenv("MULTI_ARTICLE_STACK_CACHE_SIZE", "32"))
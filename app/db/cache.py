@@ -0,0 +1,238 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Optional
+
+import redis
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.config import REDIS_CACHE_URL, DB_CACHE_LOCAL_SIZE, DB_CACHE_LOCAL_TTL_SECONDS, DB_CACHE_TTL_SECONDS
+from app.services import metrics
+
+r = redis.Redis.from_url(REDIS_CACHE_URL)
+
+INVALIDATION_CHANNEL = "db_cache_invalidate"
+
+# Отличает закешированное "строки нет" от промаха
+_MISSING = {"__missing__": True}
+
+
+class ReadThroughCache:
+    """
+    Двухуровневый read-through кеш строк БД: LRU в памяти процесса и общий tier в Redis.
+
+    Запись в БД инвалидирует ключ после коммита транзакции (invalidate_on_commit):
+    ключ удаляется из Redis, а остальные процессы получают событие через pub/sub
+    и удаляют его из своих LRU. Локальные записи вдобавок живут не дольше local_ttl.
+
+    Каждая инвалидация увеличивает поколение ключа. Читатель, промахнувшийся мимо кеша,
+    кладёт прочитанное из БД значение только если поколение за время чтения не изменилось
+    и ключ ещё пуст (SET NX) — иначе он мог бы затереть свежее значение устаревшим.
+
+    args:
+        name (str): Имя кеша (префикс ключей в Redis и метрик)
+        local_size (int): Размер LRU в памяти
+        local_ttl (float): Время жизни локальной записи, сек
+        ttl (int): Время жизни записи в Redis, сек
+    """
+
+    def __init__(self, name: str, local_size: int = DB_CACHE_LOCAL_SIZE, local_ttl: float = DB_CACHE_LOCAL_TTL_SECONDS, ttl: int = DB_CACHE_TTL_SECONDS):
+        self.name = name
+        self.local_size = local_size
+        self.local_ttl = local_ttl
+        self.ttl = ttl
+        self._local: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._local_hits = metrics.counter(f"db_cache_{name}_local_hits")
+        self._redis_hits = metrics.counter(f"db_cache_{name}_redis_hits")
+        self._misses = metrics.counter(f"db_cache_{name}_misses")
+        _caches[name] = self
+
+    def _redis_key(self, key: str) -> str:
+        return f"db_cache:{self.name}:{key}"
+
+    def _generation_key(self, key: str) -> str:
+        return f"db_cache:{self.name}:{key}:gen"
+
+    def _get_local(self, key: str):
+        with self._lock:
+            entry = self._local.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._local[key]
+                return None
+            self._local.move_to_end(key)
+            return value
+
+    def _set_local(self, key: str, value: dict):
+        with self._lock:
+            self._local[key] = (value, time.monotonic() + self.local_ttl)
+            self._local.move_to_end(key)
+            while len(self._local) > self.local_size:
+                self._local.popitem(last=False)
+
+    def drop_local(self, key: str):
+        with self._lock:
+            self._local.pop(key, None)
+
+    def get(self, key: str, loader: Callable[[], Optional[dict]]) -> Optional[dict]:
+        """
+        Возвращает строку из LRU, Redis или (при промахе обоих) из loader, заполняя оба уровня.
+
+        args:
+            key (str): Ключ строки
+            loader (Callable): Читает строку из БД; возвращает dict или None
+
+        returns:
+            Optional[dict]: Поля строки или None, если строки нет
+        """
+        _ensure_listener()
+        value = self._get_local(key)
+        if value is not None:
+            self._local_hits.inc()
+            return None if value is _MISSING else value
+
+        raw, generation = None, None
+        try:
+            raw, generation = r.mget(self._redis_key(key), self._generation_key(key))
+        except redis.RedisError:
+            pass
+        if raw is not None:
+            self._redis_hits.inc()
+            value = json.loads(raw)
+        else:
+            self._misses.inc()
+            value = loader()
+            if value is None:
+                value = _MISSING
+            if not self._fill(key, value, generation):
+                # Пока читали БД, ключ инвалидировали: значение могло устареть, не кешируем
+                return None if value is _MISSING else value
+
+        # Из Redis приходит копия маркера — приводим к самому маркеру
+        if value == _MISSING:
+            value = _MISSING
+        self._set_local(key, value)
+        return None if value is _MISSING else value
+
+    def _fill(self, key: str, value: dict, generation: Optional[bytes]) -> bool:
+        """
+        Кладёт прочитанное из БД значение в Redis, если поколение ключа всё ещё равно
+        generation и значения в Redis нет.
+
+        returns:
+            bool: False, если ключ инвалидировали или заполнили во время чтения
+        """
+        generation_key = self._generation_key(key)
+        try:
+            with r.pipeline() as pipe:
+                pipe.watch(generation_key)
+                if pipe.get(generation_key) != generation:
+                    return False
+                pipe.multi()
+                pipe.set(self._redis_key(key), json.dumps(value, ensure_ascii=False), ex=self.ttl, nx=True)
+                return bool(pipe.execute()[0])
+        except redis.WatchError:
+            return False
+        except redis.RedisError:
+            # Без Redis инвалидации не доходят и до других процессов — остаётся local_ttl
+            return True
+
+    def invalidate(self, key: str, value: Optional[dict] = None):
+        """
+        Удаляет ключ из обоих уровней и из LRU других процессов.
+        Если передано новое значение, оно сразу записывается в Redis (write-through),
+        и следующее чтение не идёт в БД.
+        """
+        self.drop_local(key)
+        try:
+            pipe = r.pipeline()
+            # Новое поколение отменяет заполнение ключа читателями, начавшими чтение раньше
+            pipe.incr(self._generation_key(key))
+            pipe.expire(self._generation_key(key), self.ttl)
+            if value is None:
+                pipe.delete(self._redis_key(key))
+            else:
+                pipe.set(self._redis_key(key), json.dumps(value, ensure_ascii=False), ex=self.ttl)
+            pipe.publish(INVALIDATION_CHANNEL, json.dumps([self.name, key]))
+            pipe.execute()
+        except redis.RedisError:
+            pass
+
+    def invalidate_on_commit(self, db: Session, key: str, value: Optional[dict] = None):
+        """
+        Откладывает invalidate до коммита транзакции сессии db: до коммита
+        параллельный читатель мог бы снова закешировать старую строку.
+        При откате транзакции ничего не делает.
+        """
+        db.info.setdefault("cache_invalidations", []).append((self, key, value))
+
+    def stats(self) -> dict:
+        local, remote, misses = self._local_hits.snapshot(), self._redis_hits.snapshot(), self._misses.snapshot()
+        total = local + remote + misses
+        return {
+            "local_hits": local,
+            "redis_hits": remote,
+            "misses": misses,
+            "hit_rate": round((local + remote) / total, 4) if total else 0.0
+        }
+
+
+_caches = {}
+_listener_pid = None
+_listener_lock = threading.Lock()
+
+
+def _ensure_listener():
+    """
+    Запускает поток, который удаляет из локальных LRU ключи, изменённые другими процессами.
+    Поток запускается в каждом процессе отдельно: после fork (prefork-пул Celery) его нет.
+    """
+    global _listener_pid
+    if _listener_pid == os.getpid():
+        return
+    with _listener_lock:
+        if _listener_pid == os.getpid():
+            return
+        _listener_pid = os.getpid()
+        # Локальные записи, унаследованные от родителя, могли устареть, пока поток не слушал
+        for cache in _caches.values():
+            with cache._lock:
+                cache._local.clear()
+
+    def run():
+        while True:
+            try:
+                pubsub = r.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(INVALIDATION_CHANNEL)
+                for message in pubsub.listen():
+                    name, key = json.loads(message["data"])
+                    if name in _caches:
+                        _caches[name].drop_local(key)
+            except redis.RedisError:
+                time.sleep(1)
+
+    threading.Thread(target=run, name="db-cache-invalidation", daemon=True).start()
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed(session: Session):
+    for cache, key, value in session.info.pop("cache_invalidations", []):
+        cache.invalidate(key, value)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_rolled_back(session: Session):
+    session.info.pop("cache_invalidations", None)
+
+
+def stats() -> dict:
+    """
+    Статистика попаданий всех кешей строк БД.
+    """
+    return {name: cache.stats() for name, cache in _caches.items()}
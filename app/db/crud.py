@@ -1,6 +1,42 @@
 from sqlalchemy.orm import Session
-from app.db.models import ArticleMetadata, UserSession
-from typing import Optional
+from sqlalchemy.dialects import postgresql, sqlite
+from datetime import datetime, timezone
+from app.db.models import ArticleMetadata, ArticleSummary, UserArticle, UserSession
+from app.db.cache import ReadThroughCache
+from app.config import USER_WORKING_SET_SIZE
+from typing import List, Optional
+
+_DIALECT_INSERTS = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+
+# Read-through кеш строк: в БД идём только за новыми пользователями и статьями
+session_cache = ReadThroughCache("user_session")
+article_cache = ReadThroughCache("article_metadata")
+user_articles_cache = ReadThroughCache("user_articles")
+
+_ARTICLE_FIELDS = ("arxiv_id", "title", "abstract", "conclusion")
+
+
+def _upsert(db: Session, model, rows: List[dict]):
+    """
+    Вставляет строки или обновляет существующие по первичному ключу одним запросом
+    (INSERT ... ON CONFLICT DO UPDATE в SQLite и PostgreSQL). Коммит не делает.
+    """
+    if not rows:
+        return
+
+    insert = _DIALECT_INSERTS.get(db.get_bind().dialect.name)
+    if insert is None:
+        for row in rows:
+            db.merge(model(**row))
+        return
+
+    keys = [c.name for c in model.__table__.primary_key.columns]
+    stmt = insert(model).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=keys,
+        set_={name: stmt.excluded[name] for name in rows[0] if name not in keys}
+    )
+    db.execute(stmt)
 
 
 def get_user_arxiv_id(db: Session, user_id: str) -> Optional[str]:
@@ -14,8 +50,35 @@ def get_user_arxiv_id(db: Session, user_id: str) -> Optional[str]:
     returns:
         Optional[str]: arxiv_id статьи, если найден
     """
-    session = db.query(UserSession).filter_by(user_id=user_id).first()
-    return session.arxiv_id if session else None
+    def load():
+        session = db.query(UserSession).filter_by(user_id=user_id).first()
+        return {"arxiv_id": session.arxiv_id} if session else None
+
+    row = session_cache.get(user_id, load)
+    return row["arxiv_id"] if row else None
+
+
+def get_user_articles(db: Session, user_id: str) -> List[str]:
+    """
+    Получает рабочий набор статей пользователя, начиная с последней добавленной.
+
+    args:
+        db (Session): Сессия SQLAlchemy
+        user_id (str): Telegram user ID
+
+    returns:
+        List[str]: arxiv_id статей (пустой список, если статей нет)
+    """
+    def load():
+        rows = (
+            db.query(UserArticle.arxiv_id)
+            .filter_by(user_id=user_id)
+            .order_by(UserArticle.added_at.desc())
+            .all()
+        )
+        return {"arxiv_ids": [row.arxiv_id for row in rows]}
+
+    return user_articles_cache.get(user_id, load)["arxiv_ids"]
 
 
 def get_article_by_id(db: Session, arxiv_id: str) -> Optional[ArticleMetadata]:
@@ -27,12 +90,17 @@ def get_article_by_id(db: Session, arxiv_id: str) -> Optional[ArticleMetadata]:
         arxiv_id (str): ID статьи
 
     returns:
-        Optional[ArticleMetadata]: Объект статьи или None
+        Optional[ArticleMetadata]: Объект статьи (не привязан к сессии) или None
     """
-    return db.query(ArticleMetadata).filter_by(arxiv_id=arxiv_id).first()
+    def load():
+        article = db.query(ArticleMetadata).filter_by(arxiv_id=arxiv_id).first()
+        return {name: getattr(article, name) for name in _ARTICLE_FIELDS} if article else None
 
+    row = article_cache.get(arxiv_id, load)
+    return ArticleMetadata(**row) if row else None
 
-def save_article_metadata(db: Session, arxiv_id: str, title: str, abstract: str, conclusion: str):
+
+def save_article_metadata(db: Session, arxiv_id: str, title: str, abstract: str, conclusion: str, commit: bool = True):
     """
     Сохраняет или обновляет метаданные статьи.
 
@@ -42,36 +110,135 @@ def save_article_metadata(db: Session, arxiv_id: str, title: str, abstract: str,
         title (str): Заголовок
         abstract (str): Аннотация
         conclusion (str): Заключение
+        commit (bool): Зафиксировать сразу (False — в составе внешней транзакции)
     """
-    article = get_article_by_id(db, arxiv_id)
-    if article:
-        article.title = title
-        article.abstract = abstract
-        article.conclusion = conclusion
-    else:
-        article = ArticleMetadata(
-            arxiv_id=arxiv_id,
-            title=title,
-            abstract=abstract,
-            conclusion=conclusion
-        )
-        db.add(article)
+    row = {"arxiv_id": arxiv_id, "title": title, "abstract": abstract, "conclusion": conclusion}
+    _upsert(db, ArticleMetadata, [row])
+    article_cache.invalidate_on_commit(db, arxiv_id, row)
+    if commit:
+        db.commit()
+
+
+def save_articles_metadata(db: Session, articles: List[dict]):
+    """
+    Сохраняет метаданные нескольких статей одним коммитом.
+
+    args:
+        db (Session): Сессия SQLAlchemy
+        articles (List[dict]): Статьи с ключами arxiv_id, title, abstract, conclusion
+    """
+    rows = [{name: a[name] for name in _ARTICLE_FIELDS} for a in articles]
+    _upsert(db, ArticleMetadata, rows)
+    for row in rows:
+        article_cache.invalidate_on_commit(db, row["arxiv_id"], row)
     db.commit()
 
 
-def register_user_session(db: Session, user_id: str, arxiv_id: str):
+def register_user_session(db: Session, user_id: str, arxiv_id: str, commit: bool = True):
+    """
+    Делает статью текущей для пользователя и добавляет её в рабочий набор.
+    Из набора вытесняются самые давние статьи сверх USER_WORKING_SET_SIZE.
+
+    args:
+        db (Session): Сессия SQLAlchemy
+        user_id (str): Telegram user ID
+        arxiv_id (str): ID статьи
+        commit (bool): Зафиксировать сразу (False — в составе внешней транзакции)
+    """
+    _upsert(db, UserSession, [{"user_id": user_id, "arxiv_id": arxiv_id}])
+    # Колонка без часового пояса: время UTC с точностью до микросекунд (порядок вытеснения из набора)
+    added_at = datetime.now(timezone.utc).replace(tzinfo=None)
+    _upsert(db, UserArticle, [{"user_id": user_id, "arxiv_id": arxiv_id, "added_at": added_at}])
+
+    stale = (
+        db.query(UserArticle.arxiv_id)
+        .filter_by(user_id=user_id)
+        .order_by(UserArticle.added_at.desc())
+        .offset(USER_WORKING_SET_SIZE)
+        .all()
+    )
+    if stale:
+        db.query(UserArticle).filter(
+            UserArticle.user_id == user_id,
+            UserArticle.arxiv_id.in_([row.arxiv_id for row in stale])
+        ).delete(synchronize_session=False)
+
+    session_cache.invalidate_on_commit(db, user_id, {"arxiv_id": arxiv_id})
+    user_articles_cache.invalidate_on_commit(db, user_id)
+    if commit:
+        db.commit()
+
+
+def remove_user_article(db: Session, user_id: str, arxiv_id: str):
     """
-    Регистрирует или обновляет сессию пользователя.
+    Убирает статью из рабочего набора пользователя. Если она была текущей,
+    текущей становится последняя из оставшихся.
 
     args:
         db (Session): Сессия SQLAlchemy
         user_id (str): Telegram user ID
         arxiv_id (str): ID статьи
     """
+    db.query(UserArticle).filter_by(user_id=user_id, arxiv_id=arxiv_id).delete(synchronize_session=False)
+
     session = db.query(UserSession).filter_by(user_id=user_id).first()
-    if session:
-        session.arxiv_id = arxiv_id
-    else:
-        session = UserSession(user_id=user_id, arxiv_id=arxiv_id)
-        db.add(session)
+    if session and session.arxiv_id == arxiv_id:
+        latest = (
+            db.query(UserArticle.arxiv_id)
+            .filter_by(user_id=user_id)
+            .order_by(UserArticle.added_at.desc())
+            .first()
+        )
+        if latest:
+            session.arxiv_id = latest.arxiv_id
+        else:
+            db.delete(session)
+        session_cache.invalidate_on_commit(db, user_id)
+
+    user_articles_cache.invalidate_on_commit(db, user_id)
+    db.commit()
+
+
+def save_ingested_article(db: Session, user_id: str, arxiv_id: str, title: str, abstract: str, conclusion: str):
+    """
+    Запись результата загрузки статьи одной транзакцией: метаданные и сессия пользователя.
+
+    args:
+        db (Session): Сессия SQLAlchemy
+        user_id (str): Telegram user ID
+        arxiv_id (str): ID статьи
+        title (str): Заголовок
+        abstract (str): Аннотация
+        conclusion (str): Заключение
+    """
+    save_article_metadata(db, arxiv_id, title, abstract, conclusion, commit=False)
+    register_user_session(db, user_id, arxiv_id, commit=False)
+    db.commit()
+
+
+def get_article_summary(db: Session, arxiv_id: str) -> Optional[str]:
+    """
+    Получает заранее сгенерированное резюме статьи.
+
+    args:
+        db (Session): Сессия SQLAlchemy
+        arxiv_id (str): ID статьи
+
+    returns:
+        Optional[str]: Резюме или None, если оно ещё не готово
+    """
+    row = db.query(ArticleSummary).filter_by(arxiv_id=arxiv_id).first()
+    return row.summary if row else None
+
+
+def save_article_summary(db: Session, arxiv_id: str, summary: str):
+    """
+    Сохраняет или обновляет резюме статьи.
+
+    args:
+        db (Session): Сессия SQLAlchemy
+        arxiv_id (str): ID статьи
+        summary (str): Резюме
+    """
+    _upsert(db, ArticleSummary, [{"arxiv_id": arxiv_id, "summary": summary}])
     db.commit()
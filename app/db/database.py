@@ -1,15 +1,64 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, inspect, select
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import sessionmaker, Session
-from contextlib import contextmanager
+from app.config import DATABASE_URL, DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_RECYCLE_SECONDS, SQLITE_BUSY_TIMEOUT_MS
+from app.db.models import Base, UserArticle, UserSession
 
-DATABASE_URL = "sqlite:///data/database.db"
+is_sqlite = DATABASE_URL.startswith("sqlite")
+
+if is_sqlite:
+    engine = create_engine(
+        DATABASE_URL,
+        connect_args={"check_same_thread": False, "timeout": SQLITE_BUSY_TIMEOUT_MS / 1000},
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW
+    )
+
+    @event.listens_for(engine, "connect")
+    def _sqlite_pragmas(dbapi_connection, connection_record):
+        # FastAPI и воркеры Celery пишут в один файл: WAL не блокирует читателей на время записи,
+        # synchronous=NORMAL в режиме WAL делает fsync только на чекпоинтах
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.close()
+else:
+    engine = create_engine(
+        DATABASE_URL,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_recycle=DB_POOL_RECYCLE_SECONDS,
+        pool_pre_ping=True
+    )
 
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
 SessionLocal = sessionmaker(bind=engine)
 
+def init_db():
+    """
+    Создаёт недостающие таблицы (существующие не изменяются).
+    При создании таблицы рабочих наборов в неё переносятся текущие статьи пользователей.
+    """
+    had_working_sets = inspect(engine).has_table(UserArticle.__tablename__)
+    Base.metadata.create_all(bind=engine)
+    if had_working_sets:
+        return
+
+    try:
+        with engine.begin() as conn:
+            conn.execute(
+                UserArticle.__table__.insert().from_select(
+                    ["user_id", "arxiv_id"],
+                    select(UserSession.user_id, UserSession.arxiv_id)
+                )
+            )
+    except IntegrityError:
+        # Перенос уже выполнил другой процесс, стартовавший одновременно
+        pass
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Text
+from sqlalchemy import Column, DateTime, String, Text, func
 from sqlalchemy.ext.declarative import declarative_base
 
 Base = declarative_base()
@@ -16,4 +16,22 @@ class UserSession(Base):
     __tablename__ = "user_sessions"
 
     user_id = Column(String, primary_key=True, index=True)
-    arxiv_id = Column(String, nullable=False)
\ No newline at end of file
+    arxiv_id = Column(String, nullable=False)
+
+
+class UserArticle(Base):
+    """
+    Рабочий набор статей пользователя. UserSession хранит текущую (последнюю загруженную) статью.
+    """
+    __tablename__ = "user_articles"
+
+    user_id = Column(String, primary_key=True, index=True)
+    arxiv_id = Column(String, primary_key=True)
+    added_at = Column(DateTime, nullable=False, server_default=func.now())
+
+
+class ArticleSummary(Base):
+    __tablename__ = "article_summaries"
+
+    arxiv_id = Column(String, primary_key=True, index=True)
+    summary = Column(Text, nullable=False)
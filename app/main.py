@@ -1,12 +1,21 @@
 from fastapi import FastAPI
-from app.api import summarize_async, ingest_async, ask_async, task_status
+from app.db.database import init_db
+from app.api import summarize_async, ingest_async, ask_async, task_status, task_stream, health, bulk_ingest, user_articles
 
 app = FastAPI(title="arXiv RAG API")
 
+@app.on_event("startup")
+def on_startup():
+    init_db()
+
 app.include_router(summarize_async.router, prefix="/summarize_async", tags=["Summarize_async"])
 app.include_router(ingest_async.router, prefix="/ingest_async", tags=["Ingest_async"])
 app.include_router(ask_async.router, prefix="/ask_async", tags=["Ask_async"])
 app.include_router(task_status.router, prefix="/task_status/{task_id}", tags=["Task_status"])
+app.include_router(task_stream.router, prefix="/task_stream/{task_id}", tags=["Task_stream"])
+app.include_router(bulk_ingest.router, prefix="/bulk_ingest", tags=["Bulk_ingest"])
+app.include_router(user_articles.router, prefix="/user_articles", tags=["User_articles"])
+app.include_router(health.router, prefix="/health", tags=["Health"])
 
 @app.get("/")
 def root():
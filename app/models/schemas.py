@@ -1,3 +1,4 @@
+from typing import List, Optional
 from pydantic import BaseModel
 
 
@@ -9,6 +10,15 @@ class IngestRequest(BaseModel):
 class QARequest(BaseModel):
     user_id: str
     question: str
+    # Искать ответ только в секциях с таким названием (например, "method")
+    section: Optional[str] = None
+    # Искать ответ по всем статьям рабочего набора пользователя (например, для сравнения статей)
+    all_articles: bool = False
+
+
+class BulkIngestRequest(BaseModel):
+    # arXiv ID/ссылки или пути к PDF, доступные воркерам
+    sources: List[str]
 
 
 class SummarizeRequest(BaseModel):
@@ -0,0 +1,325 @@
+import json
+import math
+import os
+import shutil
+import threading
+import uuid
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+import numpy as np
+from langchain.schema import Document
+
+from app.config import (
+    VECTOR_INDEX_DIR, VECTOR_INDEX_CACHE_SIZE, HYBRID_DEPTH, HYBRID_RRF_K,
+    MULTI_ARTICLE_MIN_PER_ARTICLE, MULTI_ARTICLE_STACK_CACHE_SIZE
+)
+from app.services.lexical_index import LexicalIndex
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+class ArticleIndex:
+    """
+    Индекс одной статьи: матрица нормированных эмбеддингов чанков, BM25-индекс и сами чанки.
+    Плотный поиск точный — одно матрично-векторное произведение.
+    """
+
+    def __init__(self, embeddings: np.ndarray, docs: List[Document], lexical: LexicalIndex):
+        self.embeddings = embeddings
+        self.docs = docs
+        self.lexical = lexical
+
+    def search(self, query_embedding: np.ndarray, k: int) -> List[Tuple[Document, float]]:
+        if not self.docs:
+            return []
+
+        scores = self.embeddings @ query_embedding
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(self.docs[i], float(scores[i])) for i in top]
+
+    def section_mask(self, section: str) -> Optional[np.ndarray]:
+        """
+        Маска чанков, путь секции которых содержит section (без учёта регистра).
+        None, если таких чанков нет — тогда поиск идёт по всей статье.
+        """
+        needle = section.lower()
+        mask = np.array([needle in doc.metadata.get("section", "").lower() for doc in self.docs], dtype=bool)
+        return mask if mask.any() else None
+
+    def hybrid_search(self, query: str, query_embedding: np.ndarray, k: int, depth: int = HYBRID_DEPTH, rrf_k: int = HYBRID_RRF_K, section: Optional[str] = None, dense_scores: Optional[np.ndarray] = None) -> List[Tuple[Document, float]]:
+        """
+        Гибридный поиск: depth лучших чанков по эмбеддингам и по BM25
+        объединяются по reciprocal rank fusion, возвращаются k лучших.
+        Если задан section, ищем только в подходящих секциях.
+        dense_scores — уже посчитанные косинусные близости чанков (поиск по нескольким статьям).
+
+        returns:
+            List[Tuple[Document, float]]: Чанки в порядке объединённого ранга с их косинусной близостью
+        """
+        if not self.docs:
+            return []
+
+        if dense_scores is None:
+            dense_scores = self.embeddings @ query_embedding
+        mask = self.section_mask(section) if section else None
+        allowed = np.flatnonzero(mask) if mask is not None else np.arange(len(dense_scores))
+
+        depth = min(depth, len(allowed))
+        dense = allowed[np.argpartition(-dense_scores[allowed], depth - 1)[:depth]]
+        dense = dense[np.argsort(-dense_scores[dense])]
+
+        if mask is None:
+            lexical = self.lexical.search(query, depth)
+        else:
+            lexical = [i for i in self.lexical.search(query, len(self.docs)) if mask[i]][:depth]
+
+        fused = {}
+        for ranking in (dense.tolist(), lexical):
+            for rank, i in enumerate(ranking):
+                fused[i] = fused.get(i, 0.0) + 1.0 / (rrf_k + rank + 1)
+
+        top = sorted(fused, key=lambda i: (-fused[i], -dense_scores[i]))[:k]
+        return [(self.docs[i], float(dense_scores[i])) for i in top]
+
+
+class ArticleIndexStore:
+    """
+    Хранилище векторных индексов с разбиением по статьям вместо общей коллекции Chroma
+    с фильтром по arxiv_id.
+
+    Раскладка на диске:
+        {root}/{arxiv_id}/embeddings.npy — float32-матрица (n_chunks, dim), строки нормированы
+        {root}/{arxiv_id}/chunks.json    — тексты и метаданные чанков в том же порядке
+        {root}/{arxiv_id}/lexical.npz    — BM25-индекс чанков (инвертированный индекс в CSR)
+
+    Недавно использованные статьи держатся в памяти (LRU на cache_size статей).
+
+    args:
+        embedding_function: Модель эмбеддингов для запросов
+        root (str): Каталог индексов
+        cache_size (int): Сколько статей держать в памяти
+    """
+
+    def __init__(self, embedding_function, root: str = VECTOR_INDEX_DIR, cache_size: int = VECTOR_INDEX_CACHE_SIZE):
+        self.embedding_function = embedding_function
+        self.root = root
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, ArticleIndex]" = OrderedDict()
+        self._stacked: "OrderedDict[Tuple[str, ...], tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    @staticmethod
+    def _dir_name(arxiv_id: str) -> str:
+        # В старых arXiv ID есть "/" (hep-th/9901001)
+        return arxiv_id.replace("/", "_")
+
+    def _article_dir(self, arxiv_id: str) -> str:
+        return os.path.join(self.root, self._dir_name(arxiv_id))
+
+    def has_article(self, arxiv_id: str) -> bool:
+        return os.path.exists(os.path.join(self._article_dir(arxiv_id), "chunks.json"))
+
+    def add_documents(self, arxiv_id: str, docs: List[Document], embeddings: List[List[float]]):
+        """
+        Записывает (или полностью заменяет) индекс статьи.
+
+        args:
+            arxiv_id (str): ID статьи
+            docs (List[Document]): Чанки статьи
+            embeddings (List[List[float]]): Эмбеддинги чанков в том же порядке
+        """
+        matrix = _normalize(np.asarray(embeddings, dtype=np.float32))
+        chunks = [{"text": doc.page_content, "metadata": doc.metadata} for doc in docs]
+
+        # Пишем во временный каталог и подменяем целиком, чтобы читатели не увидели половину индекса
+        tmp_dir = os.path.join(self.root, f".tmp-{self._dir_name(arxiv_id)}-{uuid.uuid4().hex}")
+        os.makedirs(tmp_dir)
+        np.save(os.path.join(tmp_dir, "embeddings.npy"), matrix)
+        with open(os.path.join(tmp_dir, "chunks.json"), "w", encoding="utf-8") as f:
+            json.dump(chunks, f, ensure_ascii=False)
+        LexicalIndex.build([doc.page_content for doc in docs]).save(os.path.join(tmp_dir, "lexical.npz"))
+
+        target = self._article_dir(arxiv_id)
+        old_dir = None
+        if os.path.exists(target):
+            old_dir = os.path.join(self.root, f".old-{self._dir_name(arxiv_id)}-{uuid.uuid4().hex}")
+            os.rename(target, old_dir)
+        os.rename(tmp_dir, target)
+        if old_dir:
+            shutil.rmtree(old_dir, ignore_errors=True)
+
+        with self._lock:
+            self._cache.pop(arxiv_id, None)
+
+    def get(self, arxiv_id: str) -> Optional[ArticleIndex]:
+        """
+        Возвращает индекс статьи из LRU или загружает его с диска.
+        """
+        with self._lock:
+            if arxiv_id in self._cache:
+                self._cache.move_to_end(arxiv_id)
+                return self._cache[arxiv_id]
+
+        if not self.has_article(arxiv_id):
+            return None
+
+        article_dir = self._article_dir(arxiv_id)
+        embeddings = np.load(os.path.join(article_dir, "embeddings.npy"))
+        with open(os.path.join(article_dir, "chunks.json"), encoding="utf-8") as f:
+            docs = [Document(page_content=c["text"], metadata=c["metadata"]) for c in json.load(f)]
+
+        # Индексы, созданные до появления BM25, достраиваем в памяти
+        lexical_path = os.path.join(article_dir, "lexical.npz")
+        if os.path.exists(lexical_path):
+            lexical = LexicalIndex.load(lexical_path)
+        else:
+            lexical = LexicalIndex.build([doc.page_content for doc in docs])
+        index = ArticleIndex(embeddings, docs, lexical)
+
+        with self._lock:
+            self._cache[arxiv_id] = index
+            self._cache.move_to_end(arxiv_id)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return index
+
+    def embed_query(self, query: str) -> np.ndarray:
+        return _normalize(np.asarray(self.embedding_function.embed_query(query), dtype=np.float32))
+
+    def _query_vector(self, query: str, query_embedding: Optional[List[float]]) -> np.ndarray:
+        if query_embedding is None:
+            return self.embed_query(query)
+        return _normalize(np.asarray(query_embedding, dtype=np.float32))
+
+    def search(self, arxiv_id: str, query: str, k: int = 5, query_embedding: Optional[List[float]] = None) -> List[Tuple[Document, float]]:
+        """
+        Точный поиск ближайших чанков внутри одной статьи.
+
+        args:
+            arxiv_id (str): ID статьи
+            query (str): Текст запроса
+            k (int): Кол-во результатов
+            query_embedding (Optional[List[float]]): Готовый эмбеддинг запроса
+
+        returns:
+            List[Tuple[Document, float]]: Чанки и косинусная близость, по убыванию
+        """
+        index = self.get(arxiv_id)
+        if index is None:
+            return []
+        return index.search(self._query_vector(query, query_embedding), k)
+
+    def hybrid_search(self, arxiv_id: str, query: str, k: int = 5, query_embedding: Optional[List[float]] = None, section: Optional[str] = None) -> List[Tuple[Document, float]]:
+        """
+        Гибридный (BM25 + эмбеддинги) поиск чанков внутри одной статьи.
+
+        args:
+            arxiv_id (str): ID статьи
+            query (str): Текст запроса
+            k (int): Кол-во результатов
+            query_embedding (Optional[List[float]]): Готовый эмбеддинг запроса
+            section (Optional[str]): Фильтр по пути секции
+
+        returns:
+            List[Tuple[Document, float]]: Чанки в порядке объединённого ранга с косинусной близостью
+        """
+        index = self.get(arxiv_id)
+        if index is None:
+            return []
+        return index.hybrid_search(query, self._query_vector(query, query_embedding), k, section=section)
+
+    def _stack(self, arxiv_ids: Tuple[str, ...], indexes: List[ArticleIndex]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Матрица эмбеддингов рабочего набора: матрицы статей подряд и границы статей в ней.
+        Склеенная матрица кешируется, пока статьи набора те же объекты ArticleIndex
+        (перезапись индекса или вытеснение из LRU дают новый объект — матрица пересобирается).
+        """
+        with self._lock:
+            entry = self._stacked.get(arxiv_ids)
+            if entry is not None and all(a is b for a, b in zip(entry[0], indexes)):
+                self._stacked.move_to_end(arxiv_ids)
+                return entry[1], entry[2]
+
+        matrix = np.concatenate([index.embeddings for index in indexes])
+        bounds = np.cumsum([0] + [len(index.docs) for index in indexes])
+        with self._lock:
+            self._stacked[arxiv_ids] = (tuple(indexes), matrix, bounds)
+            self._stacked.move_to_end(arxiv_ids)
+            while len(self._stacked) > MULTI_ARTICLE_STACK_CACHE_SIZE:
+                self._stacked.popitem(last=False)
+        return matrix, bounds
+
+    def multi_hybrid_search(self, arxiv_ids: List[str], query: str, k: int = 5, query_embedding: Optional[List[float]] = None, section: Optional[str] = None) -> List[Tuple[Document, float]]:
+        """
+        Гибридный поиск сразу по нескольким статьям. Эмбеддинг запроса считается один раз,
+        плотные оценки всех чанков набора — одним умножением склеенной матрицы (_stack).
+        BM25 остаётся по статьям: у каждой своя статистика IDF, а поиск по инвертированному
+        индексу стоит пропорционально числу вхождений слов запроса, а не числу чанков.
+        Из каждой статьи берётся небольшой список (не меньше MULTI_ARTICLE_MIN_PER_ARTICLE чанков)
+        с глубиной поиска по размеру этого списка. Списки сливаются по рангу внутри статьи —
+        так каждая статья представлена среди первых кандидатов (важно для сравнительных вопросов),
+        а при равном ранге выше чанк с большей косинусной близостью.
+
+        args:
+            arxiv_ids (List[str]): ID статей
+            query (str): Текст запроса
+            k (int): Кол-во кандидатов на все статьи (но не меньше MULTI_ARTICLE_MIN_PER_ARTICLE на статью)
+            query_embedding (Optional[List[float]]): Готовый эмбеддинг запроса
+            section (Optional[str]): Фильтр по пути секции
+
+        returns:
+            List[Tuple[Document, float]]: Чанки всех статей с косинусной близостью
+        """
+        found = [(arxiv_id, index) for arxiv_id, index in ((a, self.get(a)) for a in arxiv_ids) if index is not None and index.docs]
+        if not found:
+            return []
+
+        vector = self._query_vector(query, query_embedding)
+        per_article = max(MULTI_ARTICLE_MIN_PER_ARTICLE, math.ceil(k / len(found)))
+        depth = min(HYBRID_DEPTH, 2 * per_article)
+
+        indexes = [index for _, index in found]
+        matrix, bounds = self._stack(tuple(arxiv_id for arxiv_id, _ in found), indexes)
+        dense_scores = matrix @ vector
+
+        ranked = []
+        for index, start, end in zip(indexes, bounds[:-1], bounds[1:]):
+            results = index.hybrid_search(query, vector, per_article, depth=depth, section=section, dense_scores=dense_scores[start:end])
+            for rank, (doc, score) in enumerate(results):
+                ranked.append((rank, -score, doc))
+        ranked.sort(key=lambda item: item[:2])
+        return [(doc, -neg_score) for _, neg_score, doc in ranked]
+
+
+def migrate_from_chroma(store: ArticleIndexStore, persist_directory: str = "chroma_storage"):
+    """
+    Переносит чанки и эмбеддинги из общей коллекции Chroma в индексы по статьям.
+    """
+    from langchain.vectorstores import Chroma
+
+    collection = Chroma(persist_directory=persist_directory)._collection
+    data = collection.get(include=["documents", "metadatas", "embeddings"])
+
+    by_article = {}
+    for text, metadata, embedding in zip(data["documents"], data["metadatas"], data["embeddings"]):
+        by_article.setdefault(metadata["arxiv_id"], []).append((text, metadata, embedding))
+
+    for arxiv_id, rows in by_article.items():
+        docs = [
+            Document(page_content=text, metadata={**metadata, "chunk_id": i})
+            for i, (text, metadata, _) in enumerate(rows)
+        ]
+        store.add_documents(arxiv_id, docs, [embedding for _, _, embedding in rows])
+        print(f"{arxiv_id}: {len(docs)} чанков")
+
+
+if __name__ == "__main__":
+    migrate_from_chroma(ArticleIndexStore(embedding_function=None))
+    print("✅ Миграция векторного индекса завершена успешно.")
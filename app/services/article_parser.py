@@ -1,10 +1,50 @@
+import multiprocessing
 import re
-import requests
+import threading
+from bisect import bisect_left
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from typing import Optional, List, Tuple
-import arxiv
 import pymupdf4llm
 import fitz
 import hashlib
+from app.config import PARSE_WORKERS, PARSE_PAGES_PER_SHARD
+from app.services.pdf_store import get_pdf_store
+from app.services.arxiv_client import fetch_pdf
+
+# Новый формат (с 2007): 2401.12345v2; старый: hep-th/9901001v1, math.GT/0309136
+_ARXIV_ID = r'(\d{4}\.\d{4,5}|[a-z]+(?:-[a-z]+)*(?:\.[A-Z]{2})?/\d{7})(v\d+)?'
+_ARXIV_URL = re.compile(rf'arxiv\.org/(?:abs|pdf|html|format)/{_ARXIV_ID}', re.IGNORECASE)
+_ARXIV_BARE = re.compile(rf'(?:arxiv:)?{_ARXIV_ID}', re.IGNORECASE)
+_OLD_ID_SUBJECT_CLASS = re.compile(r'^([a-z\-]+)\.[A-Z]{2}/')
+
+
+def normalize_arxiv_id(source: str) -> Optional[str]:
+    """
+    Приводит ссылку или идентификатор arXiv к каноническому ID:
+    без версии, без префикса "arXiv:", у старых ID — без подкласса (math.GT/0309136 → math/0309136).
+    Все версии статьи сводятся к одному ID, загружается последняя.
+
+    Args:
+        source (str): Ссылка (abs/pdf/html) или сам ID.
+
+    Returns:
+        str: Канонический ID или None, если не удалось распознать.
+    """
+    source = source.strip()
+    match = _ARXIV_URL.search(source) or _ARXIV_BARE.fullmatch(source)
+    if not match:
+        return None
+    return _OLD_ID_SUBJECT_CLASS.sub(r'\1/', match.group(1))
+
+
+def arxiv_id_filename(arxiv_id: str) -> str:
+    """
+    Имя файла/каталога для ID: в старых ID есть "/".
+    """
+    return arxiv_id.replace("/", "_")
+
 
 def extract_arxiv_id(url: str) -> str:
     """
@@ -16,32 +56,133 @@ def extract_arxiv_id(url: str) -> str:
     Returns:
         str: Извлечённый ID или None, если не удалось.
     """
-    match = re.search(r'arxiv\.org/(abs|pdf)/([0-9]+\.[0-9]+)(v\d+)?', url)
-    return match.group(2) if match else None
+    return normalize_arxiv_id(url)
 
 
-def download_pdf(arxiv_id: str, save_path: str = "article.pdf") -> str:
+def download_pdf(arxiv_id: str, arxiv_meta: Optional[dict] = None) -> Tuple[str, str]:
     """
-    Скачивает PDF-файл по arXiv ID и сохраняет на диск.
+    Скачивает PDF-файл по arXiv ID в хранилище PDF (потоково, с докачкой и повторами).
 
     Args:
         arxiv_id (str): Идентификатор статьи на arXiv.
-        save_path (str): Путь, по которому сохранить файл.
+        arxiv_meta (dict): Уже полученные метаданные ({"title", "pdf_url"}), чтобы не запрашивать их снова.
 
     Returns:
-        Tuple[str, str]: Путь до сохранённого файла и название статьи.
+        Tuple[str, str]: sha256 файла в хранилище и название статьи.
     """
-    client = arxiv.Client()
-    search = arxiv.Search(id_list=[arxiv_id])
-    result = next(client.results(search))
-    pdf_url = result.pdf_url
-
-    response = requests.get(pdf_url)
-    with open(save_path, "wb") as f:
-        f.write(response.content)
-    return save_path, result.title
+    arxiv_meta = arxiv_meta or {}
+    return fetch_pdf(arxiv_id, get_pdf_store(), arxiv_meta.get("title"), arxiv_meta.get("pdf_url"))
     
 
+def section_heading_pattern(section: str, aliases: Optional[List[str]] = None) -> re.Pattern:
+    """
+    Регулярное выражение для markdown-заголовка секции (с учётом альтернативных названий).
+    """
+    all_keys = [section.lower()] + [a.lower() for a in aliases or []]
+
+    return re.compile(
+        rf'^#+\s*\**({"|".join(map(re.escape, all_keys))})\**.*$',
+        re.IGNORECASE | re.MULTILINE
+    )
+
+
+REFERENCES_PATTERN = section_heading_pattern("references")
+
+_pdf_pool = None
+_pdf_pool_lock = threading.Lock()
+
+
+def _get_pdf_pool() -> ProcessPoolExecutor:
+    """
+    Общий пул процессов для конвертации PDF; создаётся при первом обращении.
+    Процессы запускаются через forkserver (или spawn): fork многопоточного воркера Celery
+    может унаследовать захваченные другими потоками блокировки.
+    """
+    global _pdf_pool
+    with _pdf_pool_lock:
+        if _pdf_pool is None:
+            method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            _pdf_pool = ProcessPoolExecutor(max_workers=PARSE_WORKERS, mp_context=multiprocessing.get_context(method))
+        return _pdf_pool
+
+
+def _drop_pdf_pool(pool: ProcessPoolExecutor):
+    """
+    Убирает сломанный пул (упавший процесс MuPDF): следующий вызов _get_pdf_pool создаст новый.
+    """
+    global _pdf_pool
+    with _pdf_pool_lock:
+        if _pdf_pool is pool:
+            _pdf_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _convert_pages(pdf_path: str, pages: List[int], hdr_info) -> str:
+    return pymupdf4llm.to_markdown(pdf_path, pages=pages, hdr_info=hdr_info)
+
+
+def pdf_to_markdown(pdf_path: str, workers: int = PARSE_WORKERS, pages_per_shard: int = PARSE_PAGES_PER_SHARD) -> str:
+    """
+    Конвертирует PDF в markdown, параллельно обрабатывая диапазоны страниц в пуле процессов.
+
+    Диапазоны склеиваются строго по порядку. Как только в очередном диапазоне
+    найден заголовок References, оставшиеся страницы не конвертируются:
+    trim_markdown_after_section всё равно отбросит этот текст.
+
+    Args:
+        pdf_path (str): Путь к PDF.
+        workers (int): Сколько диапазонов конвертируется одновременно.
+        pages_per_shard (int): Страниц в одном диапазоне.
+
+    Returns:
+        str: Markdown документа (как минимум до раздела References).
+    """
+    with fitz.open(pdf_path) as doc:
+        page_count = doc.page_count
+        # Уровни заголовков определяем по всему документу, а не по отдельным диапазонам
+        hdr_info = pymupdf4llm.IdentifyHeaders(doc)
+
+    shards = [list(range(i, min(i + pages_per_shard, page_count))) for i in range(0, page_count, pages_per_shard)]
+
+    if workers <= 1 or len(shards) <= 1:
+        parts = []
+        for pages in shards:
+            parts.append(_convert_pages(pdf_path, pages, hdr_info))
+            if REFERENCES_PATTERN.search(parts[-1]):
+                break
+        return "".join(parts)
+
+    # Пул ломается целиком, если упал любой его процесс, — в том числе на PDF соседней задачи.
+    # Пробуем ещё раз на новом пуле; если ломается снова, виноват этот PDF
+    for attempt in range(2):
+        pool = _get_pdf_pool()
+        try:
+            return _convert_shards(pool, pdf_path, shards, hdr_info, workers)
+        except BrokenProcessPool:
+            _drop_pdf_pool(pool)
+            if attempt == 1:
+                raise
+
+
+def _convert_shards(pool: ProcessPoolExecutor, pdf_path: str, shards: List[List[int]], hdr_info, workers: int) -> str:
+    parts, in_flight = [], deque()
+    pending = deque(shards)
+
+    while pending and len(in_flight) < workers:
+        in_flight.append(pool.submit(_convert_pages, pdf_path, pending.popleft(), hdr_info))
+
+    while in_flight:
+        parts.append(in_flight.popleft().result())
+        if REFERENCES_PATTERN.search(parts[-1]):
+            for future in in_flight:
+                future.cancel()
+            break
+        if pending:
+            in_flight.append(pool.submit(_convert_pages, pdf_path, pending.popleft(), hdr_info))
+
+    return "".join(parts)
+
+
 def trim_markdown_after_section(md_text: str, section="references", aliases: Optional[List[str]] = None) -> str:
     """
     Удаляет всё из markdown-текста начиная с указанной секции (по умолчанию — References).
@@ -54,16 +195,33 @@ def trim_markdown_after_section(md_text: str, section="references", aliases: Opt
     Returns:
         str: Markdown до найденного заголовка.
     """
-    all_keys = [section.lower()] + [a.lower() for a in aliases or []]
-
-    pattern = re.compile(
-        rf'^#+\s*\**({"|".join(map(re.escape, all_keys))})\**.*$',
-        re.IGNORECASE | re.MULTILINE
-    )
+    pattern = section_heading_pattern(section, aliases)
     match = pattern.search(md_text)
     return md_text[:match.start()] if match else md_text
 
 
+# Правила очистки markdown. Применяются к склеенному тексту целиком, поэтому
+# вместо \s используется [^\S\n] — замены не должны переходить через границу строки
+_DROP_LINE = re.compile(r'-----|[\d\s\.,%]+')
+_CLEANUP_RULES = [
+    (re.compile(r'\*\[(,|\*|\d+)\]\*'), ''),
+    (re.compile(r'\*(,+|[^\S\n]*[,\.])\*'), ''),
+    (re.compile(r'^(#{1,6})[^\S\n]*\*\*(.*?)\*\*[^\S\n]*$', re.MULTILINE), r'\1 \2'),
+    (re.compile(r'\*{3,}'), '**'),
+    (re.compile(r'[^\S\n]{2,}'), ' '),
+]
+_EXTRA_BLANK_LINES = re.compile(r'\n{3,}')
+
+# Разбор заголовков секций
+_HEADING_MARKUP = re.compile(r'[\*\#]')
+_HEADING_MARKUP_TABLE = str.maketrans("", "", "*#")
+_SECTION_NUMBER_RUN = re.compile(r'[\d\.\+\s]*')
+_SECTION_NUMBER_PREFIX = re.compile(r'(\d+[\.\d+]*)?\s*')
+_SECTION_BOUNDARY = re.compile(r'^(\d+[\.\d+]*)?\s+\w+')
+_MD_HEADING = re.compile(r'^(#{1,6})[^\S\n]+(.+?)[^\S\n]*$', re.MULTILINE)
+_HEADING_NUMBER = re.compile(r'^(\d+(?:\.\d+)*)\.?\s')
+
+
 def clean_markdown_for_rag(md_raw: str) -> str:
     """
     Очищает markdown от визуального мусора, лишних символов и пустых строк.
@@ -74,37 +232,127 @@ def clean_markdown_for_rag(md_raw: str) -> str:
     Returns:
         str: Очищенный и нормализованный Markdown.
     """
-    lines = md_raw.splitlines()
-    cleaned_lines = []
+    # Убираем разделители страниц и строки из одних чисел
+    cleaned_text = "\n".join(
+        line for line in md_raw.splitlines()
+        if not _DROP_LINE.fullmatch(line.strip())
+    )
 
-    for line in lines:
-        stripped = line.strip()
+    for pattern, repl in _CLEANUP_RULES:
+        cleaned_text = pattern.sub(repl, cleaned_text)
 
-        if stripped == "-----":
-            continue
+    # Заменяем 3+ пустых строк подряд на 2
+    return _EXTRA_BLANK_LINES.sub('\n\n', cleaned_text)
 
-        if re.fullmatch(r'[\d\s\.,%]+', stripped):
-            continue
 
-        line = re.sub(r'\*\[(,|\*|\d+)\]\*', '', line)
-        line = re.sub(r'\*(,+|\s*[,\.])\*', '', line)
-        line = re.sub(r'^(#{1,6})\s*\*\*(.*?)\*\*\s*$', r'\1 \2', line)
-        line = re.sub(r'\*{3,}', '**', line)
-        line = re.sub(r'\s{2,}', ' ', line)
+class SectionIndex:
+    """
+    Индекс заголовков markdown-документа: строится за один проход по строкам
+    и затем отвечает на запросы любых секций без повторного сканирования текста.
 
-        cleaned_lines.append(line)
+    Args:
+        md_text (str): Markdown-документ.
+    """
 
-    # Склеиваем обратно и нормализуем множественные пустые строки
-    cleaned_text = "\n".join(cleaned_lines)
+    def __init__(self, md_text: str):
+        self.lines = md_text.splitlines()
+        # Название секции (без нумерации) → номер первой строки с таким заголовком
+        self._titles = {}
+        # Номера строк, которые считаются началом следующей секции
+        self._boundaries = []
+
+        for i, line in enumerate(self.lines):
+            line_clean = line.translate(_HEADING_MARKUP_TABLE).strip().lower()
+            # Быстрый путь для большинства строк: без нумерации в начале строка не может быть
+            # границей секции (она уже без ведущих пробелов), а её единственный вариант — она сама
+            if not line_clean[:1].isdigit() and line_clean[:1] not in (".", "+"):
+                self._titles.setdefault(line_clean, i)
+                continue
+            if _SECTION_BOUNDARY.match(line_clean):
+                self._boundaries.append(i)
+            for title in self._title_variants(line_clean):
+                self._titles.setdefault(title, i)
+
+    @staticmethod
+    def _title_variants(line_clean: str) -> List[str]:
+        """
+        Все варианты строки после отбрасывания нумерации вида "3.1 ".
+        """
+        run = _SECTION_NUMBER_RUN.match(line_clean).end()
+        return [
+            line_clean[pos:] for pos in range(run + 1)
+            if _SECTION_NUMBER_PREFIX.fullmatch(line_clean, 0, pos)
+        ]
+
+    def find(self, section: str, aliases: Optional[List[str]] = None) -> str:
+        """
+        Возвращает текст секции по заголовку, учитывая альтернативные варианты.
+
+        Args:
+            section (str): Название секции.
+            aliases (List[str]): Возможные альтернативы (например, 'summary' для 'abstract').
+
+        Returns:
+            str: Текст секции или пустая строка.
+        """
+        all_keys = [section.lower()] + [a.lower() for a in aliases or []]
+        found = [self._titles[key] for key in all_keys if key in self._titles]
+        if not found:
+            return ""
+
+        # Секция заканчивается на следующем заголовке
+        start_idx = min(found) + 1
+        pos = bisect_left(self._boundaries, start_idx)
+        end_idx = self._boundaries[pos] if pos < len(self._boundaries) else None
+
+        section_lines = self.lines[start_idx:end_idx] if end_idx else self.lines[start_idx:]
+        return "\n".join(section_lines).strip()
+
+
+def markdown_headings(md_text: str) -> List[Tuple[int, int, int, str]]:
+    """
+    Находит markdown-заголовки очищенного документа и их уровни в дереве секций.
 
-    # Заменяем 3+ пустых строк подряд на 2
-    cleaned_text = re.sub(r'\n{3,}', '\n\n', cleaned_text)
+    Уровень 1 — секции статьи. Для нумерованных заголовков уровень — глубина нумерации
+    ("3 Results" — 1, "3.1 Encoder" — 2). Ненумерованные отсчитываются от числа "#"
+    у секций: с тем же или меньшим числом "#" ("Abstract", "Conclusion", заголовок статьи) —
+    тоже уровень 1, каждый лишний "#" — на уровень глубже. Число "#" у секций берётся
+    с нумерованных заголовков первого уровня, а без нумерации — самое частое в документе.
+
+    Args:
+        md_text (str): Markdown-документ (после clean_markdown_for_rag).
+
+    Returns:
+        List[Tuple[int, int, int, str]]: (начало строки заголовка, конец строки, уровень, название)
+    """
+    matches = []
+    for match in _MD_HEADING.finditer(md_text):
+        title = _HEADING_MARKUP.sub('', match.group(2)).strip()
+        if title:
+            number = _HEADING_NUMBER.match(title)
+            depth = number.group(1).count('.') + 1 if number else None
+            matches.append((match, title, len(match.group(1)), depth))
+    if not matches:
+        return []
+
+    numbered = [hashes for _, _, hashes, depth in matches if depth == 1]
+    if numbered:
+        section_hashes = min(numbered)
+    else:
+        counts = Counter(hashes for _, _, hashes, _ in matches)
+        section_hashes = min(counts, key=lambda hashes: (-counts[hashes], hashes))
+
+    headings = []
+    for match, title, hashes, depth in matches:
+        level = depth if depth else max(1, hashes - section_hashes + 1)
+        headings.append((match.start(), match.end(), level, title))
+    return headings
 
-    return cleaned_text
 
 def extract_section(md_text: str, section: str, aliases: Optional[List[str]] = None) -> str:
     """
     Извлекает текст секции по заголовку, учитывая альтернативные варианты.
+    Для нескольких секций одного документа выгоднее один раз построить SectionIndex.
 
     Args:
         md_text (str): Markdown-документ.
@@ -114,33 +362,7 @@ def extract_section(md_text: str, section: str, aliases: Optional[List[str]] = N
     Returns:
         str: Извлечённый текст секции.
     """
-    lines = md_text.splitlines()
-    start_idx, end_idx = None, None
-
-    all_keys = [section.lower()] + [a.lower() for a in aliases or []]
-
-    # 1. Найдём заголовок секции
-    for i, line in enumerate(lines):
-        line_clean = re.sub(r'[\*\#]', '', line).strip().lower()
-        for key in all_keys:
-            if re.match(rf'^(\d+[\.\d+]*)?\s*{re.escape(key)}$', line_clean):
-                start_idx = i + 1
-                break
-        if start_idx:
-            break
-
-    if start_idx is None:
-        return ""
-
-    # 2. Поиск конца секции — следующего заголовка
-    for j in range(start_idx, len(lines)):
-        next_line_clean = re.sub(r'[\*\#]', '', lines[j]).strip().lower()
-        if re.match(r'^(\d+[\.\d+]*)?\s+\w+', next_line_clean):
-            end_idx = j
-            break
-
-    section_lines = lines[start_idx:end_idx] if end_idx else lines[start_idx:]
-    return "\n".join(section_lines).strip()
+    return SectionIndex(md_text).find(section, aliases)
 
 def extract_title_from_pdf(pdf_path: str) -> str:
     """
@@ -169,9 +391,33 @@ def extract_title_from_pdf(pdf_path: str) -> str:
         return ' '.join([x for x, size in candidate_titles if size == candidate_titles[0][1]])
 
 
-def parse_and_split_article(source: str, is_pdf: bool = False) -> Tuple[str, str, str, str, str]:
+def identify_pdf(pdf_path: str) -> Tuple[str, Optional[str]]:
+    """
+    Кладёт загруженный PDF в хранилище и узнаёт, разбирался ли уже такой файл.
+
+    Args:
+        pdf_path (str): Путь к PDF.
+
+    Returns:
+        Tuple[str, Optional[str]]: sha256 файла и ID статьи, если файл уже разбирался.
+    """
+    store = get_pdf_store()
+    sha = store.add_file(pdf_path)
+    parsed = store.load_parsed(sha)
+    return sha, parsed["arxiv_id"] if parsed else None
+
+
+def parse_and_split_article(source: str, is_pdf: bool = False, pdf_sha: Optional[str] = None, arxiv_meta: Optional[dict] = None) -> Tuple[str, str, str, str, str]:
     """
     Загружает и парсит статью либо по ссылке, либо из PDF.
+    Результат разбора хранится рядом с PDF в хранилище, так что повторный
+    разбор того же документа сводится к чтению с диска.
+
+    Args:
+        source (str): Ссылка/ID arXiv или путь к PDF.
+        is_pdf (bool): True, если source — PDF-файл.
+        pdf_sha (str): sha256 PDF, если файл уже положен в хранилище (identify_pdf).
+        arxiv_meta (dict): Метаданные arXiv ({"title", "pdf_url"}), если уже получены пакетным запросом.
 
     Returns:
         arxiv_id (str): либо настоящий arxiv_id, либо сгенерированный из title/hash
@@ -179,23 +425,44 @@ def parse_and_split_article(source: str, is_pdf: bool = False) -> Tuple[str, str
         md_cleaned (str): Markdown статья для векторизации
         abstract (str): Извлечённый текст из раздела Abstract
         conclusion (str): Извлечённый текст из раздела Conclusion
-        pdf_path (str): Путь к PDF
     """
+    store = get_pdf_store()
+
+    if is_pdf:
+        sha = pdf_sha or store.add_file(source)
+        parsed = store.load_parsed(sha)
+    else:
+        arxiv_id = extract_arxiv_id(source)
+        ref = f"arxiv_{arxiv_id_filename(arxiv_id)}"
+        sha = store.resolve(ref)
+        parsed = store.load_parsed(sha) if sha else None
+
+    if parsed:
+        return parsed["arxiv_id"], parsed["title"], parsed["md_cleaned"], parsed["abstract"], parsed["conclusion"]
+
     if is_pdf:
-        md_raw = pymupdf4llm.to_markdown(source)
+        pdf_path = store.pdf_path(sha)
+        md_raw = pdf_to_markdown(pdf_path)
 
-        title = extract_title_from_pdf(source)
+        title = extract_title_from_pdf(pdf_path)
         arxiv_id = hashlib.sha1(title.encode()).hexdigest()[:8]
 
     else:
-        arxiv_id = extract_arxiv_id(source)
-        pdf_path, title = download_pdf(arxiv_id, save_path=f"articles/{arxiv_id}.pdf")
-        md_raw = pymupdf4llm.to_markdown(pdf_path)
+        sha, title = download_pdf(arxiv_id, arxiv_meta)
+        store.link(ref, sha)
+        md_raw = pdf_to_markdown(store.pdf_path(sha))
 
     md_trimmed = trim_markdown_after_section(md_raw)
     md_cleaned = clean_markdown_for_rag(md_trimmed)
-    abstract = extract_section(md_cleaned, "abstract", ["absctract", "summary"])
-    conclusion = extract_section(md_cleaned, "conclusion", ["conclusions", "closing remarks"])
-
+    sections = SectionIndex(md_cleaned)
+    abstract = sections.find("abstract", ["absctract", "summary"])
+    conclusion = sections.find("conclusion", ["conclusions", "closing remarks"])
+
+    store.save_parsed(sha, {
+        "arxiv_id": arxiv_id,
+        "title": title,
+        "md_cleaned": md_cleaned,
+        "abstract": abstract,
+        "conclusion": conclusion
+    })
     return arxiv_id, title, md_cleaned, abstract, conclusion
-
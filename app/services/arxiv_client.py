@@ -0,0 +1,149 @@
+import hashlib
+import os
+import re
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional, Tuple
+
+import arxiv
+import requests
+from requests.adapters import HTTPAdapter
+
+from app.config import (
+    ARXIV_API_URL, ARXIV_PDF_URL, ARXIV_MAX_CONCURRENT_DOWNLOADS, ARXIV_MIN_INTERVAL_SECONDS,
+    ARXIV_DOWNLOAD_RETRIES, ARXIV_DOWNLOAD_TIMEOUT
+)
+from app.services import metrics
+from app.services.pdf_store import PdfStore
+
+download_seconds = metrics.histogram("arxiv_download_seconds", [0.5, 1, 2, 5, 10, 30, 60])
+download_retries = metrics.counter("arxiv_download_retries")
+
+_CHUNK_SIZE = 1 << 16
+_RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Общий для процесса пул соединений к arxiv.org
+_session = requests.Session()
+_session.mount("https://", HTTPAdapter(pool_maxsize=ARXIV_MAX_CONCURRENT_DOWNLOADS))
+_session.mount("http://", HTTPAdapter(pool_maxsize=ARXIV_MAX_CONCURRENT_DOWNLOADS))
+
+# Клиент API с встроенной паузой между запросами (правила arXiv — не чаще раза в 3 секунды)
+_client = arxiv.Client(page_size=100, delay_seconds=3, num_retries=3)
+_client.query_url_format = ARXIV_API_URL
+_client_lock = threading.Lock()
+
+# Ограничение на одновременные скачивания и минимальный интервал между их началом
+_download_slots = threading.BoundedSemaphore(ARXIV_MAX_CONCURRENT_DOWNLOADS)
+_rate_lock = threading.Lock()
+_last_request = 0.0
+
+
+def fetch_metadata(arxiv_ids: List[str]) -> Dict[str, arxiv.Result]:
+    """
+    Метаданные нескольких статей одним запросом к API arXiv.
+
+    args:
+        arxiv_ids (List[str]): Канонические ID (без версии)
+
+    returns:
+        Dict[str, arxiv.Result]: Результаты по ID; не найденные статьи отсутствуют
+    """
+    if not arxiv_ids:
+        return {}
+
+    search = arxiv.Search(id_list=list(arxiv_ids), max_results=len(arxiv_ids))
+    # arxiv.Client хранит время последнего запроса и не рассчитан на параллельные вызовы
+    with _client_lock:
+        results = list(_client.results(search))
+
+    return {re.sub(r'v\d+$', '', result.get_short_id()): result for result in results}
+
+
+def _wait_for_rate_limit():
+    global _last_request
+    with _rate_lock:
+        delay = _last_request + ARXIV_MIN_INTERVAL_SECONDS - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        _last_request = time.monotonic()
+
+
+def download_to_store(url: str, store: PdfStore) -> str:
+    """
+    Скачивает файл потоково прямо в хранилище, считая sha256 по ходу записи.
+    При обрыве соединения докачивает с места остановки (Range), при 429/5xx повторяет
+    запрос с экспоненциальной паузой.
+
+    args:
+        url (str): Адрес PDF
+        store (PdfStore): Хранилище PDF
+
+    returns:
+        str: sha256 файла
+    """
+    tmp_path = os.path.join(store.root, f".download-{uuid.uuid4().hex}.pdf")
+    digest = hashlib.sha256()
+    written = 0
+    started = time.perf_counter()
+
+    try:
+        with _download_slots, open(tmp_path, "wb") as f:
+            for attempt in range(ARXIV_DOWNLOAD_RETRIES + 1):
+                if attempt:
+                    download_retries.inc()
+                _wait_for_rate_limit()
+
+                headers = {"Range": f"bytes={written}-"} if written else {}
+                try:
+                    with _session.get(url, headers=headers, stream=True, timeout=ARXIV_DOWNLOAD_TIMEOUT) as response:
+                        if response.status_code in _RETRY_STATUSES and attempt < ARXIV_DOWNLOAD_RETRIES:
+                            retry_after = response.headers.get("Retry-After", "")
+                            time.sleep(float(retry_after) if retry_after.isdigit() else 2 ** attempt)
+                            continue
+                        response.raise_for_status()
+
+                        if written and response.status_code != 206:
+                            # Сервер не поддержал Range — начинаем заново
+                            f.seek(0)
+                            f.truncate()
+                            digest, written = hashlib.sha256(), 0
+
+                        for chunk in response.iter_content(_CHUNK_SIZE):
+                            f.write(chunk)
+                            digest.update(chunk)
+                            written += len(chunk)
+                    break
+                except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError):
+                    if attempt == ARXIV_DOWNLOAD_RETRIES:
+                        raise
+                    time.sleep(2 ** attempt)
+
+        download_seconds.observe(time.perf_counter() - started)
+        return store.commit(tmp_path, digest.hexdigest())
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def fetch_pdf(arxiv_id: str, store: PdfStore, title: Optional[str] = None, pdf_url: Optional[str] = None) -> Tuple[str, str]:
+    """
+    Находит статью в arXiv и скачивает её PDF в хранилище.
+
+    args:
+        arxiv_id (str): Канонический ID
+        store (PdfStore): Хранилище PDF
+        title (Optional[str]): Название, если метаданные уже получены (fetch_metadata)
+        pdf_url (Optional[str]): Ссылка на PDF из тех же метаданных
+
+    returns:
+        Tuple[str, str]: sha256 PDF и название статьи
+    """
+    if title is None or pdf_url is None:
+        result = fetch_metadata([arxiv_id]).get(arxiv_id)
+        if result is None:
+            raise ValueError(f"Статья {arxiv_id} не найдена в arXiv")
+        title, pdf_url = result.title, result.pdf_url
+
+    url = ARXIV_PDF_URL.format(arxiv_id=arxiv_id) if ARXIV_PDF_URL else pdf_url
+    return download_to_store(url, store), title
@@ -0,0 +1,158 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from app.services import metrics
+from app.services.streaming import RedisBatchStreamer
+
+batch_size_hist = metrics.histogram("llm_batch_size", [1, 2, 4, 8, 16, 32])
+queue_wait_hist = metrics.histogram("llm_queue_wait_ms", [1, 5, 10, 25, 50, 100, 250, 500, 1000, 5000])
+
+# Приоритеты генерации: живые запросы пользователей всегда обслуживаются раньше фоновых
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 1
+
+
+@dataclass
+class _PendingPrompt:
+    prompt: str
+    gen_kwargs: dict
+    stream_key: Optional[str] = None
+    priority: int = PRIORITY_INTERACTIVE
+    prefixes: Optional[List[str]] = None
+    future: Future = field(default_factory=Future)
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+
+class GenerationBatcher:
+    """
+    Планировщик динамического микро-батчинга для text-generation pipeline.
+
+    Промпты, пришедшие из разных Celery-задач в пределах окна max_wait_ms
+    (но не больше max_batch_size), прогоняются через модель одним
+    паддированным батчем, а каждый результат возвращается своей задаче через Future.
+
+    Фоновые промпты (PRIORITY_BACKGROUND) не смешиваются с интерактивными и
+    берутся в работу только когда интерактивных в очереди нет.
+
+    Если задан prefix_cache, одиночные промпты с известными префиксами генерируются
+    через него — prefill общих префиксов (системный промпт, контекст) не повторяется.
+    """
+
+    def __init__(self, llm, max_batch_size: int = 8, max_wait_ms: float = 50, prefix_cache=None):
+        self.llm = llm
+        self.prefix_cache = prefix_cache
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait_ms / 1000
+        self._queues = {PRIORITY_INTERACTIVE: deque(), PRIORITY_BACKGROUND: deque()}
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._loop, name="llm-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, prompt: str, stream_key: Optional[str] = None, priority: int = PRIORITY_INTERACTIVE, prefixes: Optional[List[str]] = None, **gen_kwargs) -> Future:
+        """
+        Ставит промпт в очередь на генерацию.
+
+        args:
+            prompt (str): Готовый промпт (после chat_template)
+            stream_key (Optional[str]): Redis stream для публикации токенов по мере генерации
+            priority (int): PRIORITY_INTERACTIVE или PRIORITY_BACKGROUND
+            prefixes (Optional[List[str]]): Общие префиксы промпта по возрастанию длины (для кеша KV)
+            **gen_kwargs: Параметры генерации
+
+        returns:
+            Future: Future, в который будет записан сгенерированный текст
+        """
+        item = _PendingPrompt(prompt, gen_kwargs, stream_key, priority, prefixes)
+        with self._cond:
+            self._queues[priority].append(item)
+            self._cond.notify()
+        return item.future
+
+    def pending(self, priority: int) -> int:
+        """
+        Количество промптов с данным приоритетом, ещё не отданных в генерацию.
+        """
+        with self._cond:
+            return len(self._queues[priority])
+
+    def generate(self, prompt: str, stream_key: Optional[str] = None, priority: int = PRIORITY_INTERACTIVE, prefixes: Optional[List[str]] = None, **gen_kwargs) -> str:
+        """
+        Синхронная обёртка над submit: блокирует вызывающую задачу до готовности ответа.
+        """
+        return self.submit(prompt, stream_key, priority, prefixes, **gen_kwargs).result()
+
+    def _collect(self) -> List[_PendingPrompt]:
+        interactive = self._queues[PRIORITY_INTERACTIVE]
+        background = self._queues[PRIORITY_BACKGROUND]
+
+        with self._cond:
+            while not interactive and not background:
+                self._cond.wait()
+
+            # Фоновые промпты не ждут окна: забираем только то, что уже лежит в очереди
+            if not interactive:
+                return [background.popleft() for _ in range(min(self.max_batch_size, len(background)))]
+
+            batch = [interactive.popleft()]
+            deadline = batch[0].enqueued_at + self.max_wait
+            while len(batch) < self.max_batch_size:
+                if interactive:
+                    batch.append(interactive.popleft())
+                    continue
+                # Окно ожидания истекло — работаем с тем, что уже накопилось
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                self._cond.wait(timeout)
+            return batch
+
+    def _loop(self):
+        while True:
+            batch = self._collect()
+
+            # Промпты с разными параметрами генерации нельзя объединить в один вызов
+            groups = {}
+            for item in batch:
+                key = tuple(sorted(item.gen_kwargs.items()))
+                groups.setdefault(key, []).append(item)
+
+            for items in groups.values():
+                self._run(items)
+
+    def _run(self, items: List[_PendingPrompt]):
+        started = time.monotonic()
+        for item in items:
+            queue_wait_hist.observe((started - item.enqueued_at) * 1000)
+        batch_size_hist.observe(len(items))
+
+        gen_kwargs = dict(items[0].gen_kwargs)
+        stream_keys = [item.stream_key for item in items]
+        if any(stream_keys):
+            gen_kwargs["streamer"] = RedisBatchStreamer(self.llm.tokenizer, stream_keys)
+
+        # Паддированный батч не может разделить один кеш префикса, поэтому кеш — только для одиночных промптов
+        if len(items) == 1 and items[0].prefixes and self.prefix_cache is not None:
+            item = items[0]
+            try:
+                item.future.set_result(self.prefix_cache.generate(item.prompt, item.prefixes, **gen_kwargs))
+            except Exception as e:
+                item.future.set_exception(e)
+            return
+
+        try:
+            outputs = self.llm(
+                [item.prompt for item in items],
+                batch_size=len(items),
+                **gen_kwargs
+            )
+        except Exception as e:
+            for item in items:
+                item.future.set_exception(e)
+            return
+
+        for item, output in zip(items, outputs):
+            item.future.set_result(output[0]["generated_text"])
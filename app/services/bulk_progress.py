@@ -0,0 +1,78 @@
+import time
+from typing import Optional
+
+import redis
+
+from app.config import REDIS_CACHE_URL, BULK_PROGRESS_TTL_SECONDS
+
+r = redis.Redis.from_url(REDIS_CACHE_URL)
+
+_COUNTERS = ("parsed", "indexed", "skipped", "failed")
+_MAX_ERRORS = 100
+
+# Прогресс массовой загрузки в Redis:
+#   bulk_ingest:{job_id}        — hash: total, parsed, indexed, skipped, failed, started_at, finished_at
+#   bulk_ingest:{job_id}:errors — последние ошибки ("источник: текст ошибки")
+
+
+def _key(job_id: str) -> str:
+    return f"bulk_ingest:{job_id}"
+
+
+def _errors_key(job_id: str) -> str:
+    return f"bulk_ingest:{job_id}:errors"
+
+
+def start(job_id: str, total: int):
+    key = _key(job_id)
+    pipe = r.pipeline()
+    pipe.hset(key, mapping={"total": total, "started_at": time.time(), **{c: 0 for c in _COUNTERS}})
+    pipe.expire(key, BULK_PROGRESS_TTL_SECONDS)
+    pipe.execute()
+
+
+def set_total(job_id: str, total: int):
+    r.hset(_key(job_id), "total", total)
+    _check_finished(job_id)
+
+
+def incr(job_id: str, field: str, n: int = 1):
+    r.hincrby(_key(job_id), field, n)
+    _check_finished(job_id)
+
+
+def fail(job_id: str, source: str, error: str):
+    pipe = r.pipeline()
+    pipe.rpush(_errors_key(job_id), f"{source}: {error}")
+    pipe.ltrim(_errors_key(job_id), -_MAX_ERRORS, -1)
+    pipe.expire(_errors_key(job_id), BULK_PROGRESS_TTL_SECONDS)
+    pipe.execute()
+    incr(job_id, "failed")
+
+
+def _check_finished(job_id: str):
+    total, indexed, skipped, failed = r.hmget(_key(job_id), "total", "indexed", "skipped", "failed")
+    if total is not None and int(indexed or 0) + int(skipped or 0) + int(failed or 0) >= int(total):
+        r.hsetnx(_key(job_id), "finished_at", time.time())
+
+
+def get(job_id: str) -> Optional[dict]:
+    """
+    Прогресс массовой загрузки и пропускная способность (статей в минуту).
+    """
+    raw = {k.decode(): v.decode() for k, v in r.hgetall(_key(job_id)).items()}
+    if not raw:
+        return None
+
+    progress = {"job_id": job_id, "total": int(raw["total"])}
+    progress.update({c: int(raw.get(c, 0)) for c in _COUNTERS})
+
+    started_at = float(raw["started_at"])
+    finished_at = float(raw["finished_at"]) if "finished_at" in raw else None
+    elapsed = (finished_at or time.time()) - started_at
+
+    progress["status"] = "completed" if finished_at else "running"
+    progress["elapsed_seconds"] = round(elapsed, 1)
+    progress["papers_per_min"] = round(progress["indexed"] / elapsed * 60, 2) if elapsed > 0 else 0.0
+    progress["errors"] = [e.decode() for e in r.lrange(_errors_key(job_id), 0, -1)]
+    return progress
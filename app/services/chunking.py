@@ -0,0 +1,69 @@
+from typing import List, Tuple
+
+from langchain.schema import Document
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+from app.config import CHUNK_SIZE, CHUNK_OVERLAP
+from app.services.article_parser import markdown_headings
+
+SECTION_SEPARATOR = " > "
+
+
+def split_sections(md_text: str) -> List[Tuple[List[str], int, int]]:
+    """
+    Разбивает markdown по дереву секций.
+
+    args:
+        md_text (str): Markdown-документ
+
+    returns:
+        List[Tuple[List[str], int, int]]: Путь секции (заголовки от корня) и границы её текста без заголовка
+    """
+    sections = []
+    stack: List[Tuple[int, str]] = []
+    body_start = 0
+
+    for start, end, level, title in markdown_headings(md_text):
+        sections.append(([t for _, t in stack], body_start, start))
+        while stack and stack[-1][0] >= level:
+            stack.pop()
+        stack.append((level, title))
+        body_start = end
+
+    sections.append(([t for _, t in stack], body_start, len(md_text)))
+    return [s for s in sections if md_text[s[1]:s[2]].strip()]
+
+
+def chunk_markdown(md_text: str, chunk_size: int = CHUNK_SIZE, chunk_overlap: int = CHUNK_OVERLAP) -> List[Document]:
+    """
+    Делит статью на чанки, не пересекающие границы секций.
+    В метаданные каждого чанка пишется путь секции и смещения в исходном markdown.
+
+    args:
+        md_text (str): Markdown-документ
+        chunk_size (int): Максимальный размер чанка в символах
+        chunk_overlap (int): Перекрытие соседних чанков одной секции
+
+    returns:
+        List[Document]: Чанки с метаданными section, char_start, char_end
+    """
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        separators=["\n\n", "\n", ". ", " ", ""],
+        add_start_index=True
+    )
+
+    docs = []
+    for path, start, end in split_sections(md_text):
+        for piece in splitter.create_documents([md_text[start:end]]):
+            offset = start + piece.metadata["start_index"]
+            docs.append(Document(
+                page_content=piece.page_content,
+                metadata={
+                    "section": SECTION_SEPARATOR.join(path),
+                    "char_start": offset,
+                    "char_end": offset + len(piece.page_content)
+                }
+            ))
+    return docs
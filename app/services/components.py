@@ -0,0 +1,174 @@
+import json
+import socket
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+import redis
+
+from app.config import REDIS_CACHE_URL, READINESS_TTL_SECONDS, WORKER_ROLES, WORKER_WARMUP
+
+r = redis.Redis.from_url(REDIS_CACHE_URL)
+
+STATE_PENDING = "pending"
+STATE_LOADING = "loading"
+STATE_WARMING = "warming"
+STATE_READY = "ready"
+STATE_FAILED = "failed"
+
+WORKER_NAME = socket.gethostname()
+
+
+def readiness_key(worker: str) -> str:
+    return f"worker_ready:{worker}"
+
+
+@dataclass
+class Component:
+    name: str
+    loader: Callable[[], None]
+    provides: List[str]
+    warmup: Optional[Callable[[], None]] = None
+    state: str = STATE_PENDING
+    load_seconds: Optional[float] = None
+    warmup_seconds: Optional[float] = None
+    error: Optional[str] = None
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+
+class ComponentRegistry:
+    """
+    Реестр тяжёлых компонентов воркера (LLM, эмбеддер, реранкер) с ленивой загрузкой.
+
+    Компонент загружается при первом обращении к одному из его атрибутов
+    в celery_globals или заранее в фоновом потоке (preload). После загрузки
+    выполняется прогрев — пробный вызов модели. Состояние и время загрузки
+    каждого компонента публикуются в Redis (worker_ready:{hostname}).
+
+    Зарегистрированы все компоненты, но готовность воркера определяется только теми,
+    что нужны его ролям (require): воркер embedding не загружает LLM и без неё готов.
+    """
+
+    def __init__(self):
+        self._components: Dict[str, Component] = {}
+        self._by_attr: Dict[str, str] = {}
+        # None — требуются все зарегистрированные компоненты
+        self._required: Optional[List[str]] = None
+
+    def register(self, name: str, loader: Callable[[], None], provides: List[str], warmup: Optional[Callable[[], None]] = None):
+        """
+        args:
+            name (str): Имя компонента
+            loader (Callable): Загружает компонент и записывает его в celery_globals
+            provides (List[str]): Атрибуты celery_globals, которые задаёт loader
+            warmup (Optional[Callable]): Пробный вызов для прогрева
+        """
+        self._components[name] = Component(name, loader, provides, warmup)
+        for attr in provides:
+            self._by_attr[attr] = name
+
+    def require(self, names: List[str]):
+        """
+        Задаёт компоненты, от которых зависит готовность воркера (нужные его ролям).
+        """
+        self._required = list(names)
+
+    def provider(self, attr: str) -> Optional[str]:
+        return self._by_attr.get(attr)
+
+    def ensure(self, name: str):
+        """
+        Загружает и прогревает компонент, если это ещё не сделано.
+        Параллельные вызовы ждут одной загрузки.
+        """
+        component = self._components[name]
+        if component.state == STATE_READY:
+            return
+
+        with component.lock:
+            if component.state == STATE_READY:
+                return
+            try:
+                self._set_state(component, STATE_LOADING)
+                started = time.perf_counter()
+                component.loader()
+                component.load_seconds = round(time.perf_counter() - started, 3)
+
+                if component.warmup and WORKER_WARMUP:
+                    self._set_state(component, STATE_WARMING)
+                    started = time.perf_counter()
+                    component.warmup()
+                    component.warmup_seconds = round(time.perf_counter() - started, 3)
+
+                component.error = None
+                self._set_state(component, STATE_READY)
+            except Exception as e:
+                component.error = str(e)
+                self._set_state(component, STATE_FAILED)
+                raise
+
+    def preload(self, names: Optional[List[str]] = None) -> threading.Thread:
+        """
+        Загружает компоненты в фоновом потоке, не задерживая старт воркера.
+        """
+        def run():
+            for name in names or list(self._components):
+                try:
+                    self.ensure(name)
+                except Exception as e:
+                    print(f"Не удалось загрузить компонент {name}: {e}")
+
+        thread = threading.Thread(target=run, name="components-preload", daemon=True)
+        thread.start()
+        return thread
+
+    def status(self) -> dict:
+        components = {
+            c.name: {
+                "state": c.state,
+                "load_seconds": c.load_seconds,
+                "warmup_seconds": c.warmup_seconds,
+                "error": c.error
+            }
+            for c in self._components.values()
+        }
+        required = list(self._components) if self._required is None else self._required
+        return {
+            "worker": WORKER_NAME,
+            "roles": WORKER_ROLES,
+            "ready": all(components[name]["state"] == STATE_READY for name in required),
+            "required": required,
+            "components": components,
+            "updated_at": time.time()
+        }
+
+    def publish(self):
+        try:
+            r.set(readiness_key(WORKER_NAME), json.dumps(self.status()), ex=READINESS_TTL_SECONDS)
+        except redis.RedisError as e:
+            print(f"Не удалось опубликовать готовность воркера: {e}")
+
+    def start_heartbeat(self) -> threading.Thread:
+        """
+        Периодически обновляет запись о готовности: пока воркер жив, ключ не истекает.
+        """
+        def run():
+            while True:
+                self.publish()
+                time.sleep(max(1, READINESS_TTL_SECONDS // 3))
+
+        thread = threading.Thread(target=run, name="components-heartbeat", daemon=True)
+        thread.start()
+        return thread
+
+    def _set_state(self, component: Component, state: str):
+        component.state = state
+        timings = ""
+        if state == STATE_READY:
+            timings = f" (загрузка {component.load_seconds} с, прогрев {component.warmup_seconds or 0} с)"
+        print(f"Компонент {component.name}: {state}{timings}")
+        self.publish()
+
+
+registry = ComponentRegistry()
@@ -0,0 +1,73 @@
+from typing import List, Tuple
+
+from app.config import CONTEXT_TOKEN_BUDGET
+
+CHUNK_SEPARATOR = "\n\n"
+
+
+def _count_tokens(tokenizer, text: str) -> int:
+    return len(tokenizer.encode(text, add_special_tokens=False))
+
+
+def _trim_overlap(chunk: dict, selected: List[dict]) -> str:
+    """
+    Убирает из чанка текст, который уже есть в выбранных чанках той же секции
+    (соседние чанки перекрываются на CHUNK_OVERLAP символов).
+    """
+    text = chunk["text"]
+    start, end = chunk.get("char_start"), chunk.get("char_end")
+    if start is None or end is None:
+        return text
+
+    s, e = start, end
+    for other in selected:
+        if other.get("arxiv_id") != chunk.get("arxiv_id") or other.get("char_start") is None:
+            continue
+        o_start, o_end = other["char_start"], other["char_end"]
+        if o_start <= s < o_end:
+            s = o_end
+        if o_start < e <= o_end:
+            e = o_start
+    if s >= e:
+        return ""
+    return text[s - start:e - start].strip()
+
+
+def build_context(chunks: List[dict], tokenizer, budget: int = CONTEXT_TOKEN_BUDGET, label_sources: bool = False) -> Tuple[str, List[str]]:
+    """
+    Собирает контекст из переранжированных чанков в пределах бюджета токенов.
+    Чанки берутся в порядке реранкинга; не помещающийся чанк пропускается,
+    а первый чанк при необходимости обрезается до бюджета.
+
+    args:
+        chunks (List[dict]): Чанки по убыванию релевантности: text и, если есть, arxiv_id, title, char_start, char_end
+        tokenizer: Токенизатор LLM
+        budget (int): Максимум токенов контекста
+        label_sources (bool): Подписывать фрагменты названием статьи (контекст из нескольких статей)
+
+    returns:
+        Tuple[str, List[str]]: Текст контекста и вошедшие в него фрагменты
+    """
+    selected, parts = [], []
+    used = 0
+
+    for chunk in chunks:
+        text = _trim_overlap(chunk, selected)
+        if not text:
+            continue
+        if label_sources:
+            text = f"[{chunk.get('title') or chunk.get('arxiv_id')}]\n{text}"
+
+        cost = _count_tokens(tokenizer, (CHUNK_SEPARATOR if parts else "") + text)
+        if used + cost > budget:
+            if parts:
+                continue
+            # Даже лучший чанк не помещается — берём его начало
+            ids = tokenizer.encode(text, add_special_tokens=False)[:budget]
+            text, cost = tokenizer.decode(ids), len(ids)
+
+        selected.append(chunk)
+        parts.append(text)
+        used += cost
+
+    return CHUNK_SEPARATOR.join(parts), parts
@@ -0,0 +1,138 @@
+import hashlib
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Tuple
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from app.config import EMBEDDING_CACHE_PATH, EMBEDDING_BATCH_SIZE
+
+
+def content_key(model_name: str, text: str) -> str:
+    """
+    Ключ кеша: хеш модели и текста чанка. Одинаковый текст из разных версий
+    статьи (v1 → v2) получает один и тот же ключ.
+    """
+    return hashlib.sha256(f"{model_name}\0{text}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Хранилище эмбеддингов на локальном диске: SQLite-таблица с float32-векторами в BLOB.
+
+    args:
+        path (str): Путь к файлу SQLite
+    """
+
+    # Ограничение SQLite на число параметров в одном запросе
+    _LOOKUP_CHUNK = 500
+
+    def __init__(self, path: str = EMBEDDING_CACHE_PATH):
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)")
+            self._conn.commit()
+
+    def get_many(self, keys: List[str]) -> Dict[str, List[float]]:
+        found = {}
+        with self._lock:
+            for i in range(0, len(keys), self._LOOKUP_CHUNK):
+                chunk = keys[i:i + self._LOOKUP_CHUNK]
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(chunk))})",
+                    chunk
+                ).fetchall()
+                for key, vector in rows:
+                    found[key] = np.frombuffer(vector, dtype=np.float32).tolist()
+        return found
+
+    def put_many(self, items: Dict[str, List[float]]):
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                [(key, np.asarray(vector, dtype=np.float32).tobytes()) for key, vector in items.items()]
+            )
+            self._conn.commit()
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Обёртка над моделью эмбеддингов: перед вызовом модели ищет векторы чанков
+    в EmbeddingCache, дубликаты внутри запроса считает один раз, а промахи
+    эмбеддит батчами по batch_size.
+
+    Статистика последнего вызова embed_documents доступна в last_stats,
+    поэтому на каждую загрузку статьи создаётся свой экземпляр.
+
+    args:
+        embedding_model: Модель эмбеддингов LangChain
+        cache (EmbeddingCache): Дисковый кеш
+        batch_size (int): Размер батча для промахов кеша
+    """
+
+    def __init__(self, embedding_model, cache: EmbeddingCache, batch_size: int = EMBEDDING_BATCH_SIZE):
+        self.embedding_model = embedding_model
+        self.model_name = getattr(embedding_model, "model_name", type(embedding_model).__name__)
+        self.cache = cache
+        self.batch_size = batch_size
+        self.last_stats = {}
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        vectors, self.last_stats = self.embed_with_stats(texts)
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embedding_model.embed_query(text)
+
+    def embed_with_stats(self, texts: List[str]) -> Tuple[List[List[float]], dict]:
+        """
+        Эмбеддит тексты с использованием кеша.
+
+        returns:
+            Tuple[List[List[float]], dict]: Векторы в порядке texts и статистика
+                (hits, misses, hit_rate, embed_seconds)
+        """
+        keys = [content_key(self.model_name, text) for text in texts]
+        unique = dict(zip(keys, texts))
+        vectors = self.cache.get_many(list(unique))
+
+        missing = [key for key in unique if key not in vectors]
+        started = time.perf_counter()
+        computed = {}
+        for i in range(0, len(missing), self.batch_size):
+            batch = missing[i:i + self.batch_size]
+            for key, vector in zip(batch, self.embedding_model.embed_documents([unique[k] for k in batch])):
+                computed[key] = vector
+        embed_seconds = time.perf_counter() - started
+
+        if computed:
+            self.cache.put_many(computed)
+            vectors.update(computed)
+
+        hits = len(unique) - len(missing)
+        stats = {
+            "hits": hits,
+            "misses": len(missing),
+            "hit_rate": hits / len(unique) if unique else 0.0,
+            "embed_seconds": round(embed_seconds, 3)
+        }
+        return [vectors[key] for key in keys], stats
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    """
+    Общий для процесса EmbeddingCache; файл открывается при первом обращении.
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = EmbeddingCache()
+        return _cache
@@ -0,0 +1,68 @@
+import json
+from typing import Optional
+
+import redis
+
+from app.config import REDIS_CACHE_URL, INGEST_LOCK_TTL_SECONDS, INGEST_RESULT_TTL_SECONDS
+from app.services import metrics
+
+r = redis.Redis.from_url(REDIS_CACHE_URL)
+
+collapsed = metrics.counter("ingest_collapsed")
+result_cache_hits = metrics.counter("ingest_result_cache_hits")
+
+# Снять блокировку может только её владелец
+_RELEASE_SCRIPT = r.register_script("""
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+""")
+
+
+def _result_key(arxiv_id: str) -> str:
+    return f"ingest_result:{arxiv_id}"
+
+
+def _lock_key(arxiv_id: str) -> str:
+    return f"ingest_lock:{arxiv_id}"
+
+
+def get_cached_result(arxiv_id: str) -> Optional[dict]:
+    """
+    Итог прошлой загрузки статьи (название, число чанков), если он ещё в кеше.
+    """
+    raw = r.get(_result_key(arxiv_id))
+    if raw is None:
+        return None
+    result_cache_hits.inc()
+    return json.loads(raw)
+
+
+def cache_result(arxiv_id: str, result: dict):
+    r.set(_result_key(arxiv_id), json.dumps(result, ensure_ascii=False), ex=INGEST_RESULT_TTL_SECONDS)
+
+
+def acquire_lock(arxiv_id: str, owner: str) -> Optional[str]:
+    """
+    Пытается стать единственным загрузчиком статьи.
+
+    args:
+        arxiv_id (str): ID статьи
+        owner (str): ID итоговой задачи цепочки загрузки
+
+    returns:
+        Optional[str]: None, если блокировка получена, иначе ID задачи, которая уже загружает статью
+    """
+    key = _lock_key(arxiv_id)
+    while True:
+        if r.set(key, owner, nx=True, ex=INGEST_LOCK_TTL_SECONDS):
+            return None
+        current = r.get(key)
+        # Блокировка могла истечь между SET и GET — пробуем ещё раз
+        if current is not None:
+            return current.decode()
+
+
+def release_lock(arxiv_id: str, owner: str):
+    _RELEASE_SCRIPT(keys=[_lock_key(arxiv_id)], args=[owner])
@@ -0,0 +1,115 @@
+import re
+from typing import Dict, List
+
+import numpy as np
+
+# Слова, идентификаторы и составные обозначения (bert-base, x_1, 3.5, ResNet-50)
+_TOKEN = re.compile(r"\w+(?:[-.]\w+)*")
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Разбивает текст на термы: составное обозначение даёт и сам терм, и его части,
+    чтобы "ResNet-50" находился и по "resnet-50", и по "resnet".
+    """
+    terms = []
+    for match in _TOKEN.findall(text.lower()):
+        terms.append(match)
+        if "-" in match or "." in match:
+            terms.extend(part for part in re.split(r"[-.]", match) if part)
+    return terms
+
+
+class LexicalIndex:
+    """
+    BM25-индекс чанков одной статьи в виде инвертированного индекса (CSR):
+    для терма terms[t] постинги лежат в doc_ids/tfs[offsets[t]:offsets[t + 1]].
+
+    args:
+        terms (np.ndarray): Отсортированный словарь
+        offsets (np.ndarray): Границы постингов, len(terms) + 1
+        doc_ids (np.ndarray): Номера чанков
+        tfs (np.ndarray): Частоты терма в чанке
+        doc_lens (np.ndarray): Длины чанков в термах
+    """
+
+    K1 = 1.2
+    B = 0.75
+
+    def __init__(self, terms: np.ndarray, offsets: np.ndarray, doc_ids: np.ndarray, tfs: np.ndarray, doc_lens: np.ndarray):
+        self.offsets = offsets
+        self.doc_ids = doc_ids
+        self.tfs = tfs
+        self.doc_lens = doc_lens
+        self.term_ids: Dict[str, int] = {term: i for i, term in enumerate(terms.tolist())}
+        self.avg_len = float(doc_lens.mean()) if len(doc_lens) else 0.0
+
+    @classmethod
+    def build(cls, texts: List[str]) -> "LexicalIndex":
+        postings: Dict[str, Dict[int, int]] = {}
+        doc_lens = []
+        for doc_id, text in enumerate(texts):
+            tokens = tokenize(text)
+            doc_lens.append(len(tokens))
+            for token in tokens:
+                counts = postings.setdefault(token, {})
+                counts[doc_id] = counts.get(doc_id, 0) + 1
+
+        terms = sorted(postings)
+        offsets = np.zeros(len(terms) + 1, dtype=np.int32)
+        doc_ids, tfs = [], []
+        for i, term in enumerate(terms):
+            for doc_id, tf in sorted(postings[term].items()):
+                doc_ids.append(doc_id)
+                tfs.append(tf)
+            offsets[i + 1] = len(doc_ids)
+
+        return cls(
+            np.array(terms, dtype=str),
+            offsets,
+            np.asarray(doc_ids, dtype=np.int32),
+            np.minimum(np.asarray(tfs, dtype=np.int64), np.iinfo(np.uint16).max).astype(np.uint16),
+            np.asarray(doc_lens, dtype=np.int32)
+        )
+
+    def save(self, path: str):
+        terms = sorted(self.term_ids, key=self.term_ids.get)
+        np.savez_compressed(
+            path,
+            terms=np.array(terms, dtype=str),
+            offsets=self.offsets,
+            doc_ids=self.doc_ids,
+            tfs=self.tfs,
+            doc_lens=self.doc_lens
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "LexicalIndex":
+        with np.load(path) as data:
+            return cls(data["terms"], data["offsets"], data["doc_ids"], data["tfs"], data["doc_lens"])
+
+    def search(self, query: str, k: int) -> List[int]:
+        """
+        Возвращает номера k лучших по BM25 чанков (только с ненулевой оценкой), по убыванию.
+        """
+        n_docs = len(self.doc_lens)
+        if not n_docs:
+            return []
+
+        scores = np.zeros(n_docs, dtype=np.float32)
+        norm = self.K1 * (1 - self.B + self.B * self.doc_lens / max(self.avg_len, 1e-9))
+        for term in set(tokenize(query)):
+            t = self.term_ids.get(term)
+            if t is None:
+                continue
+            start, end = self.offsets[t], self.offsets[t + 1]
+            ids, tf = self.doc_ids[start:end], self.tfs[start:end].astype(np.float32)
+            idf = np.log(1 + (n_docs - len(ids) + 0.5) / (len(ids) + 0.5))
+            scores[ids] += idf * tf * (self.K1 + 1) / (tf + norm[ids])
+
+        matched = np.flatnonzero(scores)
+        if not len(matched):
+            return []
+        k = min(k, len(matched))
+        top = matched[np.argpartition(-scores[matched], k - 1)[:k]]
+        return top[np.argsort(-scores[top])].tolist()
@@ -0,0 +1,161 @@
+import json
+import threading
+from abc import ABC, abstractmethod
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Iterable, List, Optional
+
+import requests
+
+from app.config import (
+    LLM_SERVER_URL, LLM_SERVER_MODEL, LLM_HTTP_CONCURRENCY, LLM_HTTP_TIMEOUT,
+    LLAMACPP_MODEL_PATH, LLAMACPP_THREADS, LLAMACPP_CTX, PREFIX_CACHE_MAX_MB
+)
+from app.services.batching import PRIORITY_INTERACTIVE, PRIORITY_BACKGROUND
+from app.services.streaming import publish_token, publish_end
+
+# Интерфейс бэкенда генерации, которым пользуются задачи ask и summarize
+# (его же реализует GenerationBatcher для встроенного transformers pipeline):
+#   submit(prompt, stream_key=None, priority=..., prefixes=None, **gen_kwargs) -> Future[str]
+#   generate(...) -> str
+#   pending(priority) -> int
+
+
+class ThreadedBackend(ABC):
+    """
+    Основа для бэкендов, генерирующих вне процесса батчера: каждый промпт
+    выполняется в пуле потоков своего приоритета, фоновые промпты не занимают
+    больше background_workers потоков.
+
+    args:
+        workers (int): Потоков для интерактивных промптов
+        background_workers (int): Потоков для фоновых промптов
+    """
+
+    def __init__(self, workers: int, background_workers: int = 1):
+        self._pools = {
+            PRIORITY_INTERACTIVE: ThreadPoolExecutor(max_workers=workers, thread_name_prefix="llm"),
+            PRIORITY_BACKGROUND: ThreadPoolExecutor(max_workers=background_workers, thread_name_prefix="llm-bg"),
+        }
+        self._pending = {PRIORITY_INTERACTIVE: 0, PRIORITY_BACKGROUND: 0}
+        self._lock = threading.Lock()
+
+    def submit(self, prompt: str, stream_key: Optional[str] = None, priority: int = PRIORITY_INTERACTIVE, prefixes: Optional[List[str]] = None, **gen_kwargs) -> Future:
+        with self._lock:
+            self._pending[priority] += 1
+        return self._pools[priority].submit(self._run, prompt, stream_key, priority, gen_kwargs)
+
+    def generate(self, prompt: str, stream_key: Optional[str] = None, priority: int = PRIORITY_INTERACTIVE, prefixes: Optional[List[str]] = None, **gen_kwargs) -> str:
+        return self.submit(prompt, stream_key, priority, prefixes, **gen_kwargs).result()
+
+    def pending(self, priority: int) -> int:
+        with self._lock:
+            return self._pending[priority]
+
+    def _run(self, prompt: str, stream_key: Optional[str], priority: int, gen_kwargs: dict) -> str:
+        with self._lock:
+            self._pending[priority] -= 1
+
+        if not stream_key:
+            return "".join(self._complete(prompt, stream=False, **gen_kwargs))
+
+        parts = []
+        for piece in self._complete(prompt, stream=True, **gen_kwargs):
+            if piece:
+                parts.append(piece)
+                publish_token(stream_key, piece)
+        publish_end(stream_key)
+        return "".join(parts)
+
+    @abstractmethod
+    def _complete(self, prompt: str, stream: bool, **gen_kwargs) -> Iterable[str]:
+        """
+        Генерирует ответ на промпт; при stream=True отдаёт его по частям по мере генерации.
+        """
+
+
+def _sampling_params(gen_kwargs: dict) -> dict:
+    """
+    Переводит параметры transformers.generate в параметры completions API.
+    """
+    params = {k: gen_kwargs[k] for k in ("temperature", "top_p", "top_k", "min_p") if k in gen_kwargs}
+    if "max_new_tokens" in gen_kwargs:
+        params["max_tokens"] = gen_kwargs["max_new_tokens"]
+    return params
+
+
+class OpenAICompatibleBackend(ThreadedBackend):
+    """
+    Генерация через локальный OpenAI-совместимый сервер (llama.cpp server, vLLM и т.п.)
+    по /v1/completions. Промпт уже собран chat_template на стороне воркера,
+    батчинг выполняет сам сервер (continuous batching).
+
+    args:
+        base_url (str): Адрес сервера
+        model (str): Имя модели на сервере
+        concurrency (int): Сколько запросов держать одновременно
+        timeout (float): Таймаут запроса, сек
+    """
+
+    def __init__(self, base_url: str = LLM_SERVER_URL, model: str = LLM_SERVER_MODEL, concurrency: int = LLM_HTTP_CONCURRENCY, timeout: float = LLM_HTTP_TIMEOUT):
+        super().__init__(workers=concurrency, background_workers=max(1, concurrency // 4))
+        self.url = f"{base_url.rstrip('/')}/v1/completions"
+        self.model = model
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_maxsize=concurrency + max(1, concurrency // 4))
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def _complete(self, prompt: str, stream: bool, **gen_kwargs) -> Iterable[str]:
+        payload = {"model": self.model, "prompt": prompt, "stream": stream, **_sampling_params(gen_kwargs)}
+        with self.session.post(self.url, json=payload, stream=stream, timeout=self.timeout) as response:
+            response.raise_for_status()
+            if not stream:
+                yield response.json()["choices"][0]["text"]
+                return
+
+            # Server-sent events: строки "data: {...}", в конце "data: [DONE]".
+            # SSE всегда в UTF-8, а charset серверы обычно не указывают: строки читаются байтами
+            # и декодируются сами (иначе requests взял бы ISO-8859-1 и резал строки по U+0085)
+            for raw in response.iter_lines():
+                line = raw.decode("utf-8")
+                if not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    break
+                yield json.loads(data)["choices"][0].get("text", "")
+
+
+class LlamaCppBackend(ThreadedBackend):
+    """
+    Квантованная модель (GGUF) на CPU через llama-cpp-python.
+    Модель однопоточна по запросам, поэтому вызовы сериализуются; повторные
+    префиксы промптов переиспользуются встроенным кешем llama.cpp.
+
+    args:
+        model_path (str): Путь к GGUF-файлу
+        n_threads (int): Потоков CPU
+        n_ctx (int): Размер контекста
+    """
+
+    def __init__(self, model_path: str = LLAMACPP_MODEL_PATH, n_threads: int = LLAMACPP_THREADS, n_ctx: int = LLAMACPP_CTX):
+        try:
+            from llama_cpp import Llama, LlamaRAMCache
+        except ImportError as e:
+            raise ImportError("LLM_BACKEND=llamacpp требует llama-cpp-python: pip install -r requirements/requirements-llamacpp.txt") from e
+
+        super().__init__(workers=1, background_workers=1)
+        self.llm = Llama(model_path=model_path, n_threads=n_threads or None, n_ctx=n_ctx, verbose=False)
+        if PREFIX_CACHE_MAX_MB > 0:
+            self.llm.set_cache(LlamaRAMCache(capacity_bytes=PREFIX_CACHE_MAX_MB * 1024 * 1024))
+        self._model_lock = threading.Lock()
+
+    def _complete(self, prompt: str, stream: bool, **gen_kwargs) -> Iterable[str]:
+        with self._model_lock:
+            output = self.llm.create_completion(prompt, stream=stream, **_sampling_params(gen_kwargs))
+            if not stream:
+                yield output["choices"][0]["text"]
+                return
+            for chunk in output:
+                yield chunk["choices"][0]["text"]
@@ -0,0 +1,90 @@
+import threading
+from bisect import bisect_left
+from typing import Dict, List, Sequence, Union
+
+
+class Histogram:
+    """
+    Простая потокобезопасная гистограмма с фиксированными границами корзин.
+    Значения больше последней границы попадают в корзину "+Inf".
+    """
+
+    def __init__(self, name: str, buckets: Sequence[float]):
+        self.name = name
+        self.buckets: List[float] = sorted(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        idx = bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[idx] += 1
+            self._sum += value
+            self._count += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            counts = list(self._counts)
+            total, count = self._sum, self._count
+
+        labels = [str(b) for b in self.buckets] + ["+Inf"]
+        return {
+            "buckets": dict(zip(labels, counts)),
+            "count": count,
+            "sum": total,
+            "avg": total / count if count else 0.0,
+        }
+
+
+class Counter:
+    """
+    Потокобезопасный монотонный счётчик.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1):
+        with self._lock:
+            self._value += amount
+
+    def snapshot(self) -> float:
+        with self._lock:
+            return self._value
+
+
+_registry: Dict[str, Union[Histogram, Counter]] = {}
+_registry_lock = threading.Lock()
+
+
+def histogram(name: str, buckets: Sequence[float]) -> Histogram:
+    """
+    Возвращает гистограмму по имени, создавая её при первом обращении.
+    """
+    with _registry_lock:
+        if name not in _registry:
+            _registry[name] = Histogram(name, buckets)
+        return _registry[name]
+
+
+def counter(name: str) -> Counter:
+    """
+    Возвращает счётчик по имени, создавая его при первом обращении.
+    """
+    with _registry_lock:
+        if name not in _registry:
+            _registry[name] = Counter(name)
+        return _registry[name]
+
+
+def snapshot() -> dict:
+    """
+    Снимок всех зарегистрированных метрик процесса.
+    """
+    with _registry_lock:
+        items = list(_registry.items())
+    return {name: h.snapshot() for name, h in items}
@@ -0,0 +1,171 @@
+import hashlib
+import json
+import os
+import threading
+import uuid
+from typing import Iterable, Optional
+
+from app.config import PDF_STORE_DIR, PDF_STORE_MAX_MB
+
+_BLOCK_SIZE = 1 << 20
+
+
+class PdfStore:
+    """
+    Хранилище PDF с адресацией по содержимому (sha256 байтов файла).
+
+    Раскладка на диске:
+        {root}/blobs/{sha[:2]}/{sha}/paper.pdf   — сам PDF (вытесняется при превышении max_bytes)
+        {root}/blobs/{sha[:2]}/{sha}/parsed.json — результат парсинга (ID, название, markdown, секции)
+        {root}/refs/{name}                       — sha документа по внешнему имени (arxiv_{id})
+
+    Один и тот же файл, загруженный разными пользователями или повторно, хранится
+    и парсится один раз. Разобранные артефакты не вытесняются: они маленькие,
+    а повторная загрузка статьи с ними сводится к чтению с диска.
+
+    args:
+        root (str): Каталог хранилища
+        max_bytes (int): Предельный суммарный размер PDF
+    """
+
+    def __init__(self, root: str = PDF_STORE_DIR, max_bytes: int = PDF_STORE_MAX_MB * 1024 * 1024):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._evict_lock = threading.Lock()
+        os.makedirs(os.path.join(root, "blobs"), exist_ok=True)
+        os.makedirs(os.path.join(root, "refs"), exist_ok=True)
+
+    def _blob_dir(self, sha: str) -> str:
+        return os.path.join(self.root, "blobs", sha[:2], sha)
+
+    def pdf_path(self, sha: str) -> str:
+        return os.path.join(self._blob_dir(sha), "paper.pdf")
+
+    def has_pdf(self, sha: str) -> bool:
+        return os.path.exists(self.pdf_path(sha))
+
+    def put_stream(self, chunks: Iterable[bytes]) -> str:
+        """
+        Записывает PDF из потока байтов, считая sha256 по ходу записи.
+
+        returns:
+            str: sha256 документа
+        """
+        tmp_path = os.path.join(self.root, f".tmp-{uuid.uuid4().hex}.pdf")
+        digest = hashlib.sha256()
+        try:
+            with open(tmp_path, "wb") as f:
+                for chunk in chunks:
+                    digest.update(chunk)
+                    f.write(chunk)
+            return self.commit(tmp_path, digest.hexdigest())
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def add_file(self, path: str) -> str:
+        """
+        Переносит готовый файл (например, PDF, скачанный ботом) в хранилище.
+        Файл читается один раз для хеширования и перемещается без копирования.
+
+        returns:
+            str: sha256 документа
+        """
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(_BLOCK_SIZE), b""):
+                digest.update(chunk)
+        sha = digest.hexdigest()
+
+        if os.path.abspath(path) == os.path.abspath(self.pdf_path(sha)):
+            return sha
+        return self.commit(path, sha)
+
+    def commit(self, path: str, sha: str) -> str:
+        """
+        Переносит файл с уже посчитанным sha256 в хранилище.
+        """
+        target = self.pdf_path(sha)
+        if os.path.exists(target):
+            # Такой документ уже есть — дубликат не нужен
+            os.remove(path)
+            os.utime(target)
+        else:
+            os.makedirs(self._blob_dir(sha), exist_ok=True)
+            os.replace(path, target)
+            os.utime(target)
+            self.evict()
+        return sha
+
+    def load_parsed(self, sha: str) -> Optional[dict]:
+        path = os.path.join(self._blob_dir(sha), "parsed.json")
+        if not os.path.exists(path):
+            return None
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def save_parsed(self, sha: str, parsed: dict):
+        os.makedirs(self._blob_dir(sha), exist_ok=True)
+        path = os.path.join(self._blob_dir(sha), "parsed.json")
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(parsed, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def resolve(self, name: str) -> Optional[str]:
+        """
+        sha документа по внешнему имени или None.
+        """
+        try:
+            with open(os.path.join(self.root, "refs", name), encoding="utf-8") as f:
+                return f.read().strip()
+        except FileNotFoundError:
+            return None
+
+    def link(self, name: str, sha: str):
+        path = os.path.join(self.root, "refs", name)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(sha)
+        os.replace(tmp_path, path)
+
+    def evict(self):
+        """
+        Удаляет давно не использованные PDF (по mtime), пока суммарный размер больше max_bytes.
+        """
+        with self._evict_lock:
+            pdfs = []
+            blobs = os.path.join(self.root, "blobs")
+            for prefix in os.listdir(blobs):
+                for sha in os.listdir(os.path.join(blobs, prefix)):
+                    path = self.pdf_path(sha)
+                    try:
+                        stat = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    pdfs.append((stat.st_mtime, stat.st_size, path))
+
+            total = sum(size for _, size, _ in pdfs)
+            for _, size, path in sorted(pdfs):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                    total -= size
+                except FileNotFoundError:
+                    pass
+
+
+_store: Optional[PdfStore] = None
+_store_lock = threading.Lock()
+
+
+def get_pdf_store() -> PdfStore:
+    """
+    Общее для процесса хранилище PDF (создаётся при первом обращении).
+    """
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = PdfStore()
+        return _store
@@ -0,0 +1,147 @@
+import copy
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import List, Tuple
+
+from app.config import PREFIX_CACHE_MAX_MB
+from app.services import metrics
+
+prefill_saved_hist = metrics.histogram("llm_prefill_tokens_saved", [0, 64, 128, 256, 512, 1024, 2048])
+prefix_hits = metrics.counter("prefix_cache_hits")
+prefix_misses = metrics.counter("prefix_cache_misses")
+
+
+def chat_prefixes(tokenizer, messages: List[dict], boundaries: List[int]) -> List[str]:
+    """
+    Тексты префиксов промпта: chat_template от первых n сообщений для каждого n из boundaries.
+    """
+    return [
+        tokenizer.apply_chat_template(messages[:n], tokenize=False, add_generation_prompt=False)
+        for n in boundaries
+    ]
+
+
+def _ids_key(ids: List[int]) -> str:
+    return hashlib.sha1(",".join(map(str, ids)).encode()).hexdigest()
+
+
+def _cache_nbytes(cache) -> int:
+    return sum(t.numel() * t.element_size() for layer in cache.to_legacy_cache() for t in layer)
+
+
+class PrefixKVCache:
+    """
+    LRU-кеш past_key_values для общих префиксов промптов
+    (системный промпт; системный промпт + контекст статьи), ограниченный по памяти.
+
+    Генерация идёт через model.generate с копией закешированного префикса,
+    так что prefill считается только для оставшейся части промпта.
+    Работает на любом устройстве модели, в том числе на CPU.
+
+    args:
+        model: Causal LM из transformers
+        tokenizer: Токенизатор модели
+        max_bytes (int): Предельный суммарный размер закешированных KV
+    """
+
+    def __init__(self, model, tokenizer, max_bytes: int = PREFIX_CACHE_MAX_MB * 1024 * 1024):
+        self.model = model
+        self.tokenizer = tokenizer
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, Tuple[object, int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def _get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def _put(self, key: str, cache):
+        nbytes = _cache_nbytes(cache)
+        if nbytes > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                return
+            self._entries[key] = (cache, nbytes)
+            self._bytes += nbytes
+            while self._bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._bytes -= evicted
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._bytes, "max_bytes": self.max_bytes}
+
+    def generate(self, prompt: str, prefixes: List[str], streamer=None, **gen_kwargs) -> str:
+        """
+        Генерирует ответ, переиспользуя KV самого длинного закешированного префикса.
+        Недостающие префиксы досчитываются от него и кладутся в кеш.
+
+        args:
+            prompt (str): Полный промпт
+            prefixes (List[str]): Префиксы промпта по возрастанию длины
+            streamer: Стример токенов (как у pipeline)
+            **gen_kwargs: Параметры генерации
+
+        returns:
+            str: Сгенерированный текст
+        """
+        import torch
+        from transformers import DynamicCache
+
+        ids = self.tokenizer.encode(prompt, add_special_tokens=False)
+
+        # Префиксы, токенизация которых совпадает с началом промпта (граница не режет токен)
+        valid: List[Tuple[int, str]] = []
+        for prefix in prefixes:
+            prefix_ids = self.tokenizer.encode(prefix, add_special_tokens=False)
+            n = len(prefix_ids)
+            if 0 < n < len(ids) and ids[:n] == prefix_ids:
+                valid.append((n, _ids_key(prefix_ids)))
+
+        hit_len, cache = 0, None
+        for n, key in reversed(valid):
+            cached = self._get(key)
+            if cached is not None:
+                hit_len, cache = n, copy.deepcopy(cached)
+                break
+        (prefix_hits if hit_len else prefix_misses).inc()
+
+        device = self.model.device
+        if valid and valid[-1][0] > hit_len:
+            # Досчитываем самый длинный префикс и сохраняем его вместе с промежуточными
+            target_len = valid[-1][0]
+            cache = cache if cache is not None else DynamicCache()
+            with torch.no_grad():
+                self.model(
+                    input_ids=torch.tensor([ids[hit_len:target_len]], device=device),
+                    past_key_values=cache,
+                    use_cache=True
+                )
+            for n, key in reversed(valid):
+                if n <= hit_len:
+                    break
+                entry = copy.deepcopy(cache)
+                if n < target_len:
+                    entry.crop(n)
+                self._put(key, entry)
+
+        prefill_saved_hist.observe(hit_len)
+
+        input_ids = torch.tensor([ids], device=device)
+        with torch.no_grad():
+            output = self.model.generate(
+                input_ids=input_ids,
+                attention_mask=torch.ones_like(input_ids),
+                past_key_values=cache,
+                streamer=streamer,
+                pad_token_id=self.tokenizer.pad_token_id,
+                **gen_kwargs
+            )
+        return self.tokenizer.decode(output[0][len(ids):], skip_special_tokens=True)
@@ -0,0 +1,118 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+from langchain.schema import Document
+
+from app.config import RERANK_CACHE_SIZE, RERANK_SKIP_MARGIN, RERANK_BATCH_SIZE, RERANK_SETTLE_SCORE
+from app.services import metrics
+
+pairs_scored = metrics.counter("rerank_pairs_scored")
+pairs_skipped = metrics.counter("rerank_pairs_skipped")
+pairs_cached = metrics.counter("rerank_pairs_cached")
+rerank_seconds = metrics.counter("rerank_seconds")
+
+
+def _digest(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+class RerankScoreCache:
+    """
+    LRU-кеш оценок кросс-энкодера по ключу (хеш запроса, id чанка).
+    id чанка — хеш его текста, поэтому переиндексация статьи не оставляет устаревших оценок.
+    """
+
+    def __init__(self, max_size: int = RERANK_CACHE_SIZE):
+        self.max_size = max_size
+        self._scores: "OrderedDict[Tuple[str, str], float]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple[str, str]) -> Optional[float]:
+        with self._lock:
+            score = self._scores.get(key)
+            if score is not None:
+                self._scores.move_to_end(key)
+            return score
+
+    def put(self, key: Tuple[str, str], score: float):
+        with self._lock:
+            self._scores[key] = score
+            self._scores.move_to_end(key)
+            while len(self._scores) > self.max_size:
+                self._scores.popitem(last=False)
+
+
+score_cache = RerankScoreCache()
+
+
+def rerank(
+    query: str,
+    candidates: List[Tuple[Document, float]],
+    reranker,
+    top_n: int = 2,
+    skip_margin: float = RERANK_SKIP_MARGIN,
+    batch_size: int = RERANK_BATCH_SIZE,
+    settle_score: float = RERANK_SETTLE_SCORE
+) -> List[Tuple[Document, float]]:
+    """
+    Переранжирует кандидатов кросс-энкодером, оценивая как можно меньше пар.
+
+    1. Если близость эмбеддингов у каждого из первых top_n кандидатов больше, чем у любого
+       из остальных, хотя бы на skip_margin, реранкинг пропускается (оценки — косинусная близость).
+    2. Иначе кандидаты оцениваются микробатчами по batch_size в порядке поиска;
+       оценки берутся из кеша, если пара уже встречалась. Как только все top_n
+       лучших оценок не ниже settle_score, оставшиеся пары не оцениваются.
+
+    args:
+        query (str): Вопрос пользователя
+        candidates (List[Tuple[Document, float]]): Кандидаты с косинусной близостью в порядке поиска
+        reranker (FlagReranker): Модель для переранжирования
+        top_n (int): Кол-во возвращаемых результатов
+        skip_margin (float): Порог разрыва близостей для пропуска реранкинга
+        batch_size (int): Размер микробатча
+        settle_score (float): Порог уверенности для ранней остановки
+
+    returns:
+        List[Tuple[Document, float]]: top_n документов с оценками, по убыванию
+    """
+    if not candidates:
+        return []
+
+    if (skip_margin > 0 and len(candidates) > top_n
+            and min(s for _, s in candidates[:top_n]) - max(s for _, s in candidates[top_n:]) >= skip_margin):
+        pairs_skipped.inc(len(candidates))
+        return candidates[:top_n]
+
+    started = time.perf_counter()
+    query_hash = _digest(query)
+    scored = []
+
+    for start in range(0, len(candidates), batch_size):
+        batch = [doc for doc, _ in candidates[start:start + batch_size]]
+        keys = [(query_hash, _digest(doc.page_content)) for doc in batch]
+        scores = [score_cache.get(key) for key in keys]
+
+        missing = [i for i, score in enumerate(scores) if score is None]
+        pairs_cached.inc(len(batch) - len(missing))
+        if missing:
+            computed = reranker.compute_score([[query, batch[i].page_content] for i in missing], normalize=True)
+            # Для одной пары FlagReranker возвращает число, а не список
+            if not isinstance(computed, list):
+                computed = [computed]
+            pairs_scored.inc(len(missing))
+            for i, score in zip(missing, computed):
+                scores[i] = score
+                score_cache.put(keys[i], score)
+
+        scored.extend(zip(batch, scores))
+        scored.sort(key=lambda x: -x[1])
+
+        if len(scored) >= top_n and scored[top_n - 1][1] >= settle_score:
+            pairs_skipped.inc(len(candidates) - len(scored))
+            break
+
+    rerank_seconds.inc(time.perf_counter() - started)
+    return scored[:top_n]
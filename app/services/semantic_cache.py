@@ -0,0 +1,140 @@
+import hashlib
+import json
+import time
+from typing import List, Optional
+
+import numpy as np
+import redis
+
+from app.config import (
+    REDIS_CACHE_URL,
+    SEMANTIC_CACHE_THRESHOLD,
+    SEMANTIC_CACHE_TTL_SECONDS,
+    SEMANTIC_CACHE_MAX_ENTRIES,
+)
+from app.services import metrics
+
+hits = metrics.counter("semantic_cache_hits")
+misses = metrics.counter("semantic_cache_misses")
+
+
+class SemanticAnswerCache:
+    """
+    Кеш ответов по статье, ключом которого служит эмбеддинг вопроса.
+
+    Для каждой статьи в Redis хранится:
+        qa_sem:{arxiv_id}:lru          — sorted set id вопросов по времени последнего обращения (LRU)
+        qa_sem:{arxiv_id}:{question_id} — hash с эмбеддингом (float32) и JSON-ответом, живёт ttl секунд
+
+    Ответ считается найденным, если косинусная близость вопроса к одному из
+    ранее отвеченных вопросов по той же статье не ниже threshold.
+    """
+
+    def __init__(self, client: redis.Redis, threshold: float, ttl: int, max_entries: int):
+        self.r = client
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+
+    @staticmethod
+    def _lru_key(arxiv_id: str) -> str:
+        return f"qa_sem:{arxiv_id}:lru"
+
+    @staticmethod
+    def _entry_key(arxiv_id: str, question_id: str) -> str:
+        return f"qa_sem:{arxiv_id}:{question_id}"
+
+    @staticmethod
+    def _normalize(embedding: List[float]) -> np.ndarray:
+        vec = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm else vec
+
+    def lookup(self, arxiv_id: str, embedding: List[float]) -> Optional[dict]:
+        """
+        Ищет ответ на близкий по смыслу вопрос к той же статье.
+
+        args:
+            arxiv_id (str): ID статьи
+            embedding (List[float]): Эмбеддинг вопроса
+
+        returns:
+            Optional[dict]: Сохранённый результат задачи или None
+        """
+        ids = [i.decode() for i in self.r.zrange(self._lru_key(arxiv_id), 0, -1)]
+        if not ids:
+            misses.inc()
+            return None
+
+        pipe = self.r.pipeline()
+        for question_id in ids:
+            pipe.hmget(self._entry_key(arxiv_id, question_id), "embedding", "result")
+        rows = pipe.execute()
+
+        alive, vectors, results = [], [], []
+        for question_id, (vector, result) in zip(ids, rows):
+            if vector is None:
+                continue
+            alive.append(question_id)
+            vectors.append(np.frombuffer(vector, dtype=np.float32))
+            results.append(result)
+
+        # Записи, у которых истёк TTL, убираем из LRU-индекса
+        expired = set(ids) - set(alive)
+        if expired:
+            self.r.zrem(self._lru_key(arxiv_id), *expired)
+
+        if not alive:
+            misses.inc()
+            return None
+
+        similarities = np.stack(vectors) @ self._normalize(embedding)
+        best = int(np.argmax(similarities))
+        if similarities[best] < self.threshold:
+            misses.inc()
+            return None
+
+        self.r.zadd(self._lru_key(arxiv_id), {alive[best]: time.time()})
+        hits.inc()
+        return json.loads(results[best])
+
+    def store(self, arxiv_id: str, question: str, embedding: List[float], result: dict):
+        """
+        Сохраняет ответ и вытесняет самые давно использованные вопросы,
+        если для статьи накопилось больше max_entries записей.
+        """
+        question_id = hashlib.sha256(question.encode("utf-8")).hexdigest()
+        entry_key = self._entry_key(arxiv_id, question_id)
+        lru_key = self._lru_key(arxiv_id)
+
+        pipe = self.r.pipeline()
+        pipe.hset(entry_key, mapping={
+            "embedding": self._normalize(embedding).tobytes(),
+            "result": json.dumps(result, ensure_ascii=False)
+        })
+        pipe.expire(entry_key, self.ttl)
+        pipe.zadd(lru_key, {question_id: time.time()})
+        pipe.expire(lru_key, self.ttl)
+        pipe.zcard(lru_key)
+        size = pipe.execute()[-1]
+
+        if size > self.max_entries:
+            evicted = [i.decode() for i, _ in self.r.zpopmin(lru_key, size - self.max_entries)]
+            self.r.delete(*[self._entry_key(arxiv_id, i) for i in evicted])
+
+    def stats(self) -> dict:
+        total_hits, total_misses = hits.snapshot(), misses.snapshot()
+        total = total_hits + total_misses
+        return {
+            "hits": total_hits,
+            "misses": total_misses,
+            "hit_rate": total_hits / total if total else 0.0
+        }
+
+
+semantic_cache = SemanticAnswerCache(
+    redis.Redis.from_url(REDIS_CACHE_URL),
+    threshold=SEMANTIC_CACHE_THRESHOLD,
+    ttl=SEMANTIC_CACHE_TTL_SECONDS,
+    max_entries=SEMANTIC_CACHE_MAX_ENTRIES
+)
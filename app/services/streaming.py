@@ -0,0 +1,89 @@
+from typing import List, Optional
+
+import redis
+
+from app.config import REDIS_CACHE_URL, STREAM_TTL_SECONDS
+
+r = redis.Redis.from_url(REDIS_CACHE_URL)
+
+
+def stream_key(task_id: str) -> str:
+    return f"stream:{task_id}"
+
+
+def publish_token(key: str, text: str):
+    """
+    Публикует фрагмент ответа в Redis stream задачи. TTL продлевается с каждым
+    фрагментом: если воркер упадёт посреди генерации, stream всё равно истечёт.
+    """
+    pipe = r.pipeline()
+    pipe.xadd(key, {"type": "token", "text": text})
+    pipe.expire(key, STREAM_TTL_SECONDS)
+    pipe.execute()
+
+
+def publish_end(key: str, error: Optional[str] = None):
+    """
+    Завершает stream задачи. Ключ живёт STREAM_TTL_SECONDS, чтобы
+    поздно подключившийся клиент успел вычитать ответ целиком.
+    """
+    fields = {"type": "end"}
+    if error:
+        fields["error"] = error
+
+    pipe = r.pipeline()
+    pipe.xadd(key, fields)
+    pipe.expire(key, STREAM_TTL_SECONDS)
+    pipe.execute()
+
+
+class RedisBatchStreamer:
+    """
+    Стример для model.generate, публикующий токены каждой строки батча
+    в свой Redis stream.
+
+    Реализует интерфейс transformers BaseStreamer (put/end), но, в отличие от
+    TextIteratorStreamer, поддерживает батчи: первый вызов put получает
+    input_ids промптов и пропускается, дальше на каждом шаге приходит по
+    одному токену на строку.
+
+    args:
+        tokenizer: Токенизатор модели
+        keys (List[Optional[str]]): Ключи stream для строк батча (None — не стримить)
+    """
+
+    def __init__(self, tokenizer, keys: List[Optional[str]]):
+        self.tokenizer = tokenizer
+        self.keys = keys
+        self._tokens = [[] for _ in keys]
+        self._emitted = ["" for _ in keys]
+        self._prompt_seen = False
+
+    def put(self, value):
+        if not self._prompt_seen:
+            self._prompt_seen = True
+            return
+
+        rows = value.reshape(len(self.keys), -1).tolist()
+        pipe = r.pipeline()
+        for i, (key, new_tokens) in enumerate(zip(self.keys, rows)):
+            if key is None:
+                continue
+            self._tokens[i].extend(new_tokens)
+            text = self.tokenizer.decode(self._tokens[i], skip_special_tokens=True)
+
+            # Недособранный многобайтовый символ — ждём следующий токен
+            if text.endswith("�"):
+                continue
+
+            delta = text[len(self._emitted[i]):]
+            if delta:
+                pipe.xadd(key, {"type": "token", "text": delta})
+                pipe.expire(key, STREAM_TTL_SECONDS)
+                self._emitted[i] = text
+        pipe.execute()
+
+    def end(self):
+        for key in self.keys:
+            if key is not None:
+                publish_end(key)
@@ -0,0 +1,22 @@
+import json
+
+import redis
+
+from app.config import REDIS_CACHE_URL
+
+r = redis.Redis.from_url(REDIS_CACHE_URL)
+
+
+def task_channel(task_id: str) -> str:
+    return f"task_done:{task_id}"
+
+
+def publish_task_done(task_id: str, payload: dict):
+    """
+    Публикует в Redis pub/sub событие о завершении задачи.
+
+    args:
+        task_id (str): ID Celery-задачи
+        payload (dict): Статус в формате /task_status ({"status": ..., "result"/"error": ...})
+    """
+    r.publish(task_channel(task_id), json.dumps(payload, ensure_ascii=False, default=str))
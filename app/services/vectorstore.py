@@ -1,57 +1,126 @@
-from langchain.vectorstores import Chroma
-from langchain.text_splitter import MarkdownTextSplitter
 from langchain.schema import Document
 from FlagEmbedding import FlagReranker
+from typing import List, Optional
+from app.services.article_index import ArticleIndexStore
+from app.services.embedding_cache import CachedEmbeddings, get_embedding_cache
+from app.services.reranking import rerank
+from app.services.chunking import chunk_markdown
 
 
-def store_chunks(md_cleaned: str, arxiv_id: str, title: str, embedding_model, persist_directory="chroma_storage"):
+def chunk_article(md_cleaned: str, arxiv_id: str, title: str) -> List[Document]:
     """
-    Разбивает markdown на чанки и сохраняет их в ChromaDB.
+    Разбивает markdown статьи на чанки по секциям и заполняет их метаданные.
+    """
+    docs = chunk_markdown(md_cleaned)
+    for i, doc in enumerate(docs):
+        doc.metadata = {"arxiv_id": arxiv_id, "title": title, "chunk_id": i, **doc.metadata}
+    return docs
+
+
+def store_chunks(md_cleaned: str, arxiv_id: str, title: str, embedding_model, vectordb: ArticleIndexStore):
+    """
+    Разбивает markdown на чанки по секциям и сохраняет их в индекс статьи.
 
     args:
         md_cleaned (str): Markdown-документ
         arxiv_id (str): ID статьи
         title (str): Заголовок статьи
         embedding_model: Инициализированная модель эмбеддингов
-        persist_directory (str): Каталог для хранения Chroma
+        vectordb (ArticleIndexStore): Хранилище индексов по статьям
 
     returns:
-        list[Document]: Список добавленных чанков
+        Tuple[list[Document], dict]: Список добавленных чанков и статистика кеша эмбеддингов
     """
-    splitter = MarkdownTextSplitter(chunk_size=800, chunk_overlap=100)
-    docs = splitter.create_documents([md_cleaned])
-    for doc in docs:
-        doc.metadata = {"arxiv_id": arxiv_id, "title": title}
+    docs = chunk_article(md_cleaned, arxiv_id, title)
 
-    vectordb = Chroma.from_documents(documents=docs, embedding=embedding_model, persist_directory=persist_directory)
-    vectordb.persist()
-    return docs
+    # Неизменившиеся чанки (повторная загрузка, новая версия статьи) берутся из кеша
+    embedder = CachedEmbeddings(embedding_model, get_embedding_cache())
+    embeddings, stats = embedder.embed_with_stats([doc.page_content for doc in docs])
+    vectordb.add_documents(arxiv_id, docs, embeddings)
+    return docs, stats
 
 
-def retrieve_and_rerank(query: str, vectordb, reranker: FlagReranker, arxiv_id: str, top_k=5, top_n=2):
+def store_articles_chunks(articles: List[dict], embedding_model, vectordb: ArticleIndexStore):
     """
-    Извлекает релевантные документы по конкретной статье и переранжирует их.
+    Массовая версия store_chunks: чанки всех статей эмбеддятся общими батчами,
+    затем индексы статей записываются одним проходом.
+
+    args:
+        articles (List[dict]): Статьи с ключами arxiv_id, title, md_cleaned
+        embedding_model: Инициализированная модель эмбеддингов
+        vectordb (ArticleIndexStore): Хранилище индексов по статьям
+
+    returns:
+        Tuple[Dict[str, int], dict]: Число чанков по статьям и статистика кеша эмбеддингов
+    """
+    docs_by_article = [chunk_article(a["md_cleaned"], a["arxiv_id"], a["title"]) for a in articles]
+    texts = [doc.page_content for docs in docs_by_article for doc in docs]
+
+    embedder = CachedEmbeddings(embedding_model, get_embedding_cache())
+    embeddings, stats = embedder.embed_with_stats(texts)
+
+    num_chunks, offset = {}, 0
+    for article, docs in zip(articles, docs_by_article):
+        vectordb.add_documents(article["arxiv_id"], docs, embeddings[offset:offset + len(docs)])
+        num_chunks[article["arxiv_id"]] = len(docs)
+        offset += len(docs)
+    return num_chunks, stats
+
+
+def retrieve_and_rerank(query: str, vectordb: ArticleIndexStore, reranker: FlagReranker, arxiv_id: str, top_k=5, top_n=2, query_embedding: Optional[List[float]] = None, section: Optional[str] = None):
+    """
+    Извлекает релевантные документы по конкретной статье гибридным поиском
+    (BM25 + эмбеддинги) и переранжирует их.
 
     args:
         query (str): Вопрос пользователя
-        vectordb (Chroma): Векторная база
+        vectordb (ArticleIndexStore): Хранилище индексов по статьям
         reranker (FlagReranker): Модель для переранжирования
-        arxiv_id (str): ID статьи для фильтрации
+        arxiv_id (str): ID статьи
         top_k (int): Кол-во кандидатов
         top_n (int): Кол-во возвращаемых финальных результатов
+        query_embedding (Optional[List[float]]): Готовый эмбеддинг вопроса, чтобы не считать его повторно
+        section (Optional[str]): Искать только в секциях, путь которых содержит эту строку
 
     returns:
         list: Отсортированный список (doc, score)
     """
-    retriever = vectordb.as_retriever(
-        search_kwargs={"k": top_k, "filter": {"arxiv_id": arxiv_id}}
-    )
-    candidates = retriever.get_relevant_documents(query)
+    candidates = vectordb.hybrid_search(arxiv_id, query, k=top_k, query_embedding=query_embedding, section=section)
+    return rerank(query, candidates, reranker, top_n=top_n)
+
+
+def retrieve_across_articles(query: str, vectordb: ArticleIndexStore, reranker: FlagReranker, arxiv_ids: List[str], top_k=5, top_n=2, query_embedding: Optional[List[float]] = None, section: Optional[str] = None):
+    """
+    Извлекает релевантные документы сразу из нескольких статей: небольшие списки
+    кандидатов по каждой статье сливаются и переранжируются одним вызовом реранкера.
+    В итог сначала попадает лучший чанк каждой статьи (для сравнительных вопросов),
+    остальные места занимают лучшие по оценке реранкера.
+
+    args:
+        query (str): Вопрос пользователя
+        vectordb (ArticleIndexStore): Хранилище индексов по статьям
+        reranker (FlagReranker): Модель для переранжирования
+        arxiv_ids (List[str]): ID статей
+        top_k (int): Кол-во кандидатов на все статьи
+        top_n (int): Кол-во возвращаемых финальных результатов
+        query_embedding (Optional[List[float]]): Готовый эмбеддинг вопроса, чтобы не считать его повторно
+        section (Optional[str]): Искать только в секциях, путь которых содержит эту строку
 
-    if not candidates:
-        return []
+    returns:
+        list: Отсортированный список (doc, score)
+    """
+    candidates = vectordb.multi_hybrid_search(arxiv_ids, query, k=top_k, query_embedding=query_embedding, section=section)
+    # Кандидатов немного (несколько на статью) — оцениваем все, чтобы выбрать лучший чанк каждой статьи
+    scored = rerank(query, candidates, reranker, top_n=len(candidates))
 
-    pairs = [[query, doc.page_content] for doc in candidates]
-    scores = reranker.compute_score(pairs, normalize=True)
-    reranked = sorted(zip(candidates, scores), key=lambda x: -x[1])
-    return reranked[:top_n]
+    selected, seen = [], set()
+    for doc, score in scored:
+        if doc.metadata.get("arxiv_id") not in seen and len(selected) < top_n:
+            seen.add(doc.metadata.get("arxiv_id"))
+            selected.append((doc, score))
+    for doc, score in scored:
+        if len(selected) >= top_n:
+            break
+        if not any(doc is chosen for chosen, _ in selected):
+            selected.append((doc, score))
+    return sorted(selected, key=lambda x: x[1], reverse=True)
@@ -1 +1 @@
-from . import summarize_task, ingest_task, ask_task
\ No newline at end of file
+from . import summarize_task, ingest_task, ask_task, bulk_ingest_task, events
\ No newline at end of file
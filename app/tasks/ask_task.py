@@ -1,14 +1,18 @@
+from celery import chain, uuid
 from celery_app import celery
 from app.db.database import SessionLocal
-from app.db.crud import get_user_arxiv_id
-from app.services.vectorstore import retrieve_and_rerank
-from app.celery_globals import llm, vectorstore, reranker, tokenizer
-from typing import List
-import redis
-import hashlib
-import json
+from app.db.crud import get_user_arxiv_id, get_user_articles
+from app.services.vectorstore import retrieve_and_rerank, retrieve_across_articles
+from app import celery_globals
+from app.services.streaming import stream_key, publish_token, publish_end
+from app.services.semantic_cache import semantic_cache
+from app.services.context_builder import build_context
+from app.services.prefix_cache import chat_prefixes
+from app.services import metrics
+from app.config import RETRIEVAL_TOP_K, RETRIEVAL_TOP_N
+from typing import List, Optional
 
-r = redis.Redis(host="redis", port=6379, db=1)
+prompt_tokens_hist = metrics.histogram("llm_prompt_tokens", [256, 512, 768, 1024, 1536, 2048, 4096])
 
 SYSTEM_MSG = (
     "Ты — помощник по научным статьям. "
@@ -18,61 +22,147 @@ SYSTEM_MSG = (
 )
 
 def build_messages(question: str, context: str) -> List[dict]:
-    """Формирует сообщения в нужном для chat_template формате."""
+    """
+    Формирует сообщения в нужном для chat_template формате.
+    Контекст идёт перед вопросом, чтобы префиксы "системный промпт" и
+    "системный промпт + контекст" были общими для разных вопросов (кеш KV).
+    """
     return [
         {"role": "system", "content": SYSTEM_MSG},
-        {"role": "user", "content": f"Вопрос:\n{question}"},
         {"role": "system", "content": f"Контекст:\n{context}"},
+        {"role": "user", "content": f"Вопрос:\n{question}"},
     ]
 
-def make_cache_key(arxiv_id: str, question: str) -> str:
-    hash_q = hashlib.sha256(question.encode("utf-8")).hexdigest()
-    return f"qa:{arxiv_id}:{hash_q}"
+def enqueue_ask(user_id: str, question: str, section: Optional[str] = None, all_articles: bool = False) -> str:
+    """
+    Запускает цепочку ответа на вопрос: поиск контекста (очередь embedding)
+    → генерация (очередь generation).
+    Если задан section, контекст ищется только в подходящих секциях статьи.
+    Если all_articles, контекст ищется по всему рабочему набору статей пользователя.
+
+    returns:
+        str: ID итоговой задачи генерации — по нему клиент получает результат и стрим токенов
+    """
+    task_id = uuid()
+    chain(
+        retrieve_context_task.s(user_id, question, task_id, section, all_articles),
+        ask_article_task.s().set(task_id=task_id)
+    ).apply_async()
+    return task_id
 
 @celery.task
-def ask_article_task(user_id: str, question: str) -> dict:
+def retrieve_context_task(user_id: str, question: str, task_id: str, section: Optional[str] = None, all_articles: bool = False) -> dict:
     """
-    Фоновая задача: отвечает на вопрос пользователя по статье.
+    Первый шаг ответа на вопрос (воркер embedding): проверка семантического кеша,
+    поиск и переранжирование фрагментов статьи (или всех статей рабочего набора).
 
     args:
         user_id (str): id пользователя
-        question (str
+        question (str): вопрос пользователя
+        task_id (str): ID итоговой задачи генерации (для стрима токенов)
+        section (Optional[str]): фильтр по секции статьи
+        all_articles (bool): искать по всем статьям рабочего набора пользователя
+
+    returns:
+        dict: Контекст для генерации, готовый результат из кеша или ошибка
     """
+    key = stream_key(task_id)
     db = SessionLocal()
     try:
-        arxiv_id = get_user_arxiv_id(db, user_id)
-        if not arxiv_id:
-            return {"error": "Вы ещё не загрузили статью. Сначала загрузите её, а потом задавайте вопросы!"}
+        if all_articles:
+            arxiv_ids = get_user_articles(db, user_id)
+        else:
+            arxiv_id = get_user_arxiv_id(db, user_id)
+            arxiv_ids = [arxiv_id] if arxiv_id else []
+        if not arxiv_ids:
+            publish_end(key)
+            return {"result": {"error": "Вы ещё не загрузили статью. Сначала загрузите её, а потом задавайте вопросы!"}}
+
+        # Вопрос по одной статье; при поиске по набору — None
+        arxiv_id = arxiv_ids[0] if len(arxiv_ids) == 1 else None
 
-        # Проверка кеша
-        cache_key = make_cache_key(arxiv_id, question)
-        cached = r.get(cache_key)
+        # Проверка семантического кеша: близкие по смыслу вопросы к той же статье.
+        # Ответы по отдельной секции или по нескольким статьям в кеш не попадают и из него не берутся
+        question_embedding = celery_globals.embedding_model.embed_query(question)
+        cached = semantic_cache.lookup(arxiv_id, question_embedding) if arxiv_id and not section else None
         if cached:
-            return json.loads(cached)
-            
-        # Поиск релевантных документов
-        reranked = retrieve_and_rerank(question, vectorstore, reranker, arxiv_id, top_k=10, top_n=2)
-        top_chunks = [doc.page_content for doc, score in reranked]
-        context = "\n\n".join(top_chunks)
+            publish_token(key, cached["answer"])
+            publish_end(key)
+            return {"result": {**cached, "question": question}}
+
+        # Поиск релевантных документов: по нескольким статьям — один общий реранкинг
+        if arxiv_id:
+            reranked = retrieve_and_rerank(question, celery_globals.vectorstore, celery_globals.reranker, arxiv_id, top_k=RETRIEVAL_TOP_K, top_n=RETRIEVAL_TOP_N, query_embedding=question_embedding, section=section)
+        else:
+            reranked = retrieve_across_articles(question, celery_globals.vectorstore, celery_globals.reranker, arxiv_ids, top_k=RETRIEVAL_TOP_K, top_n=RETRIEVAL_TOP_N, query_embedding=question_embedding, section=section)
+
+        return {
+            "arxiv_id": arxiv_id,
+            "arxiv_ids": arxiv_ids,
+            "question": question,
+            "question_embedding": question_embedding,
+            "section": section,
+            "chunks": [
+                {
+                    "text": doc.page_content,
+                    "arxiv_id": doc.metadata.get("arxiv_id"),
+                    "title": doc.metadata.get("title"),
+                    "char_start": doc.metadata.get("char_start"),
+                    "char_end": doc.metadata.get("char_end")
+                }
+                for doc, score in reranked
+            ]
+        }
+    except Exception as e:
+        publish_end(key, error=str(e))
+        return {"result": {"error": str(e)}}
+    finally:
+        db.close()
+
+@celery.task(bind=True)
+def ask_article_task(self, context: dict) -> dict:
+    """
+    Фоновая задача (воркер generation): генерирует ответ на вопрос по найденному контексту.
+    Токены ответа по мере генерации публикуются в Redis stream задачи (stream:{task_id}).
+
+    args:
+        context (dict): Результат retrieve_context_task
+    """
+    # Ответ из кеша или ошибка на этапе поиска
+    if "result" in context:
+        return context["result"]
+
+    key = stream_key(self.request.id)
+    try:
+        arxiv_id, question = context["arxiv_id"], context["question"]
+        tokenizer = celery_globals.tokenizer
+
+        # Контекст в пределах бюджета токенов, без повторов на стыках соседних чанков
+        # Фрагменты нескольких статей подписываются, чтобы модель могла их сравнивать
+        context_text, top_chunks = build_context(context["chunks"], tokenizer, label_sources=arxiv_id is None)
 
         # Используем chat_template
-        messages = build_messages(question, context)
-        messages = tokenizer.apply_chat_template(messages, tokenize=False, add_generation_prompt=True, enable_thinking=False)
+        messages = build_messages(question, context_text)
+        prompt = tokenizer.apply_chat_template(messages, tokenize=False, add_generation_prompt=True, enable_thinking=False)
+        prompt_tokens = len(tokenizer.encode(prompt, add_special_tokens=False))
+        prompt_tokens_hist.observe(prompt_tokens)
+
+        # Генерация ответа через LLM (батчится вместе с другими задачами воркера)
+        prefixes = chat_prefixes(tokenizer, messages, [1, 2])
+        answer = celery_globals.llm_backend.generate(prompt, stream_key=key, prefixes=prefixes, max_new_tokens=256, temperature=0.7, top_p=0.8, top_k=20, min_p=0)
 
-        # Генерация ответа через LLM
-        answer = llm(messages, max_new_tokens=256, temperature=0.7, top_p=0.8, top_k=20, min_p=0)[0]['generated_text']
-        
         result = {
             "arxiv_id": arxiv_id,
+            "arxiv_ids": context.get("arxiv_ids", [arxiv_id]),
             "question": question,
             "answer": answer,
-            "chunks_used": top_chunks
+            "chunks_used": top_chunks,
+            "prompt_tokens": prompt_tokens
         }
 
-        # Сохранение кеша на 24ч
-        r.set(cache_key, json.dumps(result, ensure_ascii=False), ex=60 * 60 * 24)  
+        if arxiv_id and not context.get("section"):
+            semantic_cache.store(arxiv_id, question, context["question_embedding"], result)
         return result
     except Exception as e:
+        publish_end(key, error=str(e))
         return {"error": str(e)}
-    finally:
-        db.close()
\ No newline at end of file
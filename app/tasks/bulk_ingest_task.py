@@ -0,0 +1,164 @@
+import os
+from typing import List, Optional
+
+from celery import chord, group, uuid
+from celery_app import celery
+from app import celery_globals
+from app.config import BULK_INDEX_BATCH_SIZE
+from app.db.database import SessionLocal
+from app.db.crud import get_article_by_id, save_articles_metadata
+from app.services import bulk_progress, ingest_cache
+from app.services.arxiv_client import fetch_metadata
+from app.services.article_parser import normalize_arxiv_id, parse_and_split_article, identify_pdf
+from app.services.vectorstore import store_articles_chunks
+from app.tasks.summarize_task import precompute_summary_task
+
+# Лимит числа ID в одном запросе к API arXiv
+_METADATA_BATCH = 100
+
+
+def is_known(db, arxiv_id: str) -> bool:
+    return ingest_cache.get_cached_result(arxiv_id) is not None or get_article_by_id(db, arxiv_id) is not None
+
+
+def enqueue_bulk_ingest(sources: List[str]) -> str:
+    """
+    Запускает массовую загрузку статей без привязки к пользователю.
+
+    args:
+        sources (List[str]): arXiv ссылки/ID или пути к PDF, доступные воркерам
+
+    returns:
+        str: ID задания — по нему запрашивается прогресс
+    """
+    job_id = uuid()
+    bulk_progress.start(job_id, total=len(sources))
+    bulk_prepare_task.delay(job_id, sources)
+    return job_id
+
+@celery.task
+def bulk_prepare_task(job_id: str, sources: List[str]):
+    """
+    Первый шаг массовой загрузки (воркер ingest): нормализует ID, отбрасывает
+    дубликаты и уже загруженные статьи (без скачивания), получает метаданные
+    новых статей пакетными запросами и запускает параллельный парсинг.
+    Распарсенные статьи индексируются пачками по BULK_INDEX_BATCH_SIZE.
+    """
+    sources = list(dict.fromkeys(s.strip() for s in sources if s.strip()))
+    bulk_progress.set_total(job_id, len(sources))
+
+    db = SessionLocal()
+    try:
+        arxiv_ids, pdfs = [], []
+        for source in sources:
+            if source.lower().endswith(".pdf") and os.path.exists(source):
+                pdfs.append(source)
+                continue
+
+            arxiv_id = normalize_arxiv_id(source)
+            if not arxiv_id:
+                bulk_progress.fail(job_id, source, "Не удалось распознать arXiv ID")
+            elif arxiv_id in arxiv_ids or is_known(db, arxiv_id):
+                bulk_progress.incr(job_id, "skipped")
+            else:
+                arxiv_ids.append(arxiv_id)
+    finally:
+        db.close()
+
+    metadata, failed = {}, set()
+    for start in range(0, len(arxiv_ids), _METADATA_BATCH):
+        batch = arxiv_ids[start:start + _METADATA_BATCH]
+        try:
+            metadata.update(fetch_metadata(batch))
+        except Exception as e:
+            # Ошибка сети или 400 от arXiv на пакет: статьи пакета считаются неудавшимися,
+            # иначе задание никогда не перейдёт в completed
+            for arxiv_id in batch:
+                bulk_progress.fail(job_id, arxiv_id, f"Не удалось получить метаданные: {e}")
+            failed.update(batch)
+
+    parse_tasks = []
+    for arxiv_id in arxiv_ids:
+        if arxiv_id in failed:
+            continue
+        result = metadata.get(arxiv_id)
+        if result is None:
+            bulk_progress.fail(job_id, arxiv_id, "Статья не найдена в arXiv")
+            continue
+        parse_tasks.append(bulk_parse_task.s(job_id, arxiv_id, False, {"title": result.title, "pdf_url": result.pdf_url}))
+    parse_tasks.extend(bulk_parse_task.s(job_id, path, True) for path in pdfs)
+
+    for start in range(0, len(parse_tasks), BULK_INDEX_BATCH_SIZE):
+        chord(group(parse_tasks[start:start + BULK_INDEX_BATCH_SIZE]))(bulk_index_task.s(job_id))
+
+@celery.task
+def bulk_parse_task(job_id: str, source: str, is_pdf: bool = False, arxiv_meta: Optional[dict] = None) -> Optional[dict]:
+    """
+    Скачивает (если нужно) и парсит одну статью массовой загрузки (воркер ingest).
+
+    returns:
+        Optional[dict]: Распарсенная статья или None, если она пропущена или не загрузилась
+    """
+    try:
+        pdf_sha = None
+        if is_pdf:
+            pdf_sha, known_id = identify_pdf(source)
+            if known_id:
+                db = SessionLocal()
+                try:
+                    known = is_known(db, known_id)
+                finally:
+                    db.close()
+                if known:
+                    bulk_progress.incr(job_id, "skipped")
+                    return None
+
+        arxiv_id, title, md_cleaned, abstract, conclusion = parse_and_split_article(source, is_pdf, pdf_sha=pdf_sha, arxiv_meta=arxiv_meta)
+        bulk_progress.incr(job_id, "parsed")
+        return {
+            "arxiv_id": arxiv_id,
+            "title": title,
+            "md_cleaned": md_cleaned,
+            "abstract": abstract,
+            "conclusion": conclusion
+        }
+    except Exception as e:
+        bulk_progress.fail(job_id, source, str(e))
+        return None
+
+@celery.task
+def bulk_index_task(parsed: List[Optional[dict]], job_id: str) -> dict:
+    """
+    Индексирует пачку распарсенных статей (воркер embedding): общие батчи эмбеддингов
+    для всех чанков, запись индексов одним проходом и метаданных одним коммитом.
+    """
+    # Разные PDF могут оказаться одной статьёй
+    articles = list({a["arxiv_id"]: a for a in parsed if a}.values())
+    duplicates = sum(1 for a in parsed if a) - len(articles)
+    if duplicates:
+        bulk_progress.incr(job_id, "skipped", duplicates)
+    if not articles:
+        return bulk_progress.get(job_id)
+
+    db = SessionLocal()
+    try:
+        num_chunks, embedding_stats = store_articles_chunks(articles, celery_globals.embedding_model, celery_globals.vectorstore)
+        save_articles_metadata(db, articles)
+    except Exception as e:
+        for a in articles:
+            bulk_progress.fail(job_id, a["arxiv_id"], str(e))
+        raise
+    finally:
+        db.close()
+
+    for a in articles:
+        ingest_cache.cache_result(a["arxiv_id"], {
+            "message": f"Статья '{a['title']}' обработана успешно",
+            "arxiv_id": a["arxiv_id"],
+            "title": a["title"],
+            "num_chunks": num_chunks[a["arxiv_id"]]
+        })
+        precompute_summary_task.delay(a["arxiv_id"])
+
+    bulk_progress.incr(job_id, "indexed", len(articles))
+    return {**bulk_progress.get(job_id), "embedding_cache": embedding_stats}
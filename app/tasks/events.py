@@ -0,0 +1,18 @@
+from celery.signals import task_success, task_failure
+from app.services.task_events import publish_task_done
+
+
+@task_success.connect
+def notify_task_success(sender=None, result=None, **kwargs):
+    """
+    Будит ожидающих клиентов сразу после успешного завершения задачи.
+    """
+    publish_task_done(sender.request.id, {"status": "completed", "result": result})
+
+
+@task_failure.connect
+def notify_task_failure(sender=None, task_id=None, exception=None, **kwargs):
+    """
+    Сообщает ожидающим клиентам об ошибке задачи.
+    """
+    publish_task_done(task_id, {"status": "failed", "error": str(exception)})
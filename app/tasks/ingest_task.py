@@ -1,51 +1,177 @@
 from fastapi import APIRouter
+from typing import Optional
+from celery import chain, uuid
+from celery.exceptions import Retry
+from app.config import INGEST_LOCK_TTL_SECONDS, INGEST_WAIT_RETRY_SECONDS
 from app.db.database import SessionLocal
-from app.services.article_parser import parse_and_split_article, extract_arxiv_id
+from app.services.article_parser import parse_and_split_article, normalize_arxiv_id, identify_pdf
+from app.services import ingest_cache
 from app.services.vectorstore import store_chunks
-from app.celery_globals import embedding_model
+from app import celery_globals
+from app.tasks.summarize_task import precompute_summary_task
 from celery_app import celery
 from app.db.crud import (
     get_article_by_id,
-    save_article_metadata,
+    save_ingested_article,
     get_user_arxiv_id,
     register_user_session
 )
 
 router = APIRouter()
 
-@celery.task
-def ingest_article_task(user_id: str, source: str, is_pdf: bool = False) -> dict:
+def enqueue_ingest(user_id: str, source: str, is_pdf: bool = False) -> str:
     """
-    Загружает и обрабатывает статью (по ссылке или PDF).
+    Запускает цепочку загрузки статьи: парсинг PDF (очередь ingest)
+    → эмбеддинг и сохранение (очередь embedding).
+
+    returns:
+        str: ID итоговой задачи цепочки — по нему клиент получает результат
+    """
+    task_id = uuid()
+    chain(
+        ingest_article_task.s(user_id, source, is_pdf, task_id),
+        index_article_task.s().set(task_id=task_id)
+    ).apply_async()
+    return task_id
+
+def already_ingested(db, user_id: str, arxiv_id: str) -> Optional[dict]:
+    """
+    Если статья уже загружена, привязывает её к пользователю и возвращает результат.
+    """
+    cached = ingest_cache.get_cached_result(arxiv_id)
+    if cached is None and not get_article_by_id(db, arxiv_id):
+        return None
+
+    register_user_session(db, user_id, arxiv_id)
+    result = {
+        "message": f"Статья уже загружена ранее. Привязана к вашему профилю.",
+        "arxiv_id": arxiv_id,
+        "skipped": True
+    }
+    if cached:
+        result["title"] = cached.get("title")
+    return result
+
+# Сколько раз повторная загрузка проверяет чужую блокировку: не дольше её TTL
+INGEST_WAIT_RETRIES = INGEST_LOCK_TTL_SECONDS // INGEST_WAIT_RETRY_SECONDS + 1
+
+@celery.task(bind=True)
+def ingest_article_task(self, user_id: str, source: str, is_pdf: bool = False, task_id: Optional[str] = None) -> dict:
+    """
+    Загружает и парсит статью (по ссылке или PDF). CPU-задача воркера ingest,
+    моделей не требует.
+
+    Для ссылок ID нормализуется и проверяется до скачивания. Одновременные загрузки
+    одной статьи схлопываются: загружает владелец блокировки, а остальные не занимают
+    поток воркера ожиданием — задача перезапускается через INGEST_WAIT_RETRY_SECONDS
+    и, когда владелец закончит, получает уже загруженную статью.
 
     Args:
         user_id (str): Telegram user_id
-        source (str): либо arXiv-ссылка, либо путь к PDF
+        source (str): либо arXiv-ссылка (или ID), либо путь к PDF
         is_pdf (bool): True, если это PDF-файл, False — если ссылка
+        task_id (str): ID итоговой задачи цепочки — владелец блокировки загрузки
+
+    Returns:
+        dict: Распарсенная статья для index_article_task, готовый результат или ошибка
     """
     db = SessionLocal()
+    locked_id = None
+    pdf_sha = None
 
     try:
-        arxiv_id, title, md_cleaned, abstract, conclusion = parse_and_split_article(source, is_pdf)
+        if is_pdf:
+            # Тот же файл уже разбирался — статью можно найти без парсинга
+            pdf_sha, known_id = identify_pdf(source)
+            existing = known_id and already_ingested(db, user_id, known_id)
+            if existing:
+                return {"result": existing}
+        else:
+            arxiv_id = normalize_arxiv_id(source)
+            if not arxiv_id:
+                return {"error": "Не удалось распознать arXiv ID в ссылке"}
+
+            existing = already_ingested(db, user_id, arxiv_id)
+            if existing:
+                return {"result": existing}
 
-        if get_article_by_id(db, arxiv_id):
-            register_user_session(db, user_id, arxiv_id)
-            return {
-                "message": f"Статья уже загружена ранее. Привязана к вашему профилю.",
-                "arxiv_id": arxiv_id,
-                "skipped": True
-            }
+            if task_id:
+                owner = ingest_cache.acquire_lock(arxiv_id, task_id)
+                # Владелец — другая задача (своя блокировка бывает при повторной доставке сообщения)
+                if owner is not None and owner != task_id:
+                    if self.request.retries == 0:
+                        ingest_cache.collapsed.inc()
+                    if self.request.retries >= INGEST_WAIT_RETRIES:
+                        return {"error": "Статья всё ещё загружается по другому запросу, попробуйте позже"}
+                    # Если загрузка владельца не удастся, блокировка снимется и при перезапуске загрузим сами
+                    raise self.retry(countdown=INGEST_WAIT_RETRY_SECONDS, max_retries=INGEST_WAIT_RETRIES)
+                locked_id = arxiv_id
+            source = arxiv_id
 
-        chunks = store_chunks(md_cleaned, arxiv_id, title, embedding_model)
-        save_article_metadata(db, arxiv_id, title, abstract, conclusion)
-        register_user_session(db, user_id, arxiv_id)
+        arxiv_id, title, md_cleaned, abstract, conclusion = parse_and_split_article(source, is_pdf, pdf_sha=pdf_sha)
+
+        existing = already_ingested(db, user_id, arxiv_id)
+        if existing:
+            if locked_id:
+                ingest_cache.release_lock(locked_id, task_id)
+            return {"result": existing}
 
         return {
+            "user_id": user_id,
+            "arxiv_id": arxiv_id,
+            "title": title,
+            "md_cleaned": md_cleaned,
+            "abstract": abstract,
+            "conclusion": conclusion
+        }
+
+    except Retry:
+        raise
+
+    except Exception as e:
+        if locked_id:
+            ingest_cache.release_lock(locked_id, task_id)
+        # Ошибку передаём дальше по цепочке, чтобы её получил клиент, ждущий итоговую задачу
+        return {"error": str(e)}
+
+    finally:
+        db.close()
+
+@celery.task(bind=True)
+def index_article_task(self, article: dict) -> dict:
+    """
+    Разбивает статью на чанки и сохраняет эмбеддинги (воркер embedding),
+    затем сохраняет метаданные и привязывает статью к пользователю.
+    Итог кешируется в Redis, блокировка загрузки статьи снимается.
+
+    Args:
+        article (dict): Результат ingest_article_task
+    """
+    if "error" in article:
+        raise RuntimeError(article["error"])
+    if "result" in article:
+        return article["result"]
+
+    arxiv_id, title = article["arxiv_id"], article["title"]
+    db = SessionLocal()
+
+    try:
+        chunks, embedding_stats = store_chunks(article["md_cleaned"], arxiv_id, title, celery_globals.embedding_model, celery_globals.vectorstore)
+        save_ingested_article(db, article["user_id"], arxiv_id, title, article["abstract"], article["conclusion"])
+
+        # Резюме готовим заранее в низкоприоритетной очереди
+        precompute_summary_task.delay(arxiv_id)
+
+        result = {
             "message": f"Статья '{title}' обработана успешно",
             "arxiv_id": arxiv_id,
             "title": title,
-            "num_chunks": len(chunks)
+            "num_chunks": len(chunks),
+            "embedding_cache": embedding_stats
         }
+        ingest_cache.cache_result(arxiv_id, result)
+        return result
 
     finally:
+        ingest_cache.release_lock(arxiv_id, self.request.id)
         db.close()
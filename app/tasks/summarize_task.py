@@ -1,17 +1,29 @@
-from typing import List
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
+from typing import Dict
 from celery_app import celery
 from app.db.database import SessionLocal
-from app.db.crud import get_user_arxiv_id, get_article_by_id
-from app.celery_globals import llm, tokenizer
-import redis
-import hashlib
-import json
+from app.db.crud import get_user_arxiv_id, get_article_by_id, get_article_summary, save_article_summary
+from app import celery_globals
+from app.config import SUMMARY_BACKGROUND_MAX_PENDING
+from app.services.batching import PRIORITY_INTERACTIVE, PRIORITY_BACKGROUND
+from app.services.prefix_cache import chat_prefixes
 
 SYSTEM_MSG = (
     "Ты — помощник по научным статьям. "
     "Сформулируй краткое и точное резюме по тексту ниже. Отвечай строго на русском языке"
 )
 
+# Генерации резюме в работе по arxiv_id. Очереди generation и background обслуживает
+# один процесс воркера, поэтому повторный запрос той же статьи ждёт уже запущенную генерацию
+_pending: Dict[str, Future] = {}
+_pending_lock = threading.Lock()
+
+# Запись резюме в БД: колбэки Future выполняются в потоке батчера, и запись в SQLite
+# (до busy_timeout) задерживала бы интерактивные батчи
+_store_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="summary-store")
+
 def build_messages(article) -> list[dict]:
     full_text = f"Abstract:\n{article.abstract}\n\nConclusion:\n{article.conclusion}"
 
@@ -21,13 +33,74 @@ def build_messages(article) -> list[dict]:
         {"role": "assistant", "content": "Краткое резюме:"},
     ]
 
-def make_cache_key(arxiv_id: str) -> str:
-    return f"summary:{arxiv_id}"
+def submit_summary(article, priority: int = PRIORITY_INTERACTIVE) -> Future:
+    """
+    Ставит генерацию резюме статьи в очередь батчера.
+
+    args:
+        article (ArticleMetadata): Метаданные статьи
+        priority (int): Приоритет генерации
+
+    returns:
+        Future: Future с текстом резюме
+    """
+    messages = build_messages(article)
+    prompt = celery_globals.tokenizer.apply_chat_template(messages, tokenize=False, add_generation_prompt=True, enable_thinking=False)
+    prefixes = chat_prefixes(celery_globals.tokenizer, messages, [1])
+    return celery_globals.llm_backend.submit(prompt, priority=priority, prefixes=prefixes, max_new_tokens=256, temperature=0.7, top_p=0.8, top_k=20, min_p=0)
+
+def summary_future(article, priority: int = PRIORITY_INTERACTIVE) -> Future:
+    """
+    Возвращает генерацию резюме статьи: уже запущенную для того же arxiv_id
+    (например, предварительную из precompute_summary_task) или новую.
+    Готовое резюме сохраняется в БД вне потока батчера.
+
+    args:
+        article (ArticleMetadata): Метаданные статьи
+        priority (int): Приоритет новой генерации
+
+    returns:
+        Future: Future с текстом резюме
+    """
+    with _pending_lock:
+        future = _pending.get(article.arxiv_id)
+        if future is None:
+            future = submit_summary(article, priority=priority)
+            _pending[article.arxiv_id] = future
+            future.add_done_callback(partial(store_summary_callback, article.arxiv_id))
+    return future
+
+def store_summary_callback(arxiv_id: str, future: Future):
+    """
+    Колбэк Future генерации (поток батчера): передаёт сохранение резюме в _store_executor.
+    """
+    _store_executor.submit(store_summary, arxiv_id, future)
+
+def store_summary(arxiv_id: str, future: Future):
+    """
+    Сохраняет готовое резюме в БД и снимает генерацию из _pending.
+    Запись из _pending убирается только после сохранения, чтобы новый запрос
+    не запустил генерацию заново, пока резюме ещё не в БД.
+    """
+    try:
+        if future.exception() is None:
+            db = SessionLocal()
+            try:
+                save_article_summary(db, arxiv_id, future.result())
+            finally:
+                db.close()
+    finally:
+        with _pending_lock:
+            if _pending.get(arxiv_id) is future:
+                del _pending[arxiv_id]
 
 @celery.task
 def summarize_article_task(user_id: str) -> dict:
     """
-    Фоновая задача: генерирует краткое резюме статьи, связанной с user_id.
+    Фоновая задача: возвращает краткое резюме статьи, связанной с user_id.
+    Обычно резюме уже подготовлено при загрузке статьи (precompute_summary_task),
+    и задача сводится к чтению из БД; если предварительная генерация ещё идёт,
+    задача дожидается её, иначе резюме генерируется и сохраняется.
 
     args:
         user_id (str): id пользователя
@@ -40,34 +113,53 @@ def summarize_article_task(user_id: str) -> dict:
         arxiv_id = get_user_arxiv_id(db, user_id)
         if not arxiv_id:
             return {"error": "У пользователя нет связанной статьи"}
-        
+
         # Получаем метаданные статьи из базы данных
         article = get_article_by_id(db, arxiv_id)
         if not article:
             return {"error": "Статья не найдена"}
 
-        # Проверка кеша
-        cache_key = make_cache_key(arxiv_id)
-        cached = r.get(cache_key)
-        if cached:
-            return json.loads(cached)
-            
-        # Используем chat_template
-        messages = build_messages(article)
-        messages = tokenizer.apply_chat_template(messages, tokenize=False, add_generation_prompt=True, enable_thinking=False)
-        summary = llm(messages, max_new_tokens=256, temperature=0.7, top_p=0.8, top_k=20, min_p=0)[0]['generated_text']
-
-        result = {
+        summary = get_article_summary(db, arxiv_id)
+        if summary is None:
+            summary = summary_future(article).result()
+
+        return {
             "arxiv_id": arxiv_id,
             "title": article.title,
             "summary": summary,
             "abstract": article.abstract,
             "conclusion": article.conclusion
         }
-        
-        # Сохранение кеша на 24ч
-        r.set(cache_key, json.dumps(result, ensure_ascii=False), ex=60 * 60 * 24) 
-        return result
 
     finally:
         db.close()
+
+@celery.task(bind=True, max_retries=None)
+def precompute_summary_task(self, arxiv_id: str) -> dict:
+    """
+    Низкоприоритетная задача (очередь background): заранее генерирует резюме
+    только что загруженной статьи, чтобы интерактивная суммаризация была простым чтением из БД.
+
+    Задача не ждёт окончания генерации и не занимает поток воркера: резюме
+    сохраняется в БД по готовности Future (summary_future). Если фоновых промптов в батчере уже много,
+    задача откладывается, чтобы не раздувать очередь в памяти.
+
+    args:
+        arxiv_id (str): ID статьи
+    """
+    db = SessionLocal()
+    try:
+        if get_article_summary(db, arxiv_id) is not None:
+            return {"arxiv_id": arxiv_id, "skipped": True}
+
+        article = get_article_by_id(db, arxiv_id)
+        if not article:
+            return {"error": "Статья не найдена"}
+    finally:
+        db.close()
+
+    if celery_globals.llm_backend.pending(PRIORITY_BACKGROUND) >= SUMMARY_BACKGROUND_MAX_PENDING:
+        raise self.retry(countdown=30)
+
+    summary_future(article, priority=PRIORITY_BACKGROUND)
+    return {"arxiv_id": arxiv_id, "queued": True}
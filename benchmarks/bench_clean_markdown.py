@@ -0,0 +1,72 @@
+"""
+Микробенчмарк очистки markdown и извлечения секций: исходная построчная реализация
+(benchmarks/legacy_markdown.py) против предкомпилированных правил и SectionIndex.
+
+    python -m benchmarks.bench_clean_markdown --copies 40
+"""
+import argparse
+import os
+import timeit
+
+from app.services import article_parser
+from benchmarks import legacy_markdown
+
+CORPUS_DIR = os.path.join(os.path.dirname(__file__), "..", "tests", "golden", "markdown")
+
+SECTIONS = [("abstract", ["absctract", "summary"]), ("conclusion", ["conclusions", "closing remarks"])]
+
+
+def load_document(copies: int) -> str:
+    """
+    Длинная статья из корпуса: у numbered_sections.md каждый абзац тела повторён copies раз,
+    так что Abstract остаётся в начале, а Conclusion — в конце документа.
+    """
+    with open(os.path.join(CORPUS_DIR, "numbered_sections.md"), encoding="utf-8") as f:
+        blocks = f.read().split("\n\n")
+    return "\n\n".join(
+        block if block.startswith("#") else "\n\n".join([block] * copies)
+        for block in blocks
+    )
+
+
+def legacy_pipeline(md_raw: str):
+    cleaned = legacy_markdown.clean_markdown_for_rag(md_raw)
+    return [legacy_markdown.extract_section(cleaned, s, a) for s, a in SECTIONS]
+
+
+def new_pipeline(md_raw: str):
+    cleaned = article_parser.clean_markdown_for_rag(md_raw)
+    index = article_parser.SectionIndex(cleaned)
+    return [index.find(s, a) for s, a in SECTIONS]
+
+
+def bench(fn, arg, number: int) -> float:
+    return min(timeit.repeat(lambda: fn(arg), number=number, repeat=5)) / number
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--copies", type=int, default=40)
+    parser.add_argument("--number", type=int, default=5)
+    args = parser.parse_args()
+
+    md_raw = load_document(args.copies)
+    cleaned = article_parser.clean_markdown_for_rag(md_raw)
+    assert cleaned == legacy_markdown.clean_markdown_for_rag(md_raw)
+    assert new_pipeline(md_raw) == legacy_pipeline(md_raw)
+    print(f"Документ: {len(md_raw.splitlines())} строк, {len(md_raw) // 1024} КБ")
+
+    cases = [
+        ("очистка", legacy_markdown.clean_markdown_for_rag, article_parser.clean_markdown_for_rag, md_raw),
+        ("секции", lambda md: [legacy_markdown.extract_section(md, s, a) for s, a in SECTIONS],
+         lambda md: [article_parser.SectionIndex(md).find(s, a) for s, a in SECTIONS], cleaned),
+        ("всё вместе", legacy_pipeline, new_pipeline, md_raw),
+    ]
+    print(f"{'этап':>12} {'было, мс':>10} {'стало, мс':>10} {'ускорение':>10}")
+    for name, old, new, arg in cases:
+        old_s, new_s = bench(old, arg, args.number), bench(new, arg, args.number)
+        print(f"{name:>12} {old_s * 1000:>10.2f} {new_s * 1000:>10.2f} {old_s / new_s:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
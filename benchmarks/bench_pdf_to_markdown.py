@@ -0,0 +1,96 @@
+"""
+Скорость конвертации PDF → markdown (pdf_to_markdown) в зависимости от числа процессов.
+
+    python -m benchmarks.bench_pdf_to_markdown --pdf-dir articles --workers 1,2,4,8
+
+Без --pdf-dir генерирует синтетические статьи (--synthetic N штук по --pages страниц).
+Страницы в секунду считаются по полному числу страниц документа: страницы после
+References не конвертируются (ранняя остановка), и это тоже часть выигрыша.
+"""
+import argparse
+import glob
+import os
+import statistics
+import tempfile
+import time
+
+
+def make_synthetic_pdf(path: str, pages: int):
+    import fitz
+
+    doc = fitz.open()
+    body = " ".join(["Transformers process tokens in parallel with self-attention."] * 40)
+    for i in range(pages):
+        page = doc.new_page()
+        y = 72
+        if i == 0:
+            page.insert_text((72, y), "Synthetic Paper Title", fontsize=20)
+            y += 40
+        if i == pages - 3:
+            page.insert_text((72, y), "References", fontsize=16)
+            y += 30
+        else:
+            page.insert_text((72, y), f"{i + 1} Section {i + 1}", fontsize=16)
+            y += 30
+        page.insert_textbox(fitz.Rect(72, y, 540, 760), body, fontsize=10)
+    doc.save(path)
+    doc.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pdf-dir", help="Каталог с PDF")
+    parser.add_argument("--workers", default="1,2,4", help="Числа процессов через запятую")
+    parser.add_argument("--pages-per-shard", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--synthetic", type=int, default=4, help="Сколько синтетических PDF создать без --pdf-dir")
+    parser.add_argument("--pages", type=int, default=40, help="Страниц в синтетическом PDF")
+    args = parser.parse_args()
+
+    worker_counts = [int(w) for w in args.workers.split(",")]
+    # Пул создаётся один раз на PARSE_WORKERS процессов; workers ограничивает число диапазонов в работе
+    os.environ["PARSE_WORKERS"] = str(max(worker_counts))
+
+    import fitz
+    from app.services.article_parser import pdf_to_markdown
+
+    tmp_dir = None
+    if args.pdf_dir:
+        paths = sorted(glob.glob(os.path.join(args.pdf_dir, "**", "*.pdf"), recursive=True))
+    else:
+        tmp_dir = tempfile.TemporaryDirectory()
+        paths = []
+        for i in range(args.synthetic):
+            paths.append(os.path.join(tmp_dir.name, f"paper_{i}.pdf"))
+            make_synthetic_pdf(paths[-1], args.pages)
+    if not paths:
+        raise SystemExit("PDF не найдены")
+
+    total_pages = 0
+    for path in paths:
+        with fitz.open(path) as doc:
+            total_pages += doc.page_count
+    print(f"{len(paths)} PDF, {total_pages} страниц, {args.pages_per_shard} страниц в диапазоне")
+
+    # Запуск процессов пула не должен попасть в замер
+    pdf_to_markdown(paths[0], workers=max(worker_counts), pages_per_shard=args.pages_per_shard)
+
+    print(f"{'процессов':>10} {'сек':>8} {'стр/с':>8} {'ускорение':>10}")
+    baseline = None
+    for workers in worker_counts:
+        runs = []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            for path in paths:
+                pdf_to_markdown(path, workers=workers, pages_per_shard=args.pages_per_shard)
+            runs.append(time.perf_counter() - started)
+        seconds = statistics.median(runs)
+        baseline = baseline or seconds
+        print(f"{workers:>10} {seconds:>8.2f} {total_pages / seconds:>8.1f} {baseline / seconds:>9.2f}x")
+
+    if tmp_dir:
+        tmp_dir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Задержка поиска чанков одной статьи: индексы по статьям (ArticleIndexStore, NumPy)
+против общей коллекции Chroma с фильтром по arxiv_id (прежний путь retrieve_and_rerank).
+
+    python -m benchmarks.bench_retrieval --articles 1000,10000,100000 --chunks 100 --dim 1024
+
+Эмбеддинги случайные (нормированные), статьи для запросов выбираются по закону Ципфа —
+как у реального бота, где часть статей «горячие». Для индексов по статьям отдельно
+меряются запросы из LRU (warm) и с чтением индекса с диска (cold).
+Объём данных: articles × chunks × dim × 4 байт на каждую из двух сторон — для 100k статей
+уменьшайте --chunks/--dim или ограничьте Chroma через --chroma-max-articles.
+"""
+import argparse
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+CHROMA_BATCH = 5000
+
+
+def percentiles(samples):
+    ms = np.asarray(samples) * 1000
+    return np.percentile(ms, 50), np.percentile(ms, 99)
+
+
+def article_embeddings(rng: np.random.Generator, chunks: int, dim: int) -> np.ndarray:
+    vectors = rng.standard_normal((chunks, dim), dtype=np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def build(root: str, articles: int, chunks: int, dim: int, with_chroma: bool, seed: int):
+    import chromadb
+    from langchain.schema import Document
+    from app.services.article_index import ArticleIndexStore
+
+    rng = np.random.default_rng(seed)
+    store = ArticleIndexStore(embedding_function=None, root=f"{root}/numpy")
+    collection = None
+    if with_chroma:
+        client = chromadb.PersistentClient(path=f"{root}/chroma")
+        # Как у langchain Chroma по умолчанию: одна коллекция, L2
+        collection = client.get_or_create_collection("langchain")
+
+    batch_ids, batch_vectors, batch_meta, batch_texts = [], [], [], []
+    for a in range(articles):
+        arxiv_id = f"bench.{a:06d}"
+        vectors = article_embeddings(rng, chunks, dim)
+        texts = [f"chunk {i} of article {a} about topic {a % 97}" for i in range(chunks)]
+        docs = [Document(page_content=t, metadata={"arxiv_id": arxiv_id, "chunk_id": i}) for i, t in enumerate(texts)]
+        store.add_documents(arxiv_id, docs, vectors)
+
+        if collection is not None:
+            batch_ids += [f"{arxiv_id}-{i}" for i in range(chunks)]
+            batch_vectors += vectors.tolist()
+            batch_meta += [{"arxiv_id": arxiv_id} for _ in range(chunks)]
+            batch_texts += texts
+            if len(batch_ids) >= CHROMA_BATCH or a == articles - 1:
+                collection.add(ids=batch_ids, embeddings=batch_vectors, metadatas=batch_meta, documents=batch_texts)
+                batch_ids, batch_vectors, batch_meta, batch_texts = [], [], [], []
+    return store, collection
+
+
+def run(articles: int, args):
+    from app.services.article_index import ArticleIndexStore
+
+    root = tempfile.mkdtemp(prefix="bench_retrieval_")
+    try:
+        with_chroma = articles <= args.chroma_max_articles
+        started = time.perf_counter()
+        store, collection = build(root, articles, args.chunks, args.dim, with_chroma, args.seed)
+        print(f"\n{articles} статей × {args.chunks} чанков, dim={args.dim}: индексы построены за {time.perf_counter() - started:.1f} с")
+
+        rng = np.random.default_rng(args.seed + 1)
+        targets = [f"bench.{(z - 1) % articles:06d}" for z in rng.zipf(1.2, args.queries)]
+        queries = article_embeddings(rng, args.queries, args.dim)
+
+        # Отдельный экземпляр: LRU заполняется только запросами
+        store = ArticleIndexStore(embedding_function=None, root=store.root, cache_size=args.cache_size)
+        rows = {}
+
+        samples = []
+        for arxiv_id, q in zip(targets, queries):
+            t = time.perf_counter()
+            store.search(arxiv_id, "", k=args.k, query_embedding=q)
+            samples.append(time.perf_counter() - t)
+        rows["numpy, Zipf (LRU)"] = samples
+
+        samples = []
+        for arxiv_id, q in zip(targets, queries):
+            store.search(arxiv_id, "", k=args.k, query_embedding=q)
+            t = time.perf_counter()
+            store.search(arxiv_id, "", k=args.k, query_embedding=q)
+            samples.append(time.perf_counter() - t)
+        rows["numpy, warm"] = samples
+
+        samples = []
+        for arxiv_id, q in zip(targets, queries):
+            store._cache.clear()
+            t = time.perf_counter()
+            store.search(arxiv_id, "", k=args.k, query_embedding=q)
+            samples.append(time.perf_counter() - t)
+        rows["numpy, cold (диск)"] = samples
+
+        if collection is not None:
+            samples = []
+            for arxiv_id, q in zip(targets, queries):
+                t = time.perf_counter()
+                collection.query(query_embeddings=[q.tolist()], n_results=args.k, where={"arxiv_id": arxiv_id})
+                samples.append(time.perf_counter() - t)
+            rows["chroma + filter"] = samples
+
+        print(f"{'путь':>20} {'p50, мс':>9} {'p99, мс':>9}")
+        for name, samples in rows.items():
+            p50, p99 = percentiles(samples)
+            print(f"{name:>20} {p50:>9.2f} {p99:>9.2f}")
+        if collection is None:
+            print(f"{'chroma + filter':>20}  пропущено (--chroma-max-articles {args.chroma_max_articles})")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--articles", default="1000,10000,100000", help="Размеры корпуса через запятую")
+    parser.add_argument("--chunks", type=int, default=100, help="Чанков в статье")
+    parser.add_argument("--dim", type=int, default=1024, help="Размерность эмбеддингов (bge-m3 — 1024)")
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=20)
+    parser.add_argument("--cache-size", type=int, default=256, help="Размер LRU индексов (VECTOR_INDEX_CACHE_SIZE)")
+    parser.add_argument("--chroma-max-articles", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    for articles in (int(a) for a in args.articles.split(",")):
+        run(articles, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Очистка markdown и извлечение секций в том виде, в каком они были до предкомпилированных
+правил и SectionIndex. Эталон для золотого корпуса (tests/golden) и бенчмарка.
+"""
+import re
+from typing import List, Optional
+
+
+def clean_markdown_for_rag(md_raw: str) -> str:
+    lines = md_raw.splitlines()
+    cleaned_lines = []
+
+    for line in lines:
+        stripped = line.strip()
+
+        if stripped == "-----":
+            continue
+
+        if re.fullmatch(r'[\d\s\.,%]+', stripped):
+            continue
+
+        line = re.sub(r'\*\[(,|\*|\d+)\]\*', '', line)
+        line = re.sub(r'\*(,+|\s*[,\.])\*', '', line)
+        line = re.sub(r'^(#{1,6})\s*\*\*(.*?)\*\*\s*$', r'\1 \2', line)
+        line = re.sub(r'\*{3,}', '**', line)
+        line = re.sub(r'\s{2,}', ' ', line)
+
+        cleaned_lines.append(line)
+
+    cleaned_text = "\n".join(cleaned_lines)
+    cleaned_text = re.sub(r'\n{3,}', '\n\n', cleaned_text)
+
+    return cleaned_text
+
+
+def extract_section(md_text: str, section: str, aliases: Optional[List[str]] = None) -> str:
+    lines = md_text.splitlines()
+    start_idx, end_idx = None, None
+
+    all_keys = [section.lower()] + [a.lower() for a in aliases or []]
+
+    for i, line in enumerate(lines):
+        line_clean = re.sub(r'[\*\#]', '', line).strip().lower()
+        for key in all_keys:
+            if re.match(rf'^(\d+[\.\d+]*)?\s*{re.escape(key)}$', line_clean):
+                start_idx = i + 1
+                break
+        if start_idx:
+            break
+
+    if start_idx is None:
+        return ""
+
+    for j in range(start_idx, len(lines)):
+        next_line_clean = re.sub(r'[\*\#]', '', lines[j]).strip().lower()
+        if re.match(r'^(\d+[\.\d+]*)?\s+\w+', next_line_clean):
+            end_idx = j
+            break
+
+    section_lines = lines[start_idx:end_idx] if end_idx else lines[start_idx:]
+    return "\n".join(section_lines).strip()
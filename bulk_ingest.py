@@ -0,0 +1,51 @@
+"""
+Массовая загрузка статей из командной строки:
+
+    python bulk_ingest.py 1706.03762 https://arxiv.org/abs/2005.14165
+    python bulk_ingest.py --file reading_list.txt
+
+В файле — по одному arXiv ID, ссылке или пути к PDF на строку (# — комментарий).
+Пути к PDF должны быть доступны воркерам (например, в общем каталоге articles/).
+"""
+import argparse
+import time
+
+from app.services import bulk_progress
+from app.tasks.bulk_ingest_task import enqueue_bulk_ingest
+
+
+def read_sources(path: str) -> list:
+    with open(path, encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith("#")]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Массовая загрузка статей arXiv/PDF")
+    parser.add_argument("sources", nargs="*", help="arXiv ID, ссылки или пути к PDF")
+    parser.add_argument("--file", help="Файл со списком статей")
+    parser.add_argument("--interval", type=float, default=5.0, help="Период вывода прогресса, сек")
+    args = parser.parse_args()
+
+    sources = list(args.sources)
+    if args.file:
+        sources += read_sources(args.file)
+    if not sources:
+        parser.error("не указано ни одной статьи")
+
+    job_id = enqueue_bulk_ingest(sources)
+    print(f"Задание {job_id}: {len(sources)} источников")
+
+    while True:
+        progress = bulk_progress.get(job_id)
+        print(
+            f"[{progress['elapsed_seconds']:>7.1f} с] "
+            f"проиндексировано {progress['indexed']}/{progress['total']}, "
+            f"распарсено {progress['parsed']}, пропущено {progress['skipped']}, ошибок {progress['failed']}, "
+            f"{progress['papers_per_min']} статей/мин"
+        )
+        if progress["status"] == "completed":
+            break
+        time.sleep(args.interval)
+
+    for error in progress["errors"]:
+        print(f"  ✗ {error}")
@@ -10,4 +10,20 @@ celery = Celery(
     task_send_sent_event=True,
     worker_send_task_events=True
 )
+celery.conf.update(
+    # CPU-парсинг, эмбеддинг/реранкинг и генерация обслуживаются разными воркерами.
+    # Фоновая предгенерация резюме идёт в отдельную очередь и не обгоняет живые запросы
+    task_routes={
+        "app.tasks.ingest_task.ingest_article_task": {"queue": "ingest"},
+        "app.tasks.ingest_task.index_article_task": {"queue": "embedding"},
+        "app.tasks.bulk_ingest_task.bulk_prepare_task": {"queue": "ingest"},
+        "app.tasks.bulk_ingest_task.bulk_parse_task": {"queue": "ingest"},
+        "app.tasks.bulk_ingest_task.bulk_index_task": {"queue": "embedding"},
+        "app.tasks.ask_task.retrieve_context_task": {"queue": "embedding"},
+        "app.tasks.ask_task.ask_article_task": {"queue": "generation"},
+        "app.tasks.summarize_task.summarize_article_task": {"queue": "generation"},
+        "app.tasks.summarize_task.precompute_summary_task": {"queue": "background"},
+    },
+    worker_prefetch_multiplier=1,
+)
 celery.autodiscover_tasks(["app.tasks"])
\ No newline at end of file
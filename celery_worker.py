@@ -1,36 +1,147 @@
+import time
+
 from celery_app import celery
-import torch
-from transformers import AutoTokenizer, AutoModelForCausalLM, BitsAndBytesConfig, pipeline
-from langchain.embeddings import HuggingFaceBgeEmbeddings
-from langchain.vectorstores import Chroma
-from FlagEmbedding import FlagReranker
+from celery.signals import worker_init
+from celery.worker.control import inspect_command
 from app import celery_globals
+from app.db.database import init_db
+from app.db import cache as db_cache
+from app.config import WORKER_PRELOAD, LLM_BACKEND, LLM_MODEL, LLM_DEVICE, LLM_MAX_BATCH_SIZE, LLM_MAX_WAIT_MS, PREFIX_CACHE_MAX_MB, WORKER_ROLES
+from app.services import metrics
+from app.services.batching import GenerationBatcher
+from app.services.prefix_cache import PrefixKVCache
+from app.services.components import registry
 
-@celery.on_after_configure.connect
-def setup_globals(sender, **kwargs):
-    print("Инициализация глобальных компонентов Celery...")
-    
-    # LLM
-    model_name = "Qwen/Qwen3-8B"
-    tokenizer = AutoTokenizer.from_pretrained(model_name)
-    model = AutoModelForCausalLM.from_pretrained(model_name, torch_dtype="auto", device_map="cuda")
 
-    celery_globals.llm = pipeline("text-generation", model=model, tokenizer=tokenizer, return_full_text=False)
+# Тяжёлые библиотеки импортируются внутри загрузчиков: воркеру ingest они не нужны
+
+def load_llm():
+    from transformers import AutoTokenizer
+
+    # Для батчевой генерации паддинг должен быть слева
+    tokenizer = AutoTokenizer.from_pretrained(LLM_MODEL, padding_side="left")
+    if tokenizer.pad_token is None:
+        tokenizer.pad_token = tokenizer.eos_token
+    # Токенизатор нужен задачам при любом бэкенде: chat_template и бюджет контекста
     celery_globals.tokenizer = tokenizer
 
-    # Embedder
+    LLM_BACKENDS[LLM_BACKEND](tokenizer)
+
+
+def load_pipeline_backend(tokenizer):
+    from transformers import AutoModelForCausalLM, pipeline
+
+    model = AutoModelForCausalLM.from_pretrained(LLM_MODEL, torch_dtype="auto", device_map=LLM_DEVICE)
+
+    celery_globals.llm = pipeline("text-generation", model=model, tokenizer=tokenizer, return_full_text=False)
+    celery_globals.llm_backend = GenerationBatcher(
+        celery_globals.llm,
+        max_batch_size=LLM_MAX_BATCH_SIZE,
+        max_wait_ms=LLM_MAX_WAIT_MS,
+        prefix_cache=PrefixKVCache(model, tokenizer) if PREFIX_CACHE_MAX_MB > 0 else None
+    )
+
+
+def load_openai_backend(tokenizer):
+    from app.services.llm_backends import OpenAICompatibleBackend
+    celery_globals.llm_backend = OpenAICompatibleBackend()
+
+
+def load_llamacpp_backend(tokenizer):
+    from app.services.llm_backends import LlamaCppBackend
+    celery_globals.llm_backend = LlamaCppBackend()
+
+
+LLM_BACKENDS = {
+    "pipeline": load_pipeline_backend,
+    "openai": load_openai_backend,
+    "llamacpp": load_llamacpp_backend,
+}
+
+
+def load_embeddings():
+    import torch
+    from langchain.embeddings import HuggingFaceBgeEmbeddings
+    from app.services.article_index import ArticleIndexStore
+
     celery_globals.embedding_model = HuggingFaceBgeEmbeddings(
         model_name="BAAI/bge-m3",
         model_kwargs={"device": "cuda" if torch.cuda.is_available() else "cpu"}
     )
 
-    # Reranker
+    # Векторные индексы по статьям
+    celery_globals.vectorstore = ArticleIndexStore(embedding_function=celery_globals.embedding_model)
+
+
+def load_reranker():
+    from FlagEmbedding import FlagReranker
+
     celery_globals.reranker = FlagReranker("BAAI/bge-reranker-v2-m3", use_fp16=True)
 
-    # Vectorstore
-    celery_globals.vectorstore = Chroma(
-        persist_directory="chroma_storage",
-        embedding_function=celery_globals.embedding_model
-    )
 
-    print("Глобальные компоненты Celery инициализированы.")
\ No newline at end of file
+# Прогрев: первый вызов модели компилирует ядра и выделяет буферы — пусть это случится до первой задачи
+
+def warmup_llm():
+    celery_globals.llm_backend.generate("warm-up", max_new_tokens=1)
+
+
+def warmup_embeddings():
+    celery_globals.embedding_model.embed_query("warm-up")
+
+
+def warmup_reranker():
+    celery_globals.reranker.compute_score([["warm-up", "warm-up"]], normalize=True)
+
+
+registry.register("llm", load_llm, ["llm", "tokenizer", "llm_backend"], warmup_llm)
+registry.register("embeddings", load_embeddings, ["embedding_model", "vectorstore"], warmup_embeddings)
+registry.register("reranker", load_reranker, ["reranker"], warmup_reranker)
+
+# Какие компоненты нужны каждой роли воркера (ingest работает только с PDF и БД)
+ROLE_COMPONENTS = {
+    "ingest": [],
+    "embedding": ["embeddings", "reranker"],
+    "generation": ["llm"],
+}
+
+
+# worker_init, а не on_after_configure: конфигурация приложения происходит и в CLI (celery inspect),
+# где ни модели, ни запись о готовности не нужны
+@worker_init.connect
+def setup_globals(sender=None, **kwargs):
+    started = time.perf_counter()
+    init_db()
+
+    components = []
+    for role in WORKER_ROLES:
+        for name in ROLE_COMPONENTS[role]:
+            if name not in components:
+                components.append(name)
+
+    # Готовность воркера — только по компонентам его ролей.
+    # Компоненты загружаются при первом обращении; предзагрузка лишь делает это заранее в фоне,
+    # не задерживая подключение воркера к брокеру
+    registry.require(components)
+    registry.start_heartbeat()
+    if WORKER_PRELOAD and components:
+        registry.preload(components)
+
+    print(f"Воркер ({', '.join(WORKER_ROLES)}) запущен за {time.perf_counter() - started:.2f} с; компоненты: {', '.join(components) or 'нет'}")
+
+
+@inspect_command()
+def worker_metrics(state):
+    """
+    Метрики процесса воркера (батчинг генерации, кеши):
+    celery -A celery_worker inspect worker_metrics
+    """
+    return {**metrics.snapshot(), "db_cache": db_cache.stats()}
+
+
+@inspect_command()
+def worker_readiness(state):
+    """
+    Состояние и время загрузки компонентов воркера:
+    celery -A celery_worker inspect worker_readiness
+    """
+    return registry.status()
@@ -0,0 +1,81 @@
+"""
+Заглушка OpenAI-совместимого сервера генерации для тестов и локальной разработки
+без GPU: отвечает на /v1/completions детерминированным текстом, поддерживает stream.
+
+    python stub_llm_server.py --port 8001
+    LLM_BACKEND=openai LLM_SERVER_URL=http://localhost:8001 celery -A celery_worker worker ...
+"""
+import argparse
+import json
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def stub_answer(prompt: str, max_tokens: int) -> list:
+    """
+    Токены ответа: эхо последних слов промпта, не больше max_tokens.
+    """
+    words = prompt.split()[-max_tokens:] or ["ok"]
+    return [f"{w} " for w in words[:max_tokens]]
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    token_delay = 0.0
+
+    def _json(self, status: int, body: dict):
+        data = json.dumps(body, ensure_ascii=False).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path in ("/health", "/v1/models"):
+            return self._json(200, {"status": "ok", "data": [{"id": "stub"}]})
+        self._json(404, {"error": "not found"})
+
+    def do_POST(self):
+        if self.path != "/v1/completions":
+            return self._json(404, {"error": "not found"})
+
+        request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        tokens = stub_answer(request.get("prompt", ""), int(request.get("max_tokens", 16)))
+        model = request.get("model", "stub")
+
+        if not request.get("stream"):
+            return self._json(200, {
+                "object": "text_completion",
+                "model": model,
+                "choices": [{"index": 0, "text": "".join(tokens), "finish_reason": "length"}]
+            })
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+        for token in tokens:
+            chunk = {"object": "text_completion", "model": model, "choices": [{"index": 0, "text": token}]}
+            self.wfile.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode())
+            self.wfile.flush()
+            time.sleep(self.token_delay)
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_server(host: str = "127.0.0.1", port: int = 8001) -> ThreadingHTTPServer:
+    return ThreadingHTTPServer((host, port), StubHandler)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Заглушка OpenAI-совместимого LLM-сервера")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--token-delay", type=float, default=0.0, help="Пауза между токенами в stream, сек")
+    args = parser.parse_args()
+
+    StubHandler.token_delay = args.token_delay
+    print(f"Stub LLM server: http://{args.host}:{args.port}/v1/completions")
+    make_server(args.host, args.port).serve_forever()
@@ -0,0 +1,191 @@
+"""
+Redis в памяти для тестов: только команды, которые использует приложение.
+Время истечения ключей считается по ручным часам (advance), а не по реальному времени.
+"""
+import redis
+
+
+def _bytes(value) -> bytes:
+    return value if isinstance(value, bytes) else str(value).encode()
+
+
+class FakeRedis:
+
+    def __init__(self):
+        self.data = {}
+        self.expires = {}
+        self.now = 0.0
+        self.published = []
+        self._stream_seq = 0
+
+    # Время жизни ключей
+
+    def advance(self, seconds: float):
+        self.now += seconds
+
+    def _alive(self, key):
+        expires_at = self.expires.get(key)
+        if expires_at is not None and expires_at <= self.now:
+            self.data.pop(key, None)
+            self.expires.pop(key, None)
+        return key in self.data
+
+    def expire(self, key, seconds):
+        if not self._alive(key):
+            return False
+        self.expires[key] = self.now + seconds
+        return True
+
+    def ttl(self, key):
+        if not self._alive(key):
+            return -2
+        expires_at = self.expires.get(key)
+        return -1 if expires_at is None else int(expires_at - self.now)
+
+    def delete(self, *keys):
+        removed = 0
+        for key in keys:
+            removed += int(self._alive(key))
+            self.data.pop(key, None)
+            self.expires.pop(key, None)
+        return removed
+
+    def exists(self, key):
+        return int(self._alive(key))
+
+    # Строки
+
+    def get(self, key):
+        return self.data[key] if self._alive(key) else None
+
+    def mget(self, *keys):
+        return [self.get(key) for key in keys]
+
+    def set(self, key, value, ex=None, nx=False):
+        if nx and self._alive(key):
+            return None
+        self.data[key] = _bytes(value)
+        self.expires.pop(key, None)
+        if ex is not None:
+            self.expires[key] = self.now + ex
+        return True
+
+    def incr(self, key):
+        value = int(self.get(key) or 0) + 1
+        self.data[key] = _bytes(value)
+        return value
+
+    # Hash
+
+    def hset(self, key, field=None, value=None, mapping=None):
+        self._alive(key)
+        row = self.data.setdefault(key, {})
+        items = dict(mapping or {})
+        if field is not None:
+            items[field] = value
+        for name, v in items.items():
+            row[_bytes(name)] = _bytes(v)
+        return len(items)
+
+    def hmget(self, key, *fields):
+        row = self.data.get(key, {}) if self._alive(key) else {}
+        return [row.get(_bytes(name)) for name in fields]
+
+    # Sorted set
+
+    def _zset(self, key):
+        if not self._alive(key):
+            self.data[key] = {}
+        return self.data[key]
+
+    def zadd(self, key, mapping):
+        zset = self._zset(key)
+        added = sum(1 for member in mapping if _bytes(member) not in zset)
+        zset.update({_bytes(member): score for member, score in mapping.items()})
+        return added
+
+    def _zsorted(self, key):
+        zset = self.data.get(key, {}) if self._alive(key) else {}
+        return sorted(zset.items(), key=lambda item: (item[1], item[0]))
+
+    def zrange(self, key, start, end):
+        members = [member for member, _ in self._zsorted(key)]
+        return members[start:None if end == -1 else end + 1]
+
+    def zrem(self, key, *members):
+        zset = self.data.get(key, {}) if self._alive(key) else {}
+        return sum(1 for member in members if zset.pop(_bytes(member), None) is not None)
+
+    def zcard(self, key):
+        return len(self.data.get(key, {})) if self._alive(key) else 0
+
+    def zpopmin(self, key, count=1):
+        popped = self._zsorted(key)[:count]
+        for member, _ in popped:
+            self.data[key].pop(member)
+        return popped
+
+    # Stream
+
+    def xadd(self, key, fields):
+        if not self._alive(key):
+            self.data[key] = []
+        self._stream_seq += 1
+        entry_id = f"{self._stream_seq}-0".encode()
+        self.data[key].append((entry_id, {_bytes(k): _bytes(v) for k, v in fields.items()}))
+        return entry_id
+
+    def xrange(self, key, min="-", max="+"):
+        return list(self.data[key]) if self._alive(key) else []
+
+    # Pub/sub
+
+    def publish(self, channel, message):
+        self.published.append((channel, message))
+        return 0
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    """
+    Пайплайн с WATCH/MULTI: после watch команды выполняются сразу, после multi — копятся до execute.
+    """
+
+    def __init__(self, redis_):
+        self.redis = redis_
+        self.watched = {}
+        self.buffered = True
+        self.commands = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def watch(self, *keys):
+        self.buffered = False
+        self.watched = {key: self.redis.get(key) for key in keys}
+
+    def multi(self):
+        self.buffered = True
+
+    def execute(self):
+        if any(self.redis.get(key) != value for key, value in self.watched.items()):
+            raise redis.WatchError()
+        results = [getattr(self.redis, name)(*args, **kwargs) for name, args, kwargs in self.commands]
+        self.commands = []
+        return results
+
+    def __getattr__(self, name):
+        command = getattr(self.redis, name)
+
+        def call(*args, **kwargs):
+            if not self.buffered:
+                return command(*args, **kwargs)
+            self.commands.append((name, args, kwargs))
+            return self
+
+        return call
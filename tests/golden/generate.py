@@ -0,0 +1,56 @@
+"""
+Пересобирает ожидаемые результаты золотого корпуса эталонной (исходной) реализацией:
+
+    python -m tests.golden.generate
+
+Для каждого markdown/<имя>.md пишет <имя>.cleaned.md и <имя>.sections.json.
+"""
+import glob
+import json
+import os
+
+from benchmarks.legacy_markdown import clean_markdown_for_rag, extract_section
+
+GOLDEN_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# (секция, альтернативные названия) — как в parse_and_split_article, плюс произвольные секции
+SECTION_QUERIES = [
+    ("abstract", ["absctract", "summary"]),
+    ("conclusion", ["conclusions", "closing remarks"]),
+    ("introduction", None),
+    ("method", None),
+    ("related work", None),
+    ("experiments", None),
+    ("attention", None),
+    ("model architecture", None),
+    ("appendix", None),
+    ("acknowledgments", None),
+    ("section 3", None),
+    ("nonexistent section", None),
+]
+
+
+def section_key(section: str, aliases) -> str:
+    return "|".join([section] + (aliases or []))
+
+
+def main():
+    for path in sorted(glob.glob(os.path.join(GOLDEN_DIR, "markdown", "*.md"))):
+        if path.endswith(".cleaned.md"):
+            continue
+        with open(path, encoding="utf-8", newline="") as f:
+            md_raw = f.read()
+
+        cleaned = clean_markdown_for_rag(md_raw)
+        sections = {section_key(s, a): extract_section(cleaned, s, a) for s, a in SECTION_QUERIES}
+
+        base = path[:-len(".md")]
+        with open(f"{base}.cleaned.md", "w", encoding="utf-8", newline="") as f:
+            f.write(cleaned)
+        with open(f"{base}.sections.json", "w", encoding="utf-8") as f:
+            json.dump(sections, f, ensure_ascii=False, indent=2)
+        print(f"{os.path.basename(path)}: {sum(bool(v) for v in sections.values())} секций найдено")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+import math
+
+import numpy as np
+import pytest
+
+pytest.importorskip("langchain")
+
+from langchain.schema import Document
+
+from app.services.article_index import HYBRID_DEPTH, MULTI_ARTICLE_MIN_PER_ARTICLE, ArticleIndexStore, _normalize
+
+TOPICS = ["attention heads", "convolution kernels", "reward model", "dropout rate", "beam search"]
+
+
+def article_docs(a: int, chunks: int):
+    return [
+        Document(
+            page_content=f"article {a} discusses {TOPICS[(a + i) % len(TOPICS)]} in chunk {i}",
+            metadata={"arxiv_id": f"2401.{a:05d}", "chunk_id": i, "section": "1 Introduction" if i < 2 else "2 Results"}
+        )
+        for i in range(chunks)
+    ]
+
+
+@pytest.fixture
+def store(tmp_path):
+    rng = np.random.default_rng(0)
+    store = ArticleIndexStore(embedding_function=None, root=str(tmp_path / "index"))
+    for a in range(4):
+        docs = article_docs(a, 6 + a)
+        store.add_documents(f"2401.{a:05d}", docs, rng.standard_normal((len(docs), 16)).tolist())
+    return store
+
+
+def per_article_reference(store, arxiv_ids, query, query_embedding, k, section=None):
+    """
+    Прежняя реализация: отдельный плотный поиск по каждой статье.
+    """
+    indexes = [store.get(a) for a in arxiv_ids]
+    vector = _normalize(np.asarray(query_embedding, dtype=np.float32))
+    per_article = max(MULTI_ARTICLE_MIN_PER_ARTICLE, math.ceil(k / len(indexes)))
+    depth = min(HYBRID_DEPTH, 2 * per_article)
+    ranked = []
+    for index in indexes:
+        for rank, (doc, score) in enumerate(index.hybrid_search(query, vector, per_article, depth=depth, section=section)):
+            ranked.append((rank, -score, doc))
+    ranked.sort(key=lambda item: item[:2])
+    return [(doc, -neg_score) for _, neg_score, doc in ranked]
+
+
+def summary(results):
+    return [(doc.metadata["arxiv_id"], doc.metadata["chunk_id"], round(score, 5)) for doc, score in results]
+
+
+@pytest.mark.parametrize("section", [None, "results"])
+def test_single_pass_matches_per_article_search(store, section):
+    ids = [f"2401.{a:05d}" for a in range(4)]
+    query_embedding = np.random.default_rng(1).standard_normal(16)
+    for k in (1, 5, 12):
+        expected = per_article_reference(store, ids, "reward model", query_embedding, k, section)
+        assert summary(store.multi_hybrid_search(ids, "reward model", k, query_embedding, section)) == summary(expected)
+
+
+def test_every_article_is_represented(store):
+    ids = [f"2401.{a:05d}" for a in range(4)]
+    results = store.multi_hybrid_search(ids, "attention heads", 4, np.ones(16))
+    assert {doc.metadata["arxiv_id"] for doc, _ in results} == set(ids)
+
+
+def test_stacked_matrix_is_rebuilt_after_reindex(store):
+    ids = ["2401.00000", "2401.00001", "2401.99999"]
+    query_embedding = np.random.default_rng(2).standard_normal(16)
+    store.multi_hybrid_search(ids, "dropout", 4, query_embedding)
+    cached = store._stacked[("2401.00000", "2401.00001")][1]
+    store.multi_hybrid_search(ids, "dropout", 4, query_embedding)
+    assert store._stacked[("2401.00000", "2401.00001")][1] is cached
+
+    # Статья перезаписана: другое число чанков и новые эмбеддинги
+    docs = article_docs(1, 3)
+    store.add_documents("2401.00001", docs, [query_embedding.tolist()] * 3)
+    results = store.multi_hybrid_search(ids, "dropout", 4, query_embedding)
+    assert store._stacked[("2401.00000", "2401.00001")][1].shape[0] == 6 + 3
+    assert summary(results) == summary(per_article_reference(store, ids[:2], "dropout", query_embedding, 4))
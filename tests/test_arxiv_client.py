@@ -0,0 +1,175 @@
+"""
+Скачивание и метаданные arXiv (app/services/arxiv_client.py) против локальной заглушки arxiv.org:
+потоковая запись в хранилище, докачка через Range, повторы при 5xx и пакетный запрос метаданных.
+"""
+import hashlib
+import os
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+pytest.importorskip("arxiv")
+pytest.importorskip("requests")
+
+from app.services import arxiv_client
+from app.services.pdf_store import PdfStore
+
+PDF = os.urandom(300_000)
+
+FEED = """<?xml version="1.0" encoding="UTF-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom" xmlns:opensearch="http://a9.com/-/spec/opensearch/1.1/"
+      xmlns:arxiv="http://arxiv.org/schemas/atom">
+  <opensearch:totalResults>{total}</opensearch:totalResults>
+  <opensearch:startIndex>0</opensearch:startIndex>
+  <opensearch:itemsPerPage>{total}</opensearch:itemsPerPage>
+  {entries}
+</feed>"""
+
+ENTRY = """<entry>
+    <id>http://arxiv.org/abs/{arxiv_id}v2</id>
+    <updated>2024-01-02T00:00:00Z</updated>
+    <published>2024-01-01T00:00:00Z</published>
+    <title>Paper {arxiv_id}</title>
+    <summary>Abstract</summary>
+    <author><name>A. Author</name></author>
+    <link href="http://arxiv.org/abs/{arxiv_id}v2" rel="alternate" type="text/html"/>
+    <link title="pdf" href="http://arxiv.org/pdf/{arxiv_id}v2" rel="related" type="application/pdf"/>
+    <arxiv:primary_category term="cs.CL" scheme="http://arxiv.org/schemas/atom"/>
+    <category term="cs.CL" scheme="http://arxiv.org/schemas/atom"/>
+  </entry>"""
+
+
+class StubArxiv(BaseHTTPRequestHandler):
+    """
+    Отвечает по очереди ответами из plan: (статус, сколько байт отдать до обрыва или None).
+    На 206 отдаёт PDF с позиции из заголовка Range.
+    """
+
+    plan = []
+    requests = []
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        type(self).requests.append({"path": self.path, "range": self.headers.get("Range")})
+        if self.path.startswith("/api/query"):
+            return self.send_feed()
+
+        status, length = type(self).plan.pop(0)
+        if status >= 400:
+            self.send_response(status)
+            self.send_header("Retry-After", "0")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        start = int(self.headers["Range"][len("bytes="):-1]) if status == 206 else 0
+        body = PDF[start:]
+        self.send_response(status)
+        self.send_header("Content-Type", "application/pdf")
+        self.send_header("Content-Length", str(len(body)))
+        if status == 206:
+            self.send_header("Content-Range", f"bytes {start}-{len(PDF) - 1}/{len(PDF)}")
+        self.end_headers()
+        # Обрыв соединения: заявлена полная длина, отдана часть
+        self.wfile.write(body[:length] if length is not None else body)
+        self.wfile.flush()
+        if length is not None:
+            self.close_connection = True
+
+    def send_feed(self):
+        ids = parse_qs(urlparse(self.path).query)["id_list"][0].split(",")
+        known = [i for i in ids if not i.startswith("9999")]
+        body = FEED.format(total=len(known), entries="".join(ENTRY.format(arxiv_id=i) for i in known)).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/atom+xml")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@contextmanager
+def stub_arxiv(plan=()):
+    StubArxiv.plan = list(plan)
+    StubArxiv.requests = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubArxiv)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture(autouse=True)
+def no_waits(monkeypatch):
+    monkeypatch.setattr(arxiv_client, "ARXIV_MIN_INTERVAL_SECONDS", 0)
+    monkeypatch.setattr(arxiv_client.time, "sleep", lambda seconds: None)
+
+
+@pytest.fixture
+def store(tmp_path):
+    return PdfStore(root=str(tmp_path / "store"))
+
+
+def assert_stored(store, sha):
+    assert sha == hashlib.sha256(PDF).hexdigest()
+    with open(store.pdf_path(sha), "rb") as f:
+        assert f.read() == PDF
+    # Временные файлы скачивания не остаются в хранилище
+    assert not [name for name in os.listdir(store.root) if name.startswith(".download-")]
+
+
+def test_download_streams_into_store(store):
+    with stub_arxiv([(200, None)]) as url:
+        sha = arxiv_client.download_to_store(f"{url}/pdf/2401.00001", store)
+    assert_stored(store, sha)
+    assert len(StubArxiv.requests) == 1
+
+
+def test_download_resumes_with_range_after_disconnect(store):
+    with stub_arxiv([(200, 100_000), (206, None)]) as url:
+        sha = arxiv_client.download_to_store(f"{url}/pdf/2401.00001", store)
+    assert_stored(store, sha)
+    first, resumed = StubArxiv.requests
+    assert first["range"] is None
+    # Докачка с последнего записанного чанка, а не с нуля
+    assert resumed["range"].startswith("bytes=") and resumed["range"] != "bytes=0-"
+
+
+def test_download_restarts_when_range_is_ignored(store):
+    with stub_arxiv([(200, 100_000), (200, None)]) as url:
+        sha = arxiv_client.download_to_store(f"{url}/pdf/2401.00001", store)
+    assert_stored(store, sha)
+
+
+def test_download_retries_on_unavailable(store):
+    before = arxiv_client.download_retries.snapshot()
+    with stub_arxiv([(503, None), (429, None), (200, None)]) as url:
+        sha = arxiv_client.download_to_store(f"{url}/pdf/2401.00001", store)
+    assert_stored(store, sha)
+    assert arxiv_client.download_retries.snapshot() - before == 2
+
+
+def test_download_gives_up_after_retries(store, monkeypatch):
+    monkeypatch.setattr(arxiv_client, "ARXIV_DOWNLOAD_RETRIES", 1)
+    with stub_arxiv([(503, None), (503, None)]) as url:
+        with pytest.raises(arxiv_client.requests.HTTPError):
+            arxiv_client.download_to_store(f"{url}/pdf/2401.00001", store)
+    assert not [name for name in os.listdir(store.root) if name.startswith(".download-")]
+
+
+def test_metadata_for_several_ids_is_one_query(monkeypatch):
+    with stub_arxiv() as url:
+        monkeypatch.setattr(arxiv_client._client, "query_url_format", f"{url}/api/query?{{}}")
+        results = arxiv_client.fetch_metadata(["2401.00001", "2401.00002", "9999.99999"])
+
+    assert sorted(results) == ["2401.00001", "2401.00002"]
+    assert results["2401.00001"].title == "Paper 2401.00001"
+    assert results["2401.00002"].pdf_url.endswith("/pdf/2401.00002v2")
+    assert len(StubArxiv.requests) == 1
@@ -0,0 +1,88 @@
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("redis")
+
+from app.services.batching import GenerationBatcher, PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE
+
+
+class FakePipeline:
+    """
+    text-generation pipeline для тестов: ответ — промпт с префиксом, вызовы запоминаются.
+    Промпт "boom" роняет весь вызов; промпт "block" держит вызов, пока тест не откроет gate.
+    """
+
+    def __init__(self):
+        self.calls = []
+        self.gate = threading.Event()
+        self.gate.set()
+        self.entered = threading.Event()
+
+    def __call__(self, prompts, batch_size, **gen_kwargs):
+        self.calls.append(list(prompts))
+        if "block" in prompts:
+            self.entered.set()
+            self.gate.wait(5)
+        if "boom" in prompts:
+            raise RuntimeError("CUDA OOM")
+        return [[{"generated_text": f"out:{prompt}"}] for prompt in prompts]
+
+
+@pytest.fixture
+def llm():
+    return FakePipeline()
+
+
+def test_prompts_in_window_share_batch_up_to_max_size(llm):
+    batcher = GenerationBatcher(llm, max_batch_size=3, max_wait_ms=200)
+    futures = [batcher.submit(f"p{i}", max_new_tokens=8) for i in range(5)]
+
+    assert [f.result(timeout=5) for f in futures] == [f"out:p{i}" for i in range(5)]
+    assert llm.calls == [["p0", "p1", "p2"], ["p3", "p4"]]
+
+
+def test_window_expiry_closes_batch(llm):
+    batcher = GenerationBatcher(llm, max_batch_size=8, max_wait_ms=20)
+    first = batcher.submit("a")
+    first.result(timeout=5)
+    time.sleep(0.05)
+    second = batcher.submit("b")
+
+    assert second.result(timeout=5) == "out:b"
+    assert llm.calls == [["a"], ["b"]]
+
+
+def test_interactive_first_and_never_mixed_with_background(llm):
+    batcher = GenerationBatcher(llm, max_batch_size=8, max_wait_ms=10)
+    llm.gate.clear()
+    blocker = batcher.submit("block")
+    assert llm.entered.wait(5)
+
+    # Пока модель занята, копятся обе очереди; фоновые пришли раньше
+    background = [batcher.submit(f"bg{i}", priority=PRIORITY_BACKGROUND) for i in range(2)]
+    interactive = [batcher.submit(f"int{i}", priority=PRIORITY_INTERACTIVE) for i in range(2)]
+    assert batcher.pending(PRIORITY_BACKGROUND) == 2
+    llm.gate.set()
+
+    assert [f.result(timeout=5) for f in interactive] == ["out:int0", "out:int1"]
+    assert [f.result(timeout=5) for f in background] == ["out:bg0", "out:bg1"]
+    assert blocker.result(timeout=5) == "out:block"
+    assert llm.calls == [["block"], ["int0", "int1"], ["bg0", "bg1"]]
+
+
+def test_exception_fails_only_its_batch(llm):
+    batcher = GenerationBatcher(llm, max_batch_size=8, max_wait_ms=100)
+    # Разные параметры генерации — разные вызовы модели в одном окне
+    failing = [batcher.submit("boom", max_new_tokens=1), batcher.submit("x", max_new_tokens=1)]
+    ok = batcher.submit("y", max_new_tokens=2)
+
+    for future in failing:
+        with pytest.raises(RuntimeError, match="CUDA OOM"):
+            future.result(timeout=5)
+    assert ok.result(timeout=5) == "out:y"
+    assert sorted(llm.calls) == [["boom", "x"], ["y"]]
+
+    # Батчер продолжает работать после ошибки
+    assert batcher.submit("z").result(timeout=5) == "out:z"
@@ -0,0 +1,124 @@
+"""
+Асинхронный клиент бота (tg_bot/api_client.py) против локальной заглушки FastAPI:
+нагрузочный тест с N одновременными чатами и политика повторов.
+"""
+import asyncio
+import os
+import statistics
+import sys
+import time
+from contextlib import asynccontextmanager
+
+import pytest
+
+pytest.importorskip("aiohttp")
+pytest.importorskip("dotenv")
+
+import aiohttp
+from aiohttp import web
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "tg_bot"))
+import api_client  # noqa: E402
+
+# Задержки заглушки: постановка задачи в очередь и её выполнение воркером
+ENQUEUE_DELAY = 0.05
+TASK_DELAY = 0.2
+
+
+@asynccontextmanager
+async def stub_api(routes):
+    app = web.Application()
+    app.add_routes(routes)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    host, port = runner.addresses[0][:2]
+    client = api_client.ApiClient(f"http://{host}:{port}")
+    try:
+        yield client
+    finally:
+        await client.close()
+        await runner.cleanup()
+
+
+def task_routes():
+    async def ask_async(request):
+        body = await request.json()
+        await asyncio.sleep(ENQUEUE_DELAY)
+        return web.json_response({"task_id": f"task-{body['user_id']}"})
+
+    async def wait_result(request):
+        await asyncio.sleep(TASK_DELAY)
+        return web.json_response({"status": "completed", "result": {"answer": "ok"}})
+
+    return [
+        web.post("/ask_async", ask_async),
+        web.get("/task_status/{task_id}/wait", wait_result),
+    ]
+
+
+async def chat_latencies(client, users: int):
+    """
+    Имитирует users одновременных чатов: вопрос и ожидание ответа, как в ask_handler.
+    """
+    async def chat(user_id: str) -> float:
+        started = time.perf_counter()
+        task = await client.request("POST", "/ask_async", json={"user_id": user_id, "question": "?"})
+        await client.request("GET", f"/task_status/{task['task_id']}/wait", limited=False)
+        return time.perf_counter() - started
+
+    return await asyncio.gather(*(chat(str(i)) for i in range(users)))
+
+
+def test_handler_latency_does_not_grow_with_users():
+    async def run():
+        results = {}
+        async with stub_api(task_routes()) as client:
+            for users in (1, 10, 50):
+                latencies = sorted(await chat_latencies(client, users))
+                results[users] = (statistics.median(latencies), latencies[int(0.99 * (len(latencies) - 1))])
+        return results
+
+    results = asyncio.run(run())
+    for users, (p50, p99) in results.items():
+        print(f"{users:>3} чатов: p50 {p50 * 1000:.0f} мс, p99 {p99 * 1000:.0f} мс")
+
+    # С блокирующими вызовами задержка росла бы в users раз; здесь она почти постоянна
+    assert results[50][0] < 3 * results[1][0]
+
+
+def test_post_is_not_retried_after_read_timeout(monkeypatch):
+    monkeypatch.setattr(api_client, "API_RETRY_BACKOFF", 0)
+    hits = []
+
+    async def slow_ingest(request):
+        hits.append(1)
+        await asyncio.sleep(1)
+        return web.json_response({"task_id": "t"})
+
+    async def run():
+        async with stub_api([web.post("/ingest_async", slow_ingest)]) as client:
+            with pytest.raises(asyncio.TimeoutError):
+                await client.request("POST", "/ingest_async", json={}, timeout=aiohttp.ClientTimeout(total=0.2))
+
+    asyncio.run(run())
+    assert len(hits) == 1
+
+
+def test_get_is_retried_on_gateway_error(monkeypatch):
+    monkeypatch.setattr(api_client, "API_RETRY_BACKOFF", 0)
+    hits = []
+
+    async def flaky_status(request):
+        hits.append(1)
+        if len(hits) == 1:
+            return web.json_response({}, status=503)
+        return web.json_response({"status": "pending"})
+
+    async def run():
+        async with stub_api([web.get("/task_status/{task_id}/", flaky_status)]) as client:
+            return await client.request("GET", "/task_status/t/")
+
+    assert asyncio.run(run()) == {"status": "pending"}
+    assert len(hits) == 2
@@ -0,0 +1,80 @@
+import pytest
+
+pytest.importorskip("langchain_text_splitters")
+pytest.importorskip("fitz")
+pytest.importorskip("pymupdf4llm")
+
+from app.services.chunking import chunk_markdown, split_sections
+
+# Обычный вывод marker/pymupdf4llm: заголовок статьи "#", секции "##", нумерованные и нет
+PAPER = """# Attention Is All You Need
+
+Ashish Vaswani, Noam Shazeer
+
+## Abstract
+
+We propose the Transformer.
+
+## 1 Introduction
+
+Recurrent networks are sequential.
+
+## 2 Results
+
+The Transformer achieves 28.4 BLEU.
+
+### 2.1 Training Cost
+
+Training took 3.5 days.
+
+### Ablations
+
+Removing attention heads hurts.
+
+## Conclusion
+
+Attention is all you need.
+
+## Acknowledgments
+
+We thank the reviewers.
+"""
+
+
+def section_texts(md: str):
+    return [(path, md[start:end].strip()) for path, start, end in split_sections(md)]
+
+
+def test_unnumbered_headings_are_siblings_of_numbered_sections():
+    assert section_texts(PAPER) == [
+        (["Attention Is All You Need"], "Ashish Vaswani, Noam Shazeer"),
+        (["Abstract"], "We propose the Transformer."),
+        (["1 Introduction"], "Recurrent networks are sequential."),
+        (["2 Results"], "The Transformer achieves 28.4 BLEU."),
+        (["2 Results", "2.1 Training Cost"], "Training took 3.5 days."),
+        (["2 Results", "Ablations"], "Removing attention heads hurts."),
+        (["Conclusion"], "Attention is all you need."),
+        (["Acknowledgments"], "We thank the reviewers."),
+    ]
+
+
+def test_section_filter_does_not_leak_into_following_sections():
+    # section_mask ищет подстроку в пути секции
+    results = [doc.page_content for doc in chunk_markdown(PAPER) if "results" in doc.metadata["section"].lower()]
+    assert results == [
+        "The Transformer achieves 28.4 BLEU.",
+        "Training took 3.5 days.",
+        "Removing attention heads hurts.",
+    ]
+
+
+def test_unnumbered_document_uses_most_common_heading_level():
+    md = "## Title\n\nx\n\n### Abstract\n\na\n\n### Method\n\nm\n\n#### Details\n\nd\n\n### Conclusion\n\nc\n"
+    assert [path for path, _ in section_texts(md)] == [
+        ["Title"], ["Abstract"], ["Method"], ["Method", "Details"], ["Conclusion"],
+    ]
+
+
+def test_chunk_offsets_point_into_source():
+    for doc in chunk_markdown(PAPER, chunk_size=40, chunk_overlap=10):
+        assert PAPER[doc.metadata["char_start"]:doc.metadata["char_end"]] == doc.page_content
@@ -0,0 +1,42 @@
+import pytest
+
+pytest.importorskip("redis")
+
+from app.services.components import ComponentRegistry, STATE_PENDING, STATE_READY
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    registry = ComponentRegistry()
+    # Запись о готовности в Redis тест не проверяет
+    monkeypatch.setattr(registry, "publish", lambda: None)
+    loaded = []
+    for name in ("llm", "embeddings", "reranker"):
+        registry.register(name, lambda name=name: loaded.append(name), [name])
+    registry.loaded = loaded
+    return registry
+
+
+def test_ready_only_after_all_components_by_default(registry):
+    registry.ensure("embeddings")
+    assert registry.status()["ready"] is False
+
+
+def test_split_deployment_worker_is_ready_without_other_roles_components(registry):
+    # Воркер embedding: LLM зарегистрирована, но не нужна и не загружается
+    registry.require(["embeddings", "reranker"])
+    assert registry.status()["ready"] is False
+
+    registry.ensure("embeddings")
+    registry.ensure("reranker")
+    status = registry.status()
+
+    assert status["ready"] is True
+    assert status["components"]["llm"]["state"] == STATE_PENDING
+    assert status["components"]["reranker"]["state"] == STATE_READY
+    assert registry.loaded == ["embeddings", "reranker"]
+
+
+def test_worker_without_components_is_ready(registry):
+    registry.require([])
+    assert registry.status()["ready"] is True
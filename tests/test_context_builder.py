@@ -0,0 +1,65 @@
+from app.services.context_builder import build_context
+
+# Текст статьи: слова по 4 символа ("w00 "), так что смещения чанков считаются просто
+DOC = "".join(f"w{i:02d} " for i in range(40))
+
+
+class WordTokenizer:
+    """
+    Токенизатор для тестов: токен — слово.
+    """
+
+    def encode(self, text, add_special_tokens=False):
+        return text.split()
+
+    def decode(self, ids):
+        return " ".join(ids)
+
+
+def chunk(start_word: int, end_word: int, arxiv_id: str = "2401.00001", **extra) -> dict:
+    start, end = 4 * start_word, 4 * end_word
+    return {"text": DOC[start:end], "arxiv_id": arxiv_id, "char_start": start, "char_end": end, **extra}
+
+
+def words(first: int, last: int) -> str:
+    return " ".join(f"w{i:02d}" for i in range(first, last + 1))
+
+
+def test_chunk_over_budget_is_skipped_and_later_ones_still_fit():
+    chunks = [chunk(0, 4), chunk(10, 15), chunk(20, 23)]
+    context, parts = build_context(chunks, WordTokenizer(), budget=8)
+
+    assert parts == [words(0, 3), words(20, 22)]
+    assert context == f"{words(0, 3)}\n\n{words(20, 22)}"
+
+
+def test_first_chunk_is_truncated_to_budget():
+    context, parts = build_context([chunk(0, 10), chunk(20, 21)], WordTokenizer(), budget=3)
+    assert parts == [words(0, 2)]
+    assert context == words(0, 2)
+
+
+def test_overlapping_chunks_are_trimmed():
+    chunks = [
+        chunk(0, 10),
+        chunk(8, 18),                    # перекрывается с первым на два слова
+        chunk(2, 9),                     # целиком внутри первого
+        chunk(8, 18, arxiv_id="other"),  # те же смещения, но другая статья
+    ]
+    _, parts = build_context(chunks, WordTokenizer(), budget=100)
+    assert parts == [words(0, 9), words(10, 17), words(8, 17)]
+
+
+def test_chunk_without_offsets_is_kept_whole():
+    chunks = [chunk(0, 10), {"text": DOC[0:40], "arxiv_id": "2401.00001"}]
+    _, parts = build_context(chunks, WordTokenizer(), budget=100)
+    assert parts == [words(0, 9), DOC[0:40]]
+
+
+def test_source_labels_count_towards_budget():
+    chunks = [chunk(0, 3, title="Attention"), chunk(10, 13, arxiv_id="2401.00002")]
+    _, parts = build_context(chunks, WordTokenizer(), budget=8, label_sources=True)
+    assert parts == [f"[Attention]\n{words(0, 2)}", f"[2401.00002]\n{words(10, 12)}"]
+
+    _, parts = build_context(chunks, WordTokenizer(), budget=7, label_sources=True)
+    assert parts == [f"[Attention]\n{words(0, 2)}"]
@@ -0,0 +1,81 @@
+import os
+
+import pytest
+
+redis = pytest.importorskip("redis")
+pytest.importorskip("sqlalchemy")
+
+from app.db import cache as db_cache
+from app.db.cache import ReadThroughCache
+from tests.fake_redis import FakeRedis
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    fake = FakeRedis()
+    monkeypatch.setattr(db_cache, "r", fake)
+    # Поток pub/sub тесту не нужен
+    monkeypatch.setattr(db_cache, "_listener_pid", os.getpid())
+    return fake
+
+
+@pytest.fixture
+def cache(fake_redis):
+    return ReadThroughCache("test_rows", local_size=8, local_ttl=60, ttl=60)
+
+
+def counting_loader(rows):
+    calls = []
+
+    def loader():
+        calls.append(1)
+        return rows[len(calls) - 1]
+
+    loader.calls = calls
+    return loader
+
+
+def test_miss_fills_both_tiers(cache, fake_redis):
+    loader = counting_loader([{"v": 1}])
+    assert cache.get("a", loader) == {"v": 1}
+    assert cache.get("a", loader) == {"v": 1}
+    assert len(loader.calls) == 1
+    assert fake_redis.get(cache._redis_key("a")) == b'{"v": 1}'
+
+    # Другой процесс: пустой LRU, значение приходит из Redis
+    cache.drop_local("a")
+    assert cache.get("a", loader) == {"v": 1}
+    assert cache.stats()["redis_hits"] >= 1
+
+
+def test_stale_reader_does_not_overwrite_write_through(cache, fake_redis):
+    def loader():
+        # Пока читатель ждёт БД, писатель коммитит новую строку и делает write-through
+        cache.invalidate("a", {"v": 2})
+        return {"v": 1}
+
+    assert cache.get("a", loader) == {"v": 1}
+    assert fake_redis.get(cache._redis_key("a")) == b'{"v": 2}'
+    # Устаревшее значение не осталось и в локальном LRU
+    assert cache.get("a", counting_loader([None])) == {"v": 2}
+
+
+def test_stale_reader_does_not_refill_deleted_key(cache, fake_redis):
+    def loader():
+        cache.invalidate("a")
+        return {"v": 1}
+
+    cache.get("a", loader)
+    assert fake_redis.get(cache._redis_key("a")) is None
+
+    fresh = counting_loader([{"v": 2}])
+    assert cache.get("a", fresh) == {"v": 2}
+    assert len(fresh.calls) == 1
+
+
+def test_missing_row_is_cached(cache):
+    loader = counting_loader([None])
+    assert cache.get("a", loader) is None
+    cache.drop_local("a")
+    assert cache.get("a", loader) is None
+    assert len(loader.calls) == 1
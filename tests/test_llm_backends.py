@@ -0,0 +1,95 @@
+"""
+OpenAICompatibleBackend против заглушки сервера генерации (stub_llm_server.py):
+обычный и потоковый ответ (SSE), публикация токенов в Redis stream и параметры сэмплинга.
+"""
+import threading
+
+import pytest
+
+pytest.importorskip("requests")
+pytest.importorskip("redis")
+
+import stub_llm_server
+from app.services import streaming
+from app.services.batching import PRIORITY_BACKGROUND
+from app.services.llm_backends import OpenAICompatibleBackend, _sampling_params
+from tests.fake_redis import FakeRedis
+
+PROMPT = "<|im_start|>user\nКак устроен attention в трансформерах<|im_end|>"
+
+
+@pytest.fixture(scope="module")
+def server_url():
+    server = stub_llm_server.make_server(port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def backend(server_url):
+    return OpenAICompatibleBackend(base_url=server_url + "/", model="stub", concurrency=2, timeout=10)
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    fake = FakeRedis()
+    monkeypatch.setattr(streaming, "r", fake)
+    return fake
+
+
+def stream_entries(fake, key):
+    return [{k.decode(): v.decode() for k, v in fields.items()} for _, fields in fake.xrange(key)]
+
+
+def test_generate_without_stream(backend, fake_redis):
+    expected = "".join(stub_llm_server.stub_answer(PROMPT, 3))
+    assert backend.generate(PROMPT, max_new_tokens=3) == expected
+    assert fake_redis.data == {}
+
+
+def test_stream_publishes_each_token(backend, fake_redis):
+    # Ответ с кириллицей: сервер не указывает charset у text/event-stream
+    tokens = stub_llm_server.stub_answer(PROMPT, 4)
+    key = streaming.stream_key("task-1")
+
+    assert backend.generate(PROMPT, stream_key=key, max_new_tokens=4) == "".join(tokens)
+
+    entries = stream_entries(fake_redis, key)
+    assert [e["text"] for e in entries if e["type"] == "token"] == tokens
+    assert entries[-1] == {"type": "end"}
+    assert fake_redis.ttl(key) > 0
+
+
+def test_background_priority_and_pending(backend, fake_redis):
+    future = backend.submit(PROMPT, priority=PRIORITY_BACKGROUND, max_new_tokens=2)
+    assert future.result(timeout=10) == "".join(stub_llm_server.stub_answer(PROMPT, 2))
+    assert backend.pending(PRIORITY_BACKGROUND) == 0
+
+
+def test_sse_parsing_skips_comments_and_stops_at_done(backend, monkeypatch):
+    lines = [": keep-alive", "", 'data: {"choices": [{"text": "a"}]}', 'data: {"choices": [{}]}', "data: [DONE]", 'data: {"choices": [{"text": "after"}]}']
+
+    class Response:
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+        def raise_for_status(self):
+            pass
+
+        def iter_lines(self):
+            return iter(line.encode() for line in lines)
+
+    monkeypatch.setattr(backend.session, "post", lambda *args, **kwargs: Response())
+    assert list(backend._complete(PROMPT, stream=True)) == ["a", ""]
+
+
+def test_sampling_params_mapping():
+    gen_kwargs = {"max_new_tokens": 256, "temperature": 0.7, "top_p": 0.8, "top_k": 20, "min_p": 0, "do_sample": True}
+    assert _sampling_params(gen_kwargs) == {"max_tokens": 256, "temperature": 0.7, "top_p": 0.8, "top_k": 20, "min_p": 0}
+    assert _sampling_params({}) == {}
@@ -0,0 +1,57 @@
+"""
+Золотой корпус: предкомпилированная очистка markdown и SectionIndex дают тот же результат,
+что и исходная построчная реализация (ожидаемые файлы — tests/golden/generate.py).
+"""
+import glob
+import json
+import os
+import random
+
+import pytest
+
+pytest.importorskip("fitz")
+pytest.importorskip("pymupdf4llm")
+
+from app.services.article_parser import SectionIndex, clean_markdown_for_rag, extract_section
+from benchmarks import legacy_markdown
+from tests.golden.generate import GOLDEN_DIR, SECTION_QUERIES, section_key
+
+CORPUS = sorted(
+    path for path in glob.glob(os.path.join(GOLDEN_DIR, "markdown", "*.md"))
+    if not path.endswith(".cleaned.md")
+)
+
+
+def read(path: str) -> str:
+    with open(path, encoding="utf-8", newline="") as f:
+        return f.read()
+
+
+@pytest.mark.parametrize("path", CORPUS, ids=os.path.basename)
+def test_golden_output(path):
+    base = path[:-len(".md")]
+    cleaned = clean_markdown_for_rag(read(path))
+    assert cleaned == read(f"{base}.cleaned.md")
+
+    expected = json.loads(read(f"{base}.sections.json"))
+    index = SectionIndex(cleaned)
+    for section, aliases in SECTION_QUERIES:
+        key = section_key(section, aliases)
+        assert index.find(section, aliases) == expected[key], key
+        assert extract_section(cleaned, section, aliases) == expected[key], key
+
+
+def test_matches_legacy_on_random_documents():
+    # Случайные документы из "опасных" фрагментов: разметка, числа, пробелы, заголовки
+    pieces = [
+        "# ", "## ", "### **", "**", "***", "*", "*[1]*", "*[,]*", "*,*", "* .*", "-----",
+        "1", "2.3", " 3.1.2 ", "%", ",", ".", "  ", "\t", "\r\n", "\n", "\n\n\n",
+        "Abstract", "Conclusion", "Conclusions", "Summary", "Introduction", "word", "x y",
+    ]
+    rng = random.Random(0)
+    for _ in range(2000):
+        md_raw = "".join(rng.choice(pieces) for _ in range(rng.randint(0, 60)))
+        cleaned = clean_markdown_for_rag(md_raw)
+        assert cleaned == legacy_markdown.clean_markdown_for_rag(md_raw), repr(md_raw)
+        for section, aliases in SECTION_QUERIES[:3]:
+            assert SectionIndex(cleaned).find(section, aliases) == legacy_markdown.extract_section(cleaned, section, aliases), repr(cleaned)
@@ -0,0 +1,36 @@
+import os
+import signal
+
+import pytest
+
+pytest.importorskip("fitz")
+pytest.importorskip("pymupdf4llm")
+
+from app.services import article_parser
+from benchmarks.bench_pdf_to_markdown import make_synthetic_pdf
+
+
+@pytest.fixture(scope="module")
+def pdf_path(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("pdf") / "paper.pdf")
+    make_synthetic_pdf(path, pages=10)
+    return path
+
+
+def test_parallel_output_matches_sequential(pdf_path):
+    sequential = article_parser.pdf_to_markdown(pdf_path, workers=1, pages_per_shard=2)
+    parallel = article_parser.pdf_to_markdown(pdf_path, workers=2, pages_per_shard=2)
+    assert parallel == sequential
+    assert "References" in parallel
+
+
+def test_broken_pool_is_recreated(pdf_path):
+    expected = article_parser.pdf_to_markdown(pdf_path, workers=1, pages_per_shard=2)
+
+    pool = article_parser._get_pdf_pool()
+    # Процессы пула запускаются лениво — прогоняем задачу, затем "роняем" один из них
+    pool.submit(os.getpid).result()
+    os.kill(next(iter(pool._processes)), signal.SIGKILL)
+
+    assert article_parser.pdf_to_markdown(pdf_path, workers=2, pages_per_shard=2) == expected
+    assert article_parser._get_pdf_pool() is not pool
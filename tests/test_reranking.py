@@ -0,0 +1,91 @@
+import pytest
+
+pytest.importorskip("langchain")
+
+from langchain.schema import Document
+
+from app.services import reranking
+from app.services.reranking import RerankScoreCache, rerank
+
+
+class CountingReranker:
+    """
+    Кросс-энкодер для тестов: оценка пары задана заранее, вызовы считаются.
+    """
+
+    def __init__(self, scores):
+        self.scores = scores
+        self.pairs = []
+
+    def compute_score(self, pairs, normalize=True):
+        self.pairs.extend(pairs)
+        scores = [self.scores[text] for _, text in pairs]
+        return scores[0] if len(scores) == 1 else scores
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache(monkeypatch):
+    monkeypatch.setattr(reranking, "score_cache", RerankScoreCache())
+
+
+def candidates(cosines):
+    return [(Document(page_content=f"chunk {i}"), cos) for i, cos in enumerate(cosines)]
+
+
+def counters():
+    return {
+        name: counter.snapshot()
+        for name, counter in [("scored", reranking.pairs_scored), ("skipped", reranking.pairs_skipped), ("cached", reranking.pairs_cached)]
+    }
+
+
+def delta(before):
+    after = counters()
+    return {name: after[name] - before[name] for name in after}
+
+
+def test_skips_reranking_when_dense_top_is_separated():
+    reranker = CountingReranker({})
+    before = counters()
+    result = rerank("q", candidates([0.9, 0.88, 0.5, 0.4]), reranker, top_n=2, skip_margin=0.15)
+
+    assert [doc.page_content for doc, _ in result] == ["chunk 0", "chunk 1"]
+    assert reranker.pairs == []
+    assert delta(before) == {"scored": 0, "skipped": 4, "cached": 0}
+
+
+def test_orders_by_cross_encoder_score():
+    scores = {"chunk 0": 0.1, "chunk 1": 0.7, "chunk 2": 0.3, "chunk 3": 0.9}
+    reranker = CountingReranker(scores)
+    result = rerank("q", candidates([0.6, 0.59, 0.58, 0.57]), reranker, top_n=2, batch_size=2, settle_score=1.1)
+
+    assert [(doc.page_content, score) for doc, score in result] == [("chunk 3", 0.9), ("chunk 1", 0.7)]
+    assert len(reranker.pairs) == 4
+
+
+def test_stops_once_top_n_is_settled():
+    scores = {"chunk 0": 0.97, "chunk 1": 0.96, "chunk 2": 0.99, "chunk 3": 0.99}
+    reranker = CountingReranker(scores)
+    before = counters()
+    result = rerank("q", candidates([0.6, 0.59, 0.58, 0.57]), reranker, top_n=2, batch_size=2, settle_score=0.95)
+
+    assert [doc.page_content for doc, _ in result] == ["chunk 0", "chunk 1"]
+    assert delta(before) == {"scored": 2, "skipped": 2, "cached": 0}
+
+
+def test_cached_scores_are_not_recomputed():
+    scores = {"chunk 0": 0.2, "chunk 1": 0.8, "chunk 2": 0.5}
+    reranker = CountingReranker(scores)
+    docs = candidates([0.6, 0.59, 0.58])
+    first = rerank("q", docs, reranker, top_n=2, settle_score=1.1)
+
+    before = counters()
+    second = rerank("q", docs, reranker, top_n=2, settle_score=1.1)
+    assert second == first
+    assert len(reranker.pairs) == 3
+    assert delta(before) == {"scored": 0, "skipped": 0, "cached": 3}
+
+
+def test_single_pair_score_is_wrapped():
+    reranker = CountingReranker({"chunk 0": 0.4})
+    assert rerank("q", candidates([0.6]), reranker, top_n=1, settle_score=1.1)[0][1] == 0.4
@@ -0,0 +1,80 @@
+import hashlib
+import itertools
+
+import numpy as np
+import pytest
+
+pytest.importorskip("redis")
+
+from app.services import semantic_cache as semantic_cache_module
+from app.services.semantic_cache import SemanticAnswerCache
+from tests.fake_redis import FakeRedis
+
+TTL = 100
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    # Монотонные оценки LRU: порядок обращений не зависит от разрешения часов
+    clock = itertools.count(1)
+    monkeypatch.setattr(semantic_cache_module.time, "time", lambda: float(next(clock)))
+    return FakeRedis()
+
+
+@pytest.fixture
+def cache(fake_redis):
+    return SemanticAnswerCache(fake_redis, threshold=0.95, ttl=TTL, max_entries=2)
+
+
+def unit(angle_degrees: float) -> list:
+    angle = np.radians(angle_degrees)
+    return [float(np.cos(angle)), float(np.sin(angle)), 0.0]
+
+
+def answer(text: str) -> dict:
+    return {"answer": text}
+
+
+def cache_id(question: str) -> bytes:
+    return hashlib.sha256(question.encode("utf-8")).hexdigest().encode()
+
+
+def test_similarity_threshold(cache):
+    cache.store("2401.00001", "Что такое attention?", unit(0), answer("a"))
+
+    # cos 5° ≈ 0.996 — тот же вопрос другими словами; cos 30° ≈ 0.87 — другой вопрос
+    assert cache.lookup("2401.00001", unit(5)) == answer("a")
+    assert cache.lookup("2401.00001", unit(30)) is None
+    # Эмбеддинг не нормирован — сравнение всё равно по косинусу
+    assert cache.lookup("2401.00001", [10 * x for x in unit(5)]) == answer("a")
+    # Ответы не переходят между статьями
+    assert cache.lookup("2401.00002", unit(0)) is None
+
+
+def test_entries_expire_after_ttl(cache, fake_redis):
+    cache.store("2401.00001", "q1", unit(0), answer("old"))
+    fake_redis.advance(TTL / 2)
+    cache.store("2401.00001", "q2", unit(90), answer("new"))
+    fake_redis.advance(TTL / 2)
+
+    # Запись q1 истекла, индекс LRU продлён записью q2
+    assert cache.lookup("2401.00001", unit(0)) is None
+    assert fake_redis.zrange(cache._lru_key("2401.00001"), 0, -1) == [cache_id("q2")]
+    assert cache.lookup("2401.00001", unit(90)) == answer("new")
+
+    fake_redis.advance(TTL)
+    assert cache.lookup("2401.00001", unit(90)) is None
+
+
+def test_lru_bound_evicts_least_recently_used(cache, fake_redis):
+    cache.store("2401.00001", "q1", unit(0), answer("1"))
+    cache.store("2401.00001", "q2", unit(90), answer("2"))
+    # Обращение к q1 делает q2 самым давним
+    assert cache.lookup("2401.00001", unit(0)) == answer("1")
+    cache.store("2401.00001", "q3", unit(180), answer("3"))
+
+    assert cache.lookup("2401.00001", unit(90)) is None
+    assert fake_redis.exists(cache._entry_key("2401.00001", cache_id("q2"))) == 0
+    assert cache.lookup("2401.00001", unit(0)) == answer("1")
+    assert cache.lookup("2401.00001", unit(180)) == answer("3")
+    assert fake_redis.zcard(cache._lru_key("2401.00001")) == 2
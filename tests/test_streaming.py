@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("redis")
+
+from app.config import STREAM_TTL_SECONDS
+from app.services import streaming
+from app.services.streaming import RedisBatchStreamer, publish_token, stream_key
+from tests.fake_redis import FakeRedis
+
+
+class CharTokenizer:
+    """
+    Токенизатор для тестов: токен — код символа.
+    """
+
+    def decode(self, tokens, skip_special_tokens=True):
+        return "".join(chr(t) for t in tokens)
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    fake = FakeRedis()
+    monkeypatch.setattr(streaming, "r", fake)
+    return fake
+
+
+def test_stream_of_crashed_worker_expires(fake_redis):
+    # Воркер упал после первых токенов: publish_end так и не вызван
+    key = stream_key("task-1")
+    publish_token(key, "При")
+    publish_token(key, "вет")
+    assert fake_redis.ttl(key) == STREAM_TTL_SECONDS
+
+    fake_redis.advance(STREAM_TTL_SECONDS)
+    assert fake_redis.exists(key) == 0
+
+
+def test_batch_streamer_sets_ttl_on_tokens(fake_redis):
+    keys = [stream_key("a"), None, stream_key("b")]
+    streamer = RedisBatchStreamer(CharTokenizer(), keys)
+    streamer.put(np.array([[1], [2], [3]]))  # промпты пропускаются
+    streamer.put(np.array([ord("x"), ord("y"), ord("z")]))
+
+    texts = {key: [fields[b"text"] for _, fields in fake_redis.xrange(key)] for key in keys if key}
+    assert texts == {stream_key("a"): [b"x"], stream_key("b"): [b"z"]}
+    assert all(fake_redis.ttl(key) == STREAM_TTL_SECONDS for key in texts)
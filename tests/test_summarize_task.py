@@ -0,0 +1,85 @@
+import threading
+from concurrent.futures import Future
+
+import pytest
+
+pytest.importorskip("celery")
+pytest.importorskip("FlagEmbedding")
+
+from app.db.models import ArticleMetadata
+from app.services.batching import PRIORITY_BACKGROUND
+from app.tasks import summarize_task
+
+
+class DummySession:
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def generations(monkeypatch):
+    """
+    Подменяет батчер и БД: генерации — Future, которые тест завершает сам,
+    сохранения записываются вместе с именем потока.
+    """
+    submitted, saved = [], []
+
+    def submit_summary(article, priority):
+        submitted.append((article.arxiv_id, priority))
+        return Future()
+
+    def save_article_summary(db, arxiv_id, summary):
+        saved.append((arxiv_id, summary, threading.current_thread().name))
+
+    monkeypatch.setattr(summarize_task, "submit_summary", submit_summary)
+    monkeypatch.setattr(summarize_task, "save_article_summary", save_article_summary)
+    monkeypatch.setattr(summarize_task, "SessionLocal", DummySession)
+    monkeypatch.setattr(summarize_task, "_pending", {})
+    return submitted, saved
+
+
+def resolve_on_batcher(future, result=None, error=None):
+    """
+    Завершает Future из отдельного потока, как GenerationBatcher._run, и дожидается сохранения.
+    """
+    def run():
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    thread = threading.Thread(target=run, name="llm-batcher")
+    thread.start()
+    thread.join()
+    # Пул сохранения однопоточный: пустая задача выполнится после сохранения
+    summarize_task._store_executor.submit(lambda: None).result()
+
+
+def test_interactive_request_reuses_pending_precompute(generations):
+    submitted, saved = generations
+    article = ArticleMetadata(arxiv_id="2401.00001", title="T")
+
+    background = summarize_task.summary_future(article, priority=PRIORITY_BACKGROUND)
+    interactive = summarize_task.summary_future(article)
+    assert interactive is background
+    assert submitted == [("2401.00001", PRIORITY_BACKGROUND)]
+
+    resolve_on_batcher(background, "резюме")
+    assert interactive.result() == "резюме"
+    assert [(arxiv_id, summary) for arxiv_id, summary, _ in saved] == [("2401.00001", "резюме")]
+    # Запись в БД — не в потоке батчера
+    assert saved[0][2].startswith("summary-store")
+    assert summarize_task._pending == {}
+
+
+def test_failed_generation_is_not_saved_and_can_be_retried(generations):
+    submitted, saved = generations
+    article = ArticleMetadata(arxiv_id="2401.00002", title="T")
+
+    future = summarize_task.summary_future(article)
+    resolve_on_batcher(future, error=RuntimeError("OOM"))
+    assert saved == []
+    assert summarize_task._pending == {}
+
+    assert summarize_task.summary_future(article) is not future
+    assert len(submitted) == 2
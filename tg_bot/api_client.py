@@ -1,30 +1,145 @@
-import requests
-from config import FASTAPI_URL
+import asyncio
+import json
+from contextlib import nullcontext
+from typing import Optional
 
-def ingest(user_id: str, url: str):
-    res = requests.post(f"{FASTAPI_URL}/ingest", json={"user_id": user_id, "arxiv_url": url})
-    return res.json()
+import aiohttp
+from config import (
+    FASTAPI_URL,
+    STREAM_READ_TIMEOUT,
+    TASK_WAIT_TIMEOUT,
+    API_MAX_CONNECTIONS,
+    API_MAX_CONCURRENCY,
+    API_REQUEST_TIMEOUT,
+    API_RETRIES,
+    API_RETRY_BACKOFF,
+)
 
-def summarize(user_id: str):
-    res = requests.post(f"{FASTAPI_URL}/summarize", json={"user_id": user_id})
-    return res.json()
+# Статусы шлюза, при которых повторяется идемпотентный запрос
+RETRY_STATUSES = {502, 503, 504}
 
-def ask(user_id: str, question: str):
-    res = requests.post(f"{FASTAPI_URL}/question_answer", json={"user_id": user_id, "question": question})
-    return res.json()
+# Методы, повтор которых не меняет результат. POST (ingest_async, ask_async) после таймаута
+# чтения или ответа шлюза мог уже поставить задачу в очередь — его повтор запустил бы её второй раз
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
 
-def ask_async(user_id: str, question: str):
-    res = requests.post(f"{FASTAPI_URL}/ask_async", json={"user_id": user_id, "question": question})
-    return res.json()
 
-def summarize_async(user_id: str):
-    res = requests.post(f"{FASTAPI_URL}/summarize_async", json={"user_id": user_id})
-    return res.json()
+class ApiClient:
+    """
+    Асинхронный клиент FastAPI с общим keep-alive пулом соединений,
+    таймаутами, повторами с экспоненциальной задержкой и ограничением
+    числа одновременных запросов.
 
-def ingest_async(user_id: str, source: str, is_pdf: bool):
-    res = requests.post(f"{FASTAPI_URL}/ingest_async", json={"user_id": user_id, "source": source, 'is_pdf': is_pdf})
-    return res.json()
+    Идемпотентные запросы повторяются при сетевых ошибках, таймаутах и RETRY_STATUSES.
+    Остальные — только если соединение не удалось установить (запрос точно не дошёл до API).
+    """
 
-def get_task_result(task_id: str):
-    res = requests.get(f"{FASTAPI_URL}/task_status/{task_id}")
-    return res.json()
\ No newline at end of file
+    def __init__(self, base_url: str):
+        self.base_url = base_url
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._semaphore = asyncio.Semaphore(API_MAX_CONCURRENCY)
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        # Сессия создаётся лениво, внутри работающего event loop
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=API_MAX_CONNECTIONS, keepalive_timeout=60),
+                timeout=aiohttp.ClientTimeout(total=API_REQUEST_TIMEOUT),
+            )
+        return self._session
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+    async def request(self, method: str, path: str, timeout: Optional[aiohttp.ClientTimeout] = None, limited: bool = True, **kwargs) -> dict:
+        """
+        Выполняет запрос к API и возвращает JSON-ответ.
+
+        args:
+            method (str): HTTP-метод
+            path (str): Путь относительно FASTAPI_URL
+            timeout (Optional[aiohttp.ClientTimeout]): Таймаут вместо стандартного
+            limited (bool): Учитывать ли запрос в ограничении API_MAX_CONCURRENCY
+            **kwargs: Параметры aiohttp (json, params, ...)
+
+        returns:
+            dict: Тело ответа
+        """
+        guard = self._semaphore if limited else nullcontext()
+        if timeout is not None:
+            kwargs["timeout"] = timeout
+        idempotent = method.upper() in IDEMPOTENT_METHODS
+        retry_errors = (aiohttp.ClientConnectionError, asyncio.TimeoutError) if idempotent else aiohttp.ClientConnectorError
+
+        for attempt in range(API_RETRIES + 1):
+            try:
+                async with guard:
+                    async with self.session.request(method, f"{self.base_url}{path}", **kwargs) as res:
+                        if not idempotent or res.status not in RETRY_STATUSES:
+                            res.raise_for_status()
+                            return await res.json()
+                        error = aiohttp.ClientResponseError(res.request_info, res.history, status=res.status)
+            except retry_errors as e:
+                error = e
+
+            if attempt == API_RETRIES:
+                raise error
+            await asyncio.sleep(API_RETRY_BACKOFF * 2 ** attempt)
+
+    async def stream(self, path: str):
+        """
+        Читает SSE-поток и отдаёт события по одному. Стрим не занимает слот
+        семафора: он открыт всё время генерации и не нагружает API.
+        """
+        timeout = aiohttp.ClientTimeout(total=None, sock_read=STREAM_READ_TIMEOUT)
+        async with self.session.get(f"{self.base_url}{path}", timeout=timeout) as res:
+            async for line in res.content:
+                line = line.decode("utf-8").strip()
+                if line.startswith("data:"):
+                    yield json.loads(line[len("data:"):])
+
+
+client = ApiClient(FASTAPI_URL)
+
+
+async def ingest(user_id: str, url: str):
+    return await client.request("POST", "/ingest", json={"user_id": user_id, "arxiv_url": url})
+
+async def summarize(user_id: str):
+    return await client.request("POST", "/summarize", json={"user_id": user_id})
+
+async def ask(user_id: str, question: str):
+    return await client.request("POST", "/question_answer", json={"user_id": user_id, "question": question})
+
+async def ask_async(user_id: str, question: str, all_articles: bool = False):
+    return await client.request("POST", "/ask_async", json={"user_id": user_id, "question": question, "all_articles": all_articles})
+
+async def summarize_async(user_id: str):
+    return await client.request("POST", "/summarize_async", json={"user_id": user_id})
+
+async def ingest_async(user_id: str, source: str, is_pdf: bool):
+    return await client.request("POST", "/ingest_async", json={"user_id": user_id, "source": source, 'is_pdf': is_pdf})
+
+async def get_task_result(task_id: str):
+    return await client.request("GET", f"/task_status/{task_id}/")
+
+async def wait_task_result(task_id: str):
+    """
+    Long-poll ожидание результата задачи: сервер отвечает, как только задача завершится,
+    либо возвращает status=pending по истечении TASK_WAIT_TIMEOUT секунд.
+    """
+    return await client.request(
+        "GET",
+        f"/task_status/{task_id}/wait",
+        params={"timeout": TASK_WAIT_TIMEOUT},
+        timeout=aiohttp.ClientTimeout(total=TASK_WAIT_TIMEOUT + 10),
+        # Long-poll почти всё время просто ждёт — не занимаем им слоты ограничения
+        limited=False
+    )
+
+def stream_task(task_id: str):
+    """
+    Асинхронно читает SSE-стрим токенов задачи и отдаёт события по одному.
+    """
+    return client.stream(f"/task_stream/{task_id}/")
@@ -5,4 +5,18 @@ load_dotenv(find_dotenv())
 
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 # Local FASTAPI_URL = "http://localhost:8000"
-FASTAPI_URL = "http://fastapi_app:8000"
\ No newline at end of file
+FASTAPI_URL = "http://fastapi_app:8000"
+
+# Стриминг ответа: таймаут чтения SSE и минимальный интервал между правками сообщения
+STREAM_READ_TIMEOUT = 60
+STREAM_EDIT_INTERVAL = 1.0
+
+# Long-poll ожидание результата задачи, сек
+TASK_WAIT_TIMEOUT = 25
+
+# HTTP-клиент к FastAPI: пул соединений, ограничение параллельных запросов, таймаут (сек), повторы
+API_MAX_CONNECTIONS = 100
+API_MAX_CONCURRENCY = 50
+API_REQUEST_TIMEOUT = 30
+API_RETRIES = 3
+API_RETRY_BACKOFF = 0.5
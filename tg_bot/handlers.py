@@ -1,11 +1,19 @@
+import asyncio
+import logging
+
+import aiohttp
 from aiogram import Router, F, Bot
 from aiogram.types import Message
 from aiogram.fsm.context import FSMContext
+from aiogram.exceptions import TelegramBadRequest
 from states import ArticleStates
 from keyboards import main_menu_keyboard
-from api_client import ingest, summarize, ask, summarize_async, ingest_async, ask_async, get_task_result
+from config import STREAM_EDIT_INTERVAL
+from api_client import summarize_async, ingest_async, ask_async, wait_task_result, stream_task
 
-import asyncio
+import time
+
+logger = logging.getLogger(__name__)
 
 router = Router()
 
@@ -29,17 +37,16 @@ async def ingest_article_handler(msg: Message, state: FSMContext, bot: Bot):
         file_info = await bot.get_file(msg.document.file_id)
         file_path = f"articles/{file_info.file_unique_id}.pdf"
         await bot.download_file(file_info.file_path, destination=file_path)
-        task_info = ingest_async(user_id=user_id, source=file_path, is_pdf=True)
+        task_info = await ingest_async(user_id=user_id, source=file_path, is_pdf=True)
 
     # Если ссылка
     else:
-        task_info = ingest_async(user_id=user_id, source=msg.text, is_pdf=False)
+        task_info = await ingest_async(user_id=user_id, source=msg.text, is_pdf=False)
 
     task_id = task_info["task_id"]
 
     while True:
-        await asyncio.sleep(2)
-        status_info = get_task_result(task_id)
+        status_info = await wait_task_result(task_id)
         if status_info["status"] == "completed":
             await wait_msg.delete()
             await msg.answer(f"✅ {status_info['result']['message']}")
@@ -58,13 +65,12 @@ async def summarize_handler(msg: Message, state: FSMContext):
     wait_msg = await msg.answer("🧠 Подождите, суммаризация запущена...")
 
     # Отправляем запрос на запуск задачи через FastAPI
-    task_info = summarize_async(user_id)
+    task_info = await summarize_async(user_id)
     task_id = task_info["task_id"]
 
-    # Пуллинг результата
+    # Ожидание результата (long-poll, сервер отвечает сразу по завершении задачи)
     while True:
-        await asyncio.sleep(2)
-        status_info = get_task_result(task_id)
+        status_info = await wait_task_result(task_id)
 
         if status_info["status"] == "completed":
             result = status_info["result"]
@@ -87,27 +93,57 @@ async def ask_prompt(msg: Message, state: FSMContext):
     await state.set_state(ArticleStates.asking_question)
 
 
+@router.message(F.text.lower() == "📚 вопрос по всем статьям")
+async def ask_across_prompt(msg: Message, state: FSMContext):
+    await msg.answer("📝 Напиши вопрос — ответ будет по всем загруженным тобой статьям (можно попросить сравнить их):")
+    await state.set_state(ArticleStates.asking_across_articles)
+
+
 @router.message(ArticleStates.asking_question)
+@router.message(ArticleStates.asking_across_articles)
 async def ask_handler(msg: Message, state: FSMContext):
     user_id = str(msg.from_user.id)
+    all_articles = await state.get_state() == ArticleStates.asking_across_articles.state
     wait_msg = await msg.answer("🤖 Думаю над ответом...")
 
     # Отправляем запрос на запуск задачи через FastAPI
-    task_info = ask_async(user_id, msg.text)
+    task_info = await ask_async(user_id, msg.text, all_articles)
     task_id = task_info["task_id"]
 
-    # Пуллинг результата
+    # Стриминг токенов: правим сообщение по мере генерации, не чаще STREAM_EDIT_INTERVAL
+    partial, shown, last_edit = "", "", 0.0
+    try:
+        async for event in stream_task(task_id):
+            if event["type"] == "end":
+                break
+            partial += event["text"]
+            if time.monotonic() - last_edit >= STREAM_EDIT_INTERVAL and partial.strip() != shown:
+                shown = partial.strip()
+                last_edit = time.monotonic()
+                try:
+                    await wait_msg.edit_text(f"🤖 {shown} ▌")
+                except TelegramBadRequest:
+                    pass
+    except (aiohttp.ClientError, asyncio.TimeoutError):
+        # Стрим недоступен — просто дождёмся итогового результата
+        pass
+    except Exception:
+        # Прочие ошибки — баги, а не сеть: пишем в лог и тоже переходим к long-poll
+        logger.exception("Ошибка чтения стрима задачи %s", task_id)
+
+    # Ожидание итогового результата (long-poll)
     while True:
-        await asyncio.sleep(2)
-        status_info = get_task_result(task_id)
+        status_info = await wait_task_result(task_id)
 
         if status_info["status"] == "completed":
             result = status_info["result"]
-            await wait_msg.delete()
-            await msg.answer(
-                f"💬 <b>Ответ:</b>\n{result['answer']}",
-                parse_mode="HTML"
-            )
+            if "error" in result:
+                await wait_msg.edit_text(f"Ошибка: {result['error']}")
+            else:
+                await wait_msg.edit_text(
+                    f"💬 <b>Ответ:</b>\n{result['answer']}",
+                    parse_mode="HTML"
+                )
             break
         elif status_info["status"] == "failed":
             await wait_msg.delete()
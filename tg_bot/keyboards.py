@@ -5,5 +5,6 @@ def main_menu_keyboard():
         [KeyboardButton(text="⬇️ Загрузить статью")],
         [KeyboardButton(text="📊 Суммаризация")],
         [KeyboardButton(text="❓ Задать вопрос")],
+        [KeyboardButton(text="📚 Вопрос по всем статьям")],
     ]
     return ReplyKeyboardMarkup(keyboard=kb, resize_keyboard=True)
\ No newline at end of file
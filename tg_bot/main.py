@@ -3,11 +3,13 @@ from aiogram import Bot, Dispatcher
 from aiogram.fsm.storage.memory import MemoryStorage
 from config import TELEGRAM_BOT_TOKEN
 from handlers import router
+from api_client import client
 
 async def main():
     bot = Bot(token=TELEGRAM_BOT_TOKEN)
     dp = Dispatcher(storage=MemoryStorage())
     dp.include_router(router)
+    dp.shutdown.register(client.close)
     await dp.start_polling(bot)
 
 if __name__ == "__main__":
@@ -3,4 +3,5 @@ from aiogram.fsm.state import StatesGroup, State
 class ArticleStates(StatesGroup):
     choosing_action = State()
     entering_url = State()
-    asking_question = State()
\ No newline at end of file
+    asking_question = State()
+    asking_across_articles = State()
\ No newline at end of file